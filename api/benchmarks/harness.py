@@ -0,0 +1,158 @@
+# pylint: disable=E0401
+"""
+Shared timing, reporting and comparison helpers for the benchmarks.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Returns the `pct` percentile of the sorted `samples`.
+    """
+
+    index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def summarise(name: str, samples_ms: list[float], scale: int = 1,
+              ops_per_sample: int = 1, **extra) -> dict:
+    """
+    Summarises latency samples into one result record.
+
+    Args:
+        name (str): The benchmark name.
+        samples_ms (list[float]): One timing per sample, in milliseconds.
+        scale (int): The dataset scale factor.
+        ops_per_sample (int): How many operations each sample covered.
+        **extra: Additional fields to record.
+
+    Returns:
+        (dict): The result record.
+    """
+
+    samples = sorted(samples_ms)
+    total_s = sum(samples) / 1000
+    return {
+        "name": name,
+        "scale": scale,
+        "samples": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+        "max_ms": round(samples[-1], 4),
+        "ops_per_s": round(len(samples) * ops_per_sample / total_s, 2)
+        if total_s else None,
+        **extra,
+    }
+
+
+def measure(func: Callable[[], object], repeat: int = 20, warmup: int = 1,
+            setup: Optional[Callable[[], object]] = None) -> list[float]:
+    """
+    Times `func` `repeat` times after `warmup` untimed calls.
+
+    Args:
+        func (Callable): The code under test.
+        repeat (int): The number of timed calls.
+        warmup (int): The number of untimed calls first.
+        setup (Callable, optional): Run untimed before every call.
+
+    Returns:
+        (list[float]): The timings in milliseconds.
+    """
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def metadata() -> dict:
+    """
+    Returns:
+        (dict): The commit, interpreter and time of this run.
+    """
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                                check=True, capture_output=True,
+                                text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_results(results: list[dict], path: Optional[str] = None) -> dict:
+    """
+    Writes the results with run metadata as JSON.
+
+    Args:
+        results (list[dict]): The result records.
+        path (str, optional): Where to write. Defaults to stdout.
+
+    Returns:
+        (dict): The document written.
+    """
+
+    document = {"meta": metadata(), "results": results}
+    text = json.dumps(document, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    else:
+        print(text)
+    return document
+
+
+def compare(baseline_path: str, results: list[dict],
+            tolerance: float = 0.2, metric: str = "p50_ms") -> list[str]:
+    """
+    Compares results against a previous run.
+
+    Args:
+        baseline_path (str): A JSON file written by `write_results`.
+        results (list[dict]): The current result records.
+        tolerance (float): The allowed relative slowdown, e.g. 0.2 for 20%.
+        metric (str): The field to compare.
+
+    Returns:
+        (list[str]): One line per regression beyond `tolerance`.
+    """
+
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = {(r["name"], r["scale"]): r
+                    for r in json.load(handle)["results"]}
+
+    regressions = []
+    for result in results:
+        old = baseline.get((result["name"], result["scale"]))
+        if not old or not old.get(metric):
+            continue
+        ratio = result[metric] / old[metric]
+        line = (f"{result['name']} x{result['scale']}: {old[metric]} -> "
+                f"{result[metric]} {metric} ({ratio:.2f}x)")
+        print(line)
+        if ratio > 1 + tolerance:
+            regressions.append(line)
+    return regressions
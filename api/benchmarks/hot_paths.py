@@ -0,0 +1,229 @@
+# pylint: disable=E0401,C0413
+"""
+Benchmarks for the API hot paths, at the real dataset size and synthetically
+scaled up (names, users and database rows multiplied by each scale factor).
+
+Covered:
+    get_closest_match    uncached lookups over a scaled name index
+    process_fish_data    one call per synthetic user collection
+    resolve_collection   whole pasted collections across every category
+    calendar_render      an uncached 300 dpi spawning calendar
+    get_fish_list        cold (rebuilt), warm (cached) and 304 responses
+    make_fish_list       a full ingest against the stub Nookipedia server,
+                         then an unchanged re-run
+
+The app runs against an in-memory SQLite database and a local stub server,
+so nothing touches mydatabase.db or the network.
+
+Usage (from the `api` directory):
+    PYTHONPATH=. python benchmarks/hot_paths.py [--scales 1,10,100]
+        [--only name,...] [--output results.json]
+        [--compare baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+from stub_nookipedia import StubNookipedia, load_records
+from harness import compare, measure, summarise, write_results
+
+# Must be configured before `src` is imported.
+_stub = StubNookipedia({}).start()
+os.environ["NOOKIPEDIA_URL"] = _stub.url
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from src import app, db  # noqa: E402
+from src import main  # noqa: E402
+from src.nookipedia import to_fish_row  # noqa: E402
+from src.routes.get_fish_list import fish_list_cache  # noqa: E402
+from src.search import SearchIndex  # noqa: E402
+from src.upsert import upsert_fish  # noqa: E402
+from src.models import Fish  # noqa: E402
+
+BASE_USERS = 10
+QUERIES = 200
+
+
+def scaled_names(names: list[str], scale: int) -> list[str]:
+    """
+    Returns `names` plus `scale - 1` suffixed copies of each.
+    """
+
+    return names + [f"{name} {copy}" for copy in range(1, scale)
+                    for name in names]
+
+
+def synthetic_collections(scale: int, seed: int = 0) -> list[list[str]]:
+    """
+    Builds `BASE_USERS * scale` random collections of fish and other items,
+    spelt the way users paste them.
+    """
+
+    rng = random.Random(seed)
+    items = [name for names in main.catalog.values() for name in names]
+    collections = []
+    for _ in range(BASE_USERS * scale):
+        picked = rng.sample(items, rng.randrange(20, 200))
+        collections.append([name.replace(" ", "_").upper() if rng.random()
+                            < 0.3 else name for name in picked])
+    return collections
+
+
+def bench_get_closest_match(scale: int) -> list[dict]:
+    """
+    Uncached `get_closest_match` over a name index scaled by `scale`.
+    """
+
+    index = SearchIndex((name, "fish")
+                        for name in scaled_names(main.all_fishes, scale))
+    rng = random.Random(scale)
+    queries = iter([rng.choice(index.names)[:rng.randrange(3, 12)]
+                    for _ in range(QUERIES + 1)])
+
+    samples = measure(lambda: index.closest_match(next(queries)),
+                      repeat=QUERIES, setup=index.cache_clear)
+    return [summarise("get_closest_match", samples, scale,
+                      names=len(index))]
+
+
+def bench_process_fish_data(scale: int) -> list[dict]:
+    """
+    `process_fish_data` and `resolve_collection` once per synthetic user.
+    """
+
+    collections = synthetic_collections(scale)
+
+    def run(func):
+        users = iter(collections * 2)
+        return measure(lambda: func(next(users)), repeat=len(collections))
+
+    return [
+        summarise("process_fish_data", run(main.process_fish_data), scale,
+                  users=len(collections)),
+        summarise("resolve_collection", run(main.resolve_collection), scale,
+                  users=len(collections)),
+    ]
+
+
+def bench_calendar_render(scale: int) -> list[dict]:
+    """
+    An uncached full spawning calendar at 300 dpi (only at scale 1).
+    """
+
+    if scale != 1:
+        return []
+
+    samples = measure(lambda: main.render_spawning_calendar(
+        main.get_frame("NH"), "Northern Hemisphere"), repeat=3)
+    return [summarise("calendar_render", samples, scale)]
+
+
+def _fill_fish_table(scale: int) -> int:
+    records = load_records(scale)
+    db.session.execute(Fish.__table__.delete())
+    db.session.commit()
+    upsert_fish(db, [to_fish_row(record) for record in records.values()])
+    return len(records)
+
+
+def bench_get_fish_list(scale: int) -> list[dict]:
+    """
+    /get_fish_list over `80 * scale` rows: cold, warm and conditional.
+    """
+
+    client = app.test_client()
+    rows = _fill_fish_table(scale)
+    fish_list_cache.invalidate()
+
+    cold = measure(lambda: client.get("/get_fish_list"), repeat=20,
+                   setup=fish_list_cache.invalidate)
+    warm = measure(lambda: client.get("/get_fish_list",
+                                      headers={"Accept-Encoding": "gzip"}),
+                   repeat=200)
+    etag = client.get("/get_fish_list").headers["ETag"]
+    not_modified = measure(
+        lambda: client.get("/get_fish_list",
+                           headers={"If-None-Match": etag}), repeat=200)
+
+    return [
+        summarise("get_fish_list_cold", cold, scale, rows=rows),
+        summarise("get_fish_list_warm", warm, scale, rows=rows),
+        summarise("get_fish_list_304", not_modified, scale, rows=rows),
+    ]
+
+
+def bench_make_fish_list(scale: int) -> list[dict]:
+    """
+    /make_fish_list against the stub with `80 * scale` fish: a full ingest
+    into an empty table, then an unchanged re-run.
+    """
+
+    client = app.test_client()
+    _stub.records = load_records(scale)
+
+    def empty_table():
+        db.session.execute(Fish.__table__.delete())
+        db.session.commit()
+
+    fresh = measure(lambda: client.get("/make_fish_list"), repeat=3,
+                    warmup=0, setup=empty_table)
+    rerun = measure(lambda: client.get("/make_fish_list"), repeat=3)
+
+    return [
+        summarise("make_fish_list_fresh", fresh, scale,
+                  ops_per_sample=len(_stub.records), unit="fish"),
+        summarise("make_fish_list_rerun", rerun, scale,
+                  ops_per_sample=len(_stub.records), unit="fish"),
+    ]
+
+
+BENCHMARKS = {
+    "get_closest_match": bench_get_closest_match,
+    "process_fish_data": bench_process_fish_data,
+    "calendar_render": bench_calendar_render,
+    "get_fish_list": bench_get_fish_list,
+    "make_fish_list": bench_make_fish_list,
+}
+
+
+def run_benchmarks() -> int:
+    """
+    Runs the selected benchmarks at every scale.
+
+    Returns:
+        (int): 1 if `--compare` found regressions, otherwise 0.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--only", default=",".join(BENCHMARKS))
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(",")]
+    selected = args.only.split(",")
+
+    results = []
+    with app.app_context():
+        db.create_all()
+        for name in selected:
+            for scale in scales:
+                print(f"running {name} x{scale}", file=sys.stderr)
+                results.extend(BENCHMARKS[name](scale))
+
+    write_results(results, args.output)
+    _stub.stop()
+
+    if args.compare:
+        regressions = compare(args.compare, results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond "
+                  f"{args.tolerance:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_benchmarks())
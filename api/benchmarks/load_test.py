@@ -0,0 +1,378 @@
+# pylint: disable=E0401
+"""
+A closed-loop HTTP load test of a running API server.
+
+`--concurrency` clients each send one request after another over their own
+keep-alive connection for `--duration` seconds, picking a scenario by
+weight, and the throughput and latency percentiles are reported per
+scenario and overall. The client is pure asyncio, so it needs nothing
+beyond the standard library.
+
+Scenarios:
+    get_fish_list           the full cached list
+    get_fish_list_filtered  a filtered query (price, location, size or month)
+    search                  typeahead over every datasheet
+    search_fish             typeahead within one category
+
+Search queries are prefixes and misspellings of the catalog names, fetched
+from '/catalog' before the run, shuffled with a fixed seed so runs are
+comparable between commits.
+
+`--serve gunicorn` (or `dev`) starts a server on a free port first, from
+`gunicorn.conf.py` or the Flask development server, and waits for
+'/readyz' before loading it.
+
+Usage (from the `api` directory):
+    PYTHONPATH=. python benchmarks/load_test.py [--url URL]
+        [--serve gunicorn|dev] [--duration 10] [--warmup 2]
+        [--concurrency 32] [--only name,...] [--gzip]
+        [--output results.json] [--compare baseline.json]
+        [--tolerance 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Optional
+from urllib.parse import quote, urlsplit
+from harness import compare, percentile, write_results
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scenario name to its weight in the request mix.
+SCENARIOS: dict[str, int] = {
+    "get_fish_list": 3,
+    "get_fish_list_filtered": 2,
+    "search": 4,
+    "search_fish": 1,
+}
+
+FILTERS = ["min_price=1000", "location=River", "location=Sea&sort=-price",
+           "size=Large", "month=6&hemisphere=sh", "max_price=500&sort=name"]
+
+
+class Client:
+    """
+    A minimal HTTP/1.1 keep-alive client for GET requests.
+    """
+
+    def __init__(self, host: str, port: int, headers: dict[str, str]):
+        self.host = host
+        self.port = port
+        self.headers = "".join(f"{key}: {value}\r\n"
+                               for key, value in headers.items())
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port)
+
+    async def close(self) -> None:
+        """
+        Closes the connection, if open.
+        """
+
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def get(self, path: str) -> tuple[int, int]:
+        """
+        Sends a GET request and reads the whole response.
+
+        Args:
+            path (str): The path and query string.
+
+        Returns:
+            (tuple(int, int)): The status code and the body size in bytes.
+        """
+
+        if self._writer is None:
+            await self._connect()
+        self._writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n{self.headers}"
+            "\r\n".encode("latin-1"))
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            # The server closed an idle connection; retry on a new one.
+            await self.close()
+            return await self.get(path)
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while (line := await self._reader.readline()) not in (b"\r\n", b""):
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            size = int(headers["content-length"])
+            await self._reader.readexactly(size)
+        elif headers.get("transfer-encoding") == "chunked":
+            size = 0
+            while chunk := int((await self._reader.readline()).split(b";")[0],
+                               16):
+                await self._reader.readexactly(chunk + 2)
+                size += chunk
+            await self._reader.readline()
+        else:
+            size = len(await self._reader.read())
+            headers["connection"] = "close"
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return (status, size)
+
+
+def fetch_json(base_url: str, path: str) -> dict:
+    """
+    Returns the JSON body of a GET request.
+    """
+
+    with urllib.request.urlopen(base_url + path, timeout=30) as response:
+        return json.load(response)
+
+
+def make_paths(base_url: str, seed: int = 0) -> dict[str, list[str]]:
+    """
+    Builds the request paths of every scenario.
+
+    Args:
+        base_url (str): The server to fetch the catalog names from.
+        seed (int): The shuffle / typo seed.
+
+    Returns:
+        (dict[str, list[str]]): Scenario name to its paths.
+    """
+
+    rng = random.Random(seed)
+    names = {}
+    for category in fetch_json(base_url, "/catalog")["categories"]:
+        items = fetch_json(base_url, f"/catalog/{category['slug']}")["items"]
+        names[category["category"]] = [item["Name"] for item in items]
+
+    def queries(words: list[str]) -> list[str]:
+        found = []
+        for word in words:
+            found.extend(word[:i] for i in range(2, min(len(word), 6) + 1))
+            chars = list(word)
+            chars[rng.randrange(len(chars))] = rng.choice("aeiourst")
+            found.append("".join(chars))
+        rng.shuffle(found)
+        return [quote(query) for query in found]
+
+    every_name = [name for group in names.values() for name in group]
+    return {
+        "get_fish_list": ["/get_fish_list"],
+        "get_fish_list_filtered": [f"/get_fish_list?{query}"
+                                   for query in FILTERS],
+        "search": [f"/search?q={query}" for query in queries(every_name)],
+        "search_fish": [f"/search?q={query}&category=fish"
+                        for query in queries(names.get("fish", []))],
+    }
+
+
+async def run_client(client: Client, paths: dict[str, list[str]],
+                     weights: dict[str, int], warmup_until: float,
+                     deadline: float, rng: random.Random,
+                     samples: dict[str, list[float]],
+                     errors: dict[str, int]) -> None:
+    """
+    Sends requests back to back until `deadline`, recording the latency of
+    those sent after `warmup_until`.
+    """
+
+    names = list(weights)
+    try:
+        while (start := time.perf_counter()) < deadline:
+            scenario = rng.choices(names, weights=list(weights.values()))[0]
+            path = rng.choice(paths[scenario])
+            try:
+                status, _ = await client.get(path)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                status = 0
+                await client.close()
+            if start < warmup_until:
+                continue
+            if status >= 400 or status == 0:
+                errors[scenario] += 1
+            samples[scenario].append((time.perf_counter() - start) * 1000)
+    finally:
+        await client.close()
+
+
+def summarise_load(name: str, samples_ms: list[float], errors: int,
+                   duration: float, concurrency: int) -> dict:
+    """
+    Summarises one scenario's latency samples into a result record.
+    """
+
+    samples = sorted(samples_ms) or [0.0]
+    return {
+        "name": name,
+        "scale": 1,
+        "concurrency": concurrency,
+        "requests": len(samples_ms),
+        "errors": errors,
+        "throughput_rps": round(len(samples_ms) / duration, 2),
+        "mean_ms": round(sum(samples) / len(samples), 4),
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p90_ms": round(percentile(samples, 90), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+async def load(base_url: str, paths: dict[str, list[str]],
+               weights: dict[str, int], args: argparse.Namespace
+               ) -> list[dict]:
+    """
+    Runs the load test and returns one result per scenario plus "total".
+    """
+
+    parts = urlsplit(base_url)
+    headers = {"User-Agent": "acnh-load-test",
+               "Accept": "application/json"}
+    if args.gzip:
+        headers["Accept-Encoding"] = "gzip"
+
+    samples: dict[str, list[float]] = {name: [] for name in weights}
+    errors = {name: 0 for name in weights}
+    start = time.perf_counter()
+    warmup_until = start + args.warmup
+    deadline = warmup_until + args.duration
+
+    await asyncio.gather(*(
+        run_client(Client(parts.hostname, parts.port or 80, headers), paths,
+                   weights, warmup_until, deadline,
+                   random.Random(args.seed + i), samples, errors)
+        for i in range(args.concurrency)))
+
+    results = [summarise_load(name, samples[name], errors[name],
+                              args.duration, args.concurrency)
+               for name in weights]
+    results.append(summarise_load(
+        "total", [sample for group in samples.values() for sample in group],
+        sum(errors.values()), args.duration, args.concurrency))
+    return results
+
+
+def free_port() -> int:
+    """
+    Returns:
+        (int): A TCP port nobody listens on right now.
+    """
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind: str, timeout: float = 120) -> tuple[
+        subprocess.Popen, str]:
+    """
+    Starts a server from the `api` directory and waits until '/readyz'
+    answers 200.
+
+    Args:
+        kind (str): "gunicorn" or "dev" (the Flask development server).
+        timeout (float): How long to wait for readiness, in seconds.
+
+    Returns:
+        (tuple(subprocess.Popen, str)): The server process and its base URL.
+    """
+
+    port = free_port()
+    if kind == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                   "--bind", f"127.0.0.1:{port}", "wsgi:app"]
+    else:
+        command = [sys.executable, "-c",
+                   "import logging; from wsgi import app; "
+                   "logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+                   f"app.run(host='127.0.0.1', port={port}, threaded=True)"]
+
+    # The access logs would only slow the server down.
+    server = subprocess.Popen(command, cwd=API_DIR,
+                              env={**os.environ, "ACCESS_LOG": ""},
+                              stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{kind} server exited with {server.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/readyz", timeout=5):
+                return (server, base_url)
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{kind} server not ready after {timeout}s")
+
+
+def run_load_test() -> int:
+    """
+    Runs the load test.
+
+    Returns:
+        (int): 1 if requests failed or `--compare` found regressions,
+               otherwise 0.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--serve", choices=("gunicorn", "dev"))
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--only", default=",".join(SCENARIOS))
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    weights = {name: SCENARIOS[name] for name in args.only.split(",")}
+    server = None
+    base_url = args.url.rstrip("/")
+    if args.serve:
+        server, base_url = start_server(args.serve)
+
+    try:
+        paths = make_paths(base_url, args.seed)
+        print(f"loading {base_url} with {args.concurrency} clients for "
+              f"{args.duration}s", file=sys.stderr)
+        results = asyncio.run(load(base_url, paths, weights, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    write_results(results, args.output)
+    for result in results:
+        print(f"{result['name']:>24}: {result['throughput_rps']:>9} req/s  "
+              f"p50 {result['p50_ms']:.2f} ms  p90 {result['p90_ms']:.2f} ms"
+              f"  p99 {result['p99_ms']:.2f} ms  errors {result['errors']}",
+              file=sys.stderr)
+
+    status = 1 if results[-1]["errors"] else 0
+    if args.compare:
+        regressions = compare(args.compare, results, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond "
+                  f"{args.tolerance:.0%}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(run_load_test())
@@ -0,0 +1,83 @@
+# pylint: disable=E0401
+"""
+Measures the latency of uncached typeahead queries against the catalog
+search index and checks the p99 against `src.search.P99_TARGET_MS`.
+
+Queries are every prefix of every indexed name plus a misspelt copy of each
+name, shuffled with a fixed seed so runs are comparable between commits.
+
+Usage (from the `api` directory):
+    PYTHONPATH=. python benchmarks/search_latency.py [--json]
+"""
+import json
+import random
+import sys
+import time
+from harness import percentile
+from src.search import P99_TARGET_MS, get_catalog_index
+
+
+def make_queries(names: list[str], seed: int = 0) -> list[str]:
+    """
+    Builds the benchmark queries from the indexed names.
+
+    Args:
+        names (list[str]): The indexed names.
+        seed (int): The shuffle / typo seed.
+
+    Returns:
+        (list[str]): The queries.
+    """
+
+    rng = random.Random(seed)
+    queries = []
+    for name in names:
+        queries.extend(name[:i] for i in range(1, len(name) + 1))
+        chars = list(name)
+        chars[rng.randrange(len(chars))] = rng.choice("aeiourst")
+        queries.append("".join(chars))
+
+    rng.shuffle(queries)
+    return queries
+
+
+def main() -> int:
+    """
+    Runs the benchmark and prints the latency percentiles in milliseconds.
+
+    Returns:
+        (int): 0 if the p99 is within the target, 1 otherwise.
+    """
+
+    index = get_catalog_index()
+    queries = make_queries(index.names)
+
+    samples = []
+    for query in queries:
+        index.cache_clear()
+        start = time.perf_counter()
+        index.search(query)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    result = {
+        "benchmark": "search_latency",
+        "queries": len(samples),
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p90_ms": round(percentile(samples, 90), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+        "max_ms": round(samples[-1], 4),
+        "p99_target_ms": P99_TARGET_MS,
+    }
+
+    if "--json" in sys.argv:
+        print(json.dumps(result))
+    else:
+        for key, value in result.items():
+            print(f"{key}: {value}")
+
+    return 0 if result["p99_ms"] <= P99_TARGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
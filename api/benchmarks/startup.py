@@ -0,0 +1,111 @@
+# pylint: disable=E0401
+"""
+Measures the cold-start cost of loading the datasheets.
+
+Each scenario runs in a fresh interpreter so import caches do not carry over:
+
+- snapshot: `import src.main` with a freshly built binary snapshot.
+- csv_fallback: `import src.main` with no snapshot (CSVs compiled in memory).
+- pandas_baseline: what `src.main` used to do at import, i.e. import pandas,
+  seaborn and matplotlib and `pd.read_csv` every datasheet.
+
+Usage (from the `api` directory):
+    PYTHONPATH=. python benchmarks/startup.py [--repeat N] [--json]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from src.snapshot import DATA_DIR, build_snapshot
+
+API_DIR = os.path.dirname(DATA_DIR)
+
+# The Flask app (`src.app`) is built before timing in every scenario; only the
+# datasheet loading differs between them.
+_MAIN_IMPORT = """
+import sys, time
+from src import app
+start = time.perf_counter()
+import src.main
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in ("pandas", "matplotlib", "seaborn") if m in sys.modules)
+print(elapsed, ",".join(heavy))
+"""
+
+_PANDAS_BASELINE = """
+import glob, time
+from src import app
+start = time.perf_counter()
+import pandas as pd
+import seaborn
+import matplotlib.pyplot
+for path in sorted(glob.glob({data!r} + "/*_datasheet.csv")):
+    pd.read_csv(path)
+elapsed = time.perf_counter() - start
+print(elapsed, "pandas,matplotlib,seaborn")
+"""
+
+
+def run(code: str, env: dict) -> tuple[float, str]:
+    """
+    Runs `code` in a fresh interpreter and returns its reported timing.
+    """
+
+    output = subprocess.run([sys.executable, "-c", code], cwd=API_DIR,
+                            env=env, check=True, capture_output=True,
+                            text=True).stdout.strip().splitlines()[-1]
+    elapsed, heavy = (output.split(" ") + [""])[:2]
+    return (float(elapsed), heavy)
+
+
+def main() -> int:
+    """
+    Runs every scenario and prints the median timings in milliseconds.
+
+    Returns:
+        (int): 0 if the snapshot start is faster than the pandas baseline.
+    """
+
+    repeat = 5
+    if "--repeat" in sys.argv:
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1])
+
+    env = dict(os.environ, PYTHONPATH=API_DIR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = build_snapshot(path=os.path.join(tmp, "bench.snap"))
+        scenarios = {
+            "snapshot": (_MAIN_IMPORT,
+                         dict(env, ACNH_SNAPSHOT=snapshot_path)),
+            "csv_fallback": (_MAIN_IMPORT,
+                             dict(env, ACNH_SNAPSHOT=os.path.join(
+                                 tmp, "missing.snap"))),
+            "pandas_baseline": (_PANDAS_BASELINE.format(data=DATA_DIR), env),
+        }
+
+        result = {"benchmark": "startup", "repeat": repeat}
+        for name, (code, scenario_env) in scenarios.items():
+            runs = [run(code, scenario_env) for _ in range(repeat)]
+            result[name] = {
+                "median_ms": round(statistics.median(
+                    elapsed for elapsed, _ in runs) * 1000, 2),
+                "heavy_modules": runs[-1][1].split(",") if runs[-1][1]
+                else [],
+            }
+
+    if "--json" in sys.argv:
+        print(json.dumps(result))
+    else:
+        for name in scenarios:
+            print(f"{name}: {result[name]['median_ms']} ms "
+                  f"(heavy modules: {result[name]['heavy_modules']})")
+
+    faster = result["snapshot"]["median_ms"] < \
+        result["pandas_baseline"]["median_ms"]
+    return 0 if faster else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
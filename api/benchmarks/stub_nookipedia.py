@@ -0,0 +1,236 @@
+# pylint: disable=E0401
+"""
+A local stand-in for the api.nookipedia.com fish endpoints.
+
+Records are generated from `data/fish_info.json` (optionally replicated to
+scale the dataset) and served from a threaded HTTP server, with optional
+per-request latency and injected 503s to exercise the client's retries.
+Detail responses carry an `ETag` and honour `If-None-Match` with a 304, like
+a conditional-request aware upstream would. Unless `serve_images` is off,
+each record's `image_url` points at a generated PNG icon under /images/, so
+the image cache can be exercised offline too.
+
+Point the ingest at it with `NOOKIPEDIA_URL=<stub.url>`. It can also be run
+directly:
+    python benchmarks/stub_nookipedia.py [--port 8765]
+"""
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+          "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _months(flags: list[bool]) -> str:
+    return ", ".join(month for month, flag in zip(MONTHS, flags) if flag)
+
+
+def load_records(scale: int = 1) -> dict[str, dict]:
+    """
+    Builds Nookipedia-shaped fish records from `fish_info.json`.
+
+    Args:
+        scale (int): How many copies of the dataset to serve. Copies after
+                     the first get a " <n>" suffix on their names.
+
+    Returns:
+        (dict[str, dict]): Fish name to record.
+    """
+
+    with open(os.path.join(DATA_DIR, "fish_info.json"),
+              encoding="utf-8") as handle:
+        fish_info = json.load(handle)
+
+    records = {}
+    for copy in range(scale):
+        for fish in fish_info:
+            name = fish["name"] if copy == 0 else f"{fish['name']} {copy}"
+            records[name] = {
+                "name": name,
+                "image_url": fish["imageURL"],
+                "rarity": "",
+                "sell_nook": fish["sellPrice"],
+                "location": fish["location"],
+                "shadow_size": fish["size"],
+                "north": {
+                    "availability_array": [{"months": "",
+                                            "time": fish["time"]}],
+                    "months": _months(fish["nhMonths"]),
+                },
+                "south": {"months": _months(fish["shMonths"])},
+            }
+    return records
+
+
+class StubNookipedia:
+    """
+    A threaded HTTP server serving `records` like Nookipedia's fish API.
+    """
+
+    def __init__(self, records: dict[str, dict], latency: float = 0.0,
+                 fail_every: int = 0, port: int = 0,
+                 serve_images: bool = True):
+        self.serve_images = serve_images
+        self.latency = latency
+        self.fail_every = fail_every
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port),
+                                           self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+        self.records = records
+
+    @property
+    def records(self) -> dict[str, dict]:
+        """
+        Returns:
+            (dict[str, dict]): The served fish, by name.
+        """
+
+        return self._records
+
+    @records.setter
+    def records(self, records: dict[str, dict]) -> None:
+        # With `serve_images`, point the image URLs at this server so
+        # nothing is downloaded from the real image hosts.
+        if self.serve_images:
+            for name, record in records.items():
+                record["image_url"] = f"{self.url}/images/{quote(name)}.png"
+        self._records = records
+
+    @property
+    def url(self) -> str:
+        """
+        Returns:
+            (str): The base URL to use as `NOOKIPEDIA_URL`.
+        """
+
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubNookipedia":
+        """
+        Starts serving in a background thread.
+        """
+
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server.
+        """
+
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubNookipedia":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _count(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    @staticmethod
+    def icon(name: str) -> bytes:
+        """
+        Returns:
+            (bytes): A 256px PNG icon, distinct per name.
+        """
+
+        from PIL import Image  # pylint: disable=C0415
+
+        colour = hashlib.sha1(name.encode()).digest()[:3]
+        buffer = io.BytesIO()
+        Image.new("RGBA", (256, 256), (*colour, 255)).save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """
+            Serves /nh/fish, /nh/fish/<name> and /images/<name>.png.
+            """
+
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args) -> None:  # pylint: disable=W0221
+                pass
+
+            def _send(self, status: int, body: bytes = b"",
+                      etag: str = "",
+                      content_type: str = "application/json") -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag:
+                    self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:  # pylint: disable=C0103
+                """
+                Handles GET requests.
+                """
+
+                count = stub._count()  # pylint: disable=W0212
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if stub.fail_every and count % stub.fail_every == 0:
+                    self._send(503)
+                    return
+
+                path = urlsplit(self.path).path.rstrip("/")
+                if path.startswith("/images/") and path.endswith(".png"):
+                    name = unquote(path[len("/images/"):-len(".png")])
+                    if name not in stub.records:
+                        self._send(404)
+                        return
+                    self._send(200, stub.icon(name), content_type="image/png")
+                    return
+                if path == "/nh/fish":
+                    self._send(200, json.dumps(list(stub.records)).encode())
+                    return
+
+                record = stub.records.get(unquote(path.rsplit("/", 1)[-1]))
+                if not path.startswith("/nh/fish/") or record is None:
+                    self._send(404, b'{"title": "Not found"}')
+                    return
+                body = json.dumps(record).encode()
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._send(304, etag=etag)
+                    return
+                self._send(200, body, etag)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    PORT = 8765
+    if "--port" in sys.argv:
+        PORT = int(sys.argv[sys.argv.index("--port") + 1])
+
+    with StubNookipedia(load_records(), port=PORT) as server:
+        print(f"Serving stub Nookipedia at {server.url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,24 @@
+"""
+This script publishes the precomputed availability files (see
+`src.availability`) to `AVAILABILITY_DIR`, e.g. as a deploy step before
+syncing the directory to a CDN.
+
+The app also rebuilds them at startup and after every ingest that changes
+the fish table.
+
+Usage:
+    python build_availability.py
+"""
+import time
+from src import app, db
+from src.availability import AVAILABILITY_DIR, build_availability
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        manifest = build_availability(db)
+    elapsed = time.perf_counter() - start
+
+    print(f"Wrote {len(manifest['files'])} files to {AVAILABILITY_DIR} "
+          f"(v{manifest['version']}) in {elapsed:.3f}s")
@@ -0,0 +1,25 @@
+"""
+This script compiles the datasheets in `data/` into the binary snapshot
+loaded by `src.main` at startup.
+
+Re-run it whenever a file in `data/` changes; a stale or missing snapshot is
+detected at startup and the CSVs are compiled in memory instead.
+
+Usage:
+    python build_snapshot.py [output path]
+"""
+import sys
+import time
+from src.snapshot import SNAPSHOT_PATH, build_snapshot, read_snapshot
+
+if __name__ == "__main__":
+    output = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_PATH
+
+    start = time.perf_counter()
+    build_snapshot(path=output)
+    elapsed = time.perf_counter() - start
+
+    snapshot = read_snapshot(output)
+    sheets = ", ".join(f"{name} ({len(sheet)})"
+                       for name, sheet in snapshot.datasheets.items())
+    print(f"Wrote {output} (v{snapshot.version}) in {elapsed:.3f}s: {sheets}")
@@ -0,0 +1,115 @@
+"""
+The gunicorn settings for serving the API in production.
+
+The app is preloaded in the master (see `wsgi.py`), which warms the caches
+before forking, so every worker starts ready and shares the read-only
+datasheets and indexes copy-on-write. Each worker then drops the database
+connections inherited from the master and opens its own. Exactly one worker
+at a time runs the periodic Nookipedia sync; when it exits, the next worker
+spawned takes over.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Environment:
+    PORT             the port to listen on (default 8000), or BIND for a
+                     full address
+    WEB_CONCURRENCY  the worker processes (default 2 per CPU plus 1)
+    WEB_THREADS      the threads per worker (default 4)
+    WEB_TIMEOUT      seconds before a silent worker is restarted (default 60)
+    ACCESS_LOG       where to write the access log (default stdout, empty
+                     to turn it off)
+    RENDER_WORKERS   the calendar render processes per worker (default the
+                     CPUs shared among the workers)
+    PROMETHEUS_MULTIPROC_DIR
+                     where the workers share their metrics, so '/metrics'
+                     covers all of them (default a new temporary directory)
+"""
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY",
+                        str(2 * multiprocessing.cpu_count() + 1)))
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "4"))
+
+# Import and warm the app once, before forking the workers.
+preload_app = True
+
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then, so slow leaks cannot build up.
+max_requests = 5000
+max_requests_jitter = 500
+
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = "-"
+
+# Every worker has its own render farm; share the CPUs between them.
+os.environ.setdefault(
+    "RENDER_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Set before the app is imported, so every worker shares its metrics.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                      tempfile.mkdtemp(prefix="acnh-metrics-"))
+
+
+def when_ready(server):  # pylint: disable=W0613
+    """
+    Publishes what the master recorded while preloading the app.
+    """
+
+    from src.metrics import REGISTRY  # pylint: disable=C0415
+
+    REGISTRY.dump()
+
+
+def pre_fork(server, worker):
+    """
+    Designates the worker about to be forked to run the periodic sync if no
+    live worker does.
+    """
+
+    worker.runs_sync = not any(getattr(other, "runs_sync", False)
+                               for other in server.WORKERS.values())
+
+
+def post_fork(server, worker):  # pylint: disable=W0613
+    """
+    Drops the database connections the worker inherited from the master;
+    sharing them across processes would corrupt them. The metrics inherited
+    from the master are dropped too, as the master reports them itself.
+    Every worker starts its job queue, which picks up queued jobs and those
+    abandoned by dead workers; the designated worker starts the periodic
+    sync.
+    """
+
+    # pylint: disable=C0415
+    from src import app, db
+    from src.metrics import REGISTRY
+    # pylint: enable=C0415
+
+    REGISTRY.clear()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+    app.extensions["jobs"].start()
+    scheduler = app.extensions["fish_sync"]
+    if worker.runs_sync and scheduler.interval > 0:
+        scheduler.start()
+
+
+def child_exit(server, worker):  # pylint: disable=W0613
+    """
+    Folds the metrics of an exited worker into the archive, so its counts
+    outlive it.
+    """
+
+    from src.metrics import REGISTRY  # pylint: disable=C0415
+
+    REGISTRY.archive_process(worker.pid)
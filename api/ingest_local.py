@@ -0,0 +1,37 @@
+"""
+This script fills the `Fish` table from the bundled `data/` files, without
+Nookipedia or an API key, e.g. to provision a new node or a CI database.
+
+It creates and upgrades the tables first, so it works on an empty database,
+and when the table changed it refreshes what is derived from it (the cached
+fish list and the availability files), like the ingest routes do.
+
+Usage:
+    python ingest_local.py [--images]
+
+    --images  also download the fish images into the image cache
+"""
+import sys
+import time
+from src import app, db
+from src.database import upgrade_schema
+from src.local_source import ingest_local_fish
+from src.routes.get_fish_list import refresh_fish_views
+from src.sync import fish_changed
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        upgrade_schema(db)
+        counts = ingest_local_fish(db, with_images="--images" in sys.argv)
+        if fish_changed(counts):
+            refresh_fish_views()
+    elapsed = time.perf_counter() - start
+
+    summary = ", ".join(f"{counts[key]} {key}"
+                        for key in ("inserted", "updated", "unchanged"))
+    print(f"Loaded the fish table in {elapsed:.3f}s: {summary}")
+    if "images" in counts:
+        print(f"Linked {counts['images']['linked']} images, "
+              f"{len(counts['images']['failures'])} failed")
@@ -9,14 +9,20 @@ Modules:
     src.app: The application instance to be run.
 
 Usage:
-    Run this script directly to start the application server.
+    Run this script directly to start the development server. In production
+    serve `wsgi:app` with gunicorn instead:
+
+        gunicorn -c gunicorn.conf.py wsgi:app
 """
 from src import app, db
-from src.models import Fish
+from src.serving import prepare_app
 
 if __name__ == "__main__":
+    prepared = prepare_app(app, db)  # Tables, availability files and caches
+    print(f"Total Fish entries: {prepared['fish']}")
     with app.app_context():
-        db.create_all()  # Create tables if they don't exist
-        print(f"Total Fish entries: {Fish.query.count()}")
+        app.extensions["jobs"].start()  # Resume unfinished jobs
+    if app.extensions["fish_sync"].interval > 0:
+        app.extensions["fish_sync"].start()  # The periodic Nookipedia sync
 
     app.run(host="0.0.0.0", port=5000)
@@ -2,12 +2,38 @@
 """
 This script initializes a Flask application, loads environment variables,
 and registers routes.
+
+The app is built on first access to `src.app` or `src.db` rather than when
+the package is imported, so processes that only need a leaf module (such as
+the calendar render workers importing `src.calendar_render`) never create
+the app, its database engines or its background services.
 """
-from src.routes import register_routes
-from .config import config_app
+import threading
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from flask import Flask
+    from flask_sqlalchemy import SQLAlchemy
+
+# Set by `__getattr__` on first access.
+app: "Flask"
+db: "SQLAlchemy"
+
+_lock = threading.Lock()
+
 
-app, db = config_app()
+def __getattr__(name: str):
+    if name not in ("app", "db"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-register_routes(app, db)
+    with _lock:
+        if "app" not in globals():
+            # pylint: disable=C0415
+            from src.routes import register_routes
+            from .config import config_app
+            # pylint: enable=C0415
 
-print(db.Model)
+            built_app, built_db = config_app()
+            register_routes(built_app, built_db)
+            globals().update(app=built_app, db=built_db)
+    return globals()[name]
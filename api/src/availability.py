@@ -0,0 +1,182 @@
+# pylint: disable=E0401
+"""
+Precomputed availability tables, published as static JSON files.
+
+For every critter category and hemisphere one file lists, for each of the 12
+months, what is available that month, what is new this month, what is
+leaving after it, and what is catchable in each of the 24 hours. Items are
+given as indices into the file's "names" list to keep it compact.
+
+File names carry a hash of their content, so they never change once written
+and can be cached for good by browsers and CDNs. `manifest.json` maps each
+"<category>/<hemisphere>" to its current file and is the only file that
+needs revalidating. Each file has a gzipped twin ("<name>.gz"), served to
+clients accepting gzip. Fish come from the `Fish` table once it has been
+ingested (so the files follow every ingest) and from the datasheet before
+that; insects and sea creatures come from their datasheets.
+"""
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Optional
+import numpy as np
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select
+from .models import Fish
+from .spawn_engine import HEMISPHERE_INDEX, SpawnTable, parse_hours
+
+AVAILABILITY_DIR = os.getenv("AVAILABILITY_DIR", "static/availability")
+MANIFEST = "manifest.json"
+
+
+def fish_spawn_table(db: SQLAlchemy) -> Optional[SpawnTable]:
+    """
+    Builds a `SpawnTable` from the ingested `Fish` rows: their month masks,
+    with the fish's time string for every month it is present.
+
+    Args:
+        db (SQLAlchemy): The application database.
+
+    Returns:
+        (SpawnTable | None): The table, or None if no fish are stored.
+    """
+
+    table = Fish.__table__
+    rows = db.session.execute(
+        select(table.c.name, table.c.time, table.c.nh_month_mask,
+               table.c.sh_month_mask).order_by(table.c.name)).all()
+    if not rows:
+        return None
+
+    names = np.array([row.name for row in rows], dtype=object)
+    month_masks = np.array([[row.nh_month_mask or 0 for row in rows],
+                            [row.sh_month_mask or 0 for row in rows]],
+                           dtype=np.uint16)
+    hours = np.array([parse_hours(row.time) for row in rows],
+                     dtype=np.uint32)
+    months = (month_masks[:, None, :] >> np.arange(12, dtype=np.uint16)[
+        None, :, None]) & 1
+    return SpawnTable(names=names, month_masks=month_masks,
+                      hour_masks=(months * hours).astype(np.uint32),
+                      index={name: row for row, name in enumerate(names)})
+
+
+def availability_table(spawns: SpawnTable, category: str,
+                       hemisphere: str) -> dict:
+    """
+    Computes the availability file of one category and hemisphere.
+
+    Args:
+        spawns (SpawnTable): The category's spawn table.
+        category (str): The catalog category.
+        hemisphere (str): "nh" or "sh".
+
+    Returns:
+        (dict): The "names" and, per month, the "available", "new",
+                "leaving" and per hour ("hours") item indices.
+    """
+
+    h_index = HEMISPHERE_INDEX[hemisphere]
+    hour_bits = np.arange(24, dtype=np.uint32)
+    present = [spawns.available(month, hemisphere) for month in range(1, 13)]
+
+    months = []
+    for m_index in range(12):
+        now = present[m_index]
+        hours = (spawns.hour_masks[h_index, m_index][None, :]
+                 >> hour_bits[:, None]) & 1
+        months.append({
+            "month": m_index + 1,
+            "available": np.flatnonzero(now).tolist(),
+            "new": np.flatnonzero(now & ~present[m_index - 1]).tolist(),
+            "leaving": np.flatnonzero(
+                now & ~present[(m_index + 1) % 12]).tolist(),
+            "hours": [np.flatnonzero(row).tolist() for row in hours],
+        })
+
+    return {"category": category, "hemisphere": hemisphere,
+            "names": spawns.names.tolist(), "months": months}
+
+
+def _write(path: str, data: bytes) -> None:
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def read_manifest(directory: str = AVAILABILITY_DIR) -> Optional[dict]:
+    """
+    Returns:
+        (dict | None): The current manifest, or None if none was built.
+    """
+
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def build_availability(db: Optional[SQLAlchemy] = None,
+                       directory: str = AVAILABILITY_DIR) -> dict:
+    """
+    Writes the availability files and their manifest. Files of the previous
+    build are kept, for clients still holding the old manifest; older ones
+    are deleted.
+
+    Args:
+        db (SQLAlchemy, optional): The application database. Without it,
+                                   fish also come from the datasheet.
+        directory (str, optional): The output directory.
+
+    Returns:
+        (dict): The manifest: the build "version" and "generated" time and
+                the "files" by "<category>/<hemisphere>".
+    """
+
+    from src import main  # pylint: disable=C0415
+
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory) or {"files": {}}
+
+    files = {}
+    for store in main.catalog_engine:
+        spawns = store.spawns
+        if spawns is None:
+            continue
+        if store.category == "fish" and db is not None:
+            spawns = fish_spawn_table(db) or spawns
+
+        for hemisphere in HEMISPHERE_INDEX:
+            body = json.dumps(
+                availability_table(spawns, store.category, hemisphere),
+                separators=(",", ":")).encode("utf-8")
+            name = f"{store.slug}-{hemisphere}." \
+                   f"{sha256(body).hexdigest()[:16]}.json"
+            if not os.path.exists(os.path.join(directory, name)):
+                _write(os.path.join(directory, name + ".gz"),
+                       gzip.compress(body, 9, mtime=0))
+                _write(os.path.join(directory, name), body)
+            files[f"{store.slug}/{hemisphere}"] = name
+
+    version = sha256("".join(sorted(files.values())).encode()).hexdigest()
+    if version[:16] == previous.get("version"):
+        return previous
+
+    manifest = {"version": version[:16],
+                "generated": datetime.now(timezone.utc).isoformat(
+                    timespec="seconds"),
+                "files": files}
+    _write(os.path.join(directory, MANIFEST),
+           json.dumps(manifest, indent=1).encode("utf-8"))
+
+    keep = {MANIFEST, *files.values(), *previous["files"].values()}
+    for name in os.listdir(directory):
+        if name.endswith((".json", ".json.gz")) and \
+                name.removesuffix(".gz") not in keep:
+            os.remove(os.path.join(directory, name))
+    return manifest
@@ -0,0 +1,224 @@
+# pylint: disable=E0401
+"""
+Collection status for many users at once.
+
+Every category becomes one users × items boolean matrix of what has been
+caught. Uncaught, catchable-now, leaving and arriving are then a handful of
+broadcast NumPy operations over the whole batch, instead of one
+`collection_status()` call (and one set of list scans) per user. Names are
+resolved once per distinct spelling for the whole batch, and nothing is
+rendered.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+import numpy as np
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select
+from .models import CollectedItem
+
+# What is reported, among the uncaught items, for critter categories.
+AVAILABILITY_KEYS: tuple[str, ...] = ("available_now", "leaving", "arriving")
+
+
+def _main():
+    from src import main  # pylint: disable=C0415
+
+    return main
+
+
+def resolve_batch(collections: dict[str, Iterable[str]]) -> tuple[
+        dict[str, list[tuple[str, str]]], dict[str, list[str]]]:
+    """
+    Resolves every user's names, each distinct spelling only once.
+
+    Args:
+        collections (dict[str, Iterable[str]]): User id to the user supplied
+                                                item names.
+
+    Returns:
+        (tuple(dict, dict)): User id to its (category, canonical name)
+                             pairs, and user id to its unknown names.
+    """
+
+    resolver = _main().catalog_names
+    memo: dict[str, Optional[tuple[str, str]]] = {}
+    resolved: dict[str, list[tuple[str, str]]] = {}
+    unknown: dict[str, list[str]] = {}
+
+    for user, names in collections.items():
+        hits, misses = [], []
+        for name in names:
+            if name not in memo:
+                memo[name] = resolver.resolve(name)
+            hit = memo[name]
+            if hit is None:
+                misses.append(name)
+            else:
+                hits.append(hit)
+        resolved[user] = hits
+        if misses:
+            unknown[user] = misses
+    return (resolved, unknown)
+
+
+def load_collections(db: SQLAlchemy, user_ids: list[str]
+                     ) -> dict[str, list[tuple[str, str]]]:
+    """
+    Reads the stored collections of several users in one query.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        user_ids (list[str]): The user ids.
+
+    Returns:
+        (dict[str, list[tuple[str, str]]]): User id to its (category, name)
+                                            pairs; unknown users are empty.
+    """
+
+    collections: dict[str, list[tuple[str, str]]] = {
+        user: [] for user in user_ids}
+    if not user_ids:
+        return collections
+
+    query = select(CollectedItem.user_id, CollectedItem.category,
+                   CollectedItem.name) \
+        .where(CollectedItem.user_id.in_(user_ids))
+    for user, category, name in db.session.execute(query):
+        collections[user].append((category, name))
+    return collections
+
+
+def caught_matrices(users: list[str],
+                    collections: dict[str, list[tuple[str, str]]],
+                    categories: list[str]) -> dict[str, np.ndarray]:
+    """
+    Builds the users × items caught matrix of every category in one pass
+    over the collections.
+
+    Args:
+        users (list[str]): The user ids, one matrix row each.
+        collections (dict): User id to its (category, name) pairs.
+        categories (list[str]): The catalog categories; columns follow each
+                                store's name order.
+
+    Returns:
+        (dict[str, np.ndarray]): Category to a bool array of shape
+                                 (len(users), len(store)).
+    """
+
+    stores = _main().catalog_engine.stores
+
+    # Every item of the requested categories gets one flat column number.
+    column: dict[tuple[str, str], int] = {}
+    offsets = {}
+    for category in categories:
+        offsets[category] = len(column)
+        for name in stores[category].names:
+            column[(category, name)] = len(column)
+
+    pairs = [collections.get(user, ()) for user in users]
+    rows = np.repeat(np.arange(len(users)), [len(items) for items in pairs])
+    flat = np.fromiter((column.get(pair, -1)
+                        for items in pairs for pair in items),
+                       dtype=np.int64, count=len(rows))
+
+    caught = np.zeros((len(users), len(column)), dtype=bool)
+    known = flat >= 0
+    caught[rows[known], flat[known]] = True
+    return {category: caught[:, offsets[category]:
+                              offsets[category] + len(stores[category])]
+            for category in categories}
+
+
+def availability_masks(category: str, hemisphere: str,
+                       now: datetime) -> Optional[dict[str, np.ndarray]]:
+    """
+    Returns the catchable-now, leaving and arriving masks of a category,
+    aligned with its store's name order.
+
+    Args:
+        category (str): The catalog category.
+        hemisphere (str): "nh" or "sh".
+        now (datetime): The time to check.
+
+    Returns:
+        (dict[str, np.ndarray] | None): `AVAILABILITY_KEYS` to bool masks,
+                                        or None without spawn data.
+    """
+
+    store = _main().catalog_engine.stores[category]
+    spawns = store.spawns
+    if spawns is None:
+        return None
+
+    order = np.array([spawns.index[name] for name in store.names])
+    this_month = spawns.available(now.month, hemisphere)
+    next_month = spawns.available(now.month % 12 + 1, hemisphere)
+    return {
+        "available_now": spawns.catchable_mask(now.month, now.hour,
+                                               hemisphere)[order],
+        "leaving": (this_month & ~next_month)[order],
+        "arriving": (~this_month & next_month)[order],
+    }
+
+
+def batch_status(collections: dict[str, list[tuple[str, str]]],
+                 hemisphere: str = "nh", now: Optional[datetime] = None,
+                 categories: Optional[list[str]] = None,
+                 names: bool = True) -> dict:
+    """
+    Computes the collection status of every user in a batch.
+
+    Args:
+        collections (dict): User id to its (category, canonical name)
+                            pairs, from `resolve_batch()` or
+                            `load_collections()`.
+        hemisphere (str): "nh" or "sh".
+        now (datetime, optional): The time to check. Defaults to now.
+        categories (list[str], optional): The categories to report.
+                                          Defaults to every category.
+        names (bool, optional): List the uncaught and available item names;
+                                otherwise only count them.
+
+    Returns:
+        (dict): The "month", "hour" and, under "users", per user and
+                category the "caught" and "total" counts plus the
+                "uncaught" items and, for critters, the `AVAILABILITY_KEYS`
+                among them (lists, or counts when `names` is False).
+    """
+
+    main = _main()
+    now = now or datetime.now()
+    users = list(collections)
+    categories = categories or list(main.catalog_engine.stores)
+
+    results: dict[str, dict] = {user: {} for user in users}
+    matrices = caught_matrices(users, collections, categories)
+    for category, caught in matrices.items():
+        store = main.catalog_engine.stores[category]
+        item_names = np.array(store.names, dtype=object)
+
+        uncaught = ~caught
+        caught_counts = caught.sum(axis=1).tolist()
+
+        facts = {"uncaught": uncaught}
+        masks = availability_masks(category, hemisphere, now)
+        for key, mask in (masks or {}).items():
+            facts[key] = uncaught & mask
+
+        if names:
+            listed = {key: [item_names[row].tolist() for row in matrix]
+                      for key, matrix in facts.items()}
+        else:
+            listed = {key: matrix.sum(axis=1).tolist()
+                      for key, matrix in facts.items()}
+
+        for i, user in enumerate(users):
+            results[user][category] = {
+                "caught": caught_counts[i],
+                "total": len(store),
+                **{key: values[i] for key, values in listed.items()},
+            }
+
+    return {"hemisphere": hemisphere, "month": now.month, "hour": now.hour,
+            "users": results}
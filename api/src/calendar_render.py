@@ -0,0 +1,100 @@
+"""
+Draws spawning calendars with matplotlib, for the `render_farm` workers.
+
+This is a leaf module: it imports nothing from the rest of `src`, so the
+render workers (and the forkserver they fork from) load only it, NumPy and
+matplotlib, never the Flask app, its database engines or its threads.
+"""
+from dataclasses import dataclass
+from io import BytesIO
+import numpy as np
+
+DEFAULT_DPI = 300
+MAX_DPI = 600
+
+# Format name to mimetype, for every format matplotlib writes here.
+RENDER_FORMATS: dict[str, str] = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "pdf": "application/pdf",
+    "svg": "image/svg+xml",
+}
+
+MONTH_LABELS = ["January", "February", "March", "April", "May", "June",
+                "July", "August", "September", "October", "November",
+                "December"]
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """
+    One calendar to render.
+
+    Attributes:
+        names (tuple[str, ...]): The row labels.
+        grid (np.ndarray): Shape (len(names), 12); 1 means spawning.
+        title (str): The title of the plot.
+        month (int): The month (1-12) to mark with the red line.
+        dpi (int): The resolution of raster formats.
+        fmt (str): One of `RENDER_FORMATS`.
+    """
+
+    names: tuple[str, ...]
+    grid: np.ndarray
+    title: str
+    month: int
+    dpi: int = DEFAULT_DPI
+    fmt: str = "png"
+
+
+def render_job(job: RenderJob) -> bytes:
+    """
+    Draws a spawning calendar as a heatmap, one row per name and one column
+    per month, and returns the image.
+
+    Args:
+        job (RenderJob): The calendar to render.
+
+    Returns:
+        (bytes): The image, in `job.fmt`.
+    """
+
+    # Imported here so the plotting stack only loads once a chart is drawn
+    # pylint: disable=C0415
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+    # pylint: enable=C0415
+
+    rows = len(job.names)
+    grid = np.asarray(job.grid).reshape(-1, 12)
+
+    figure = Figure(figsize=(12, max(rows, 1) * 0.5))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+
+    if rows:
+        ax.pcolormesh(grid, cmap="Greens", vmin=0, vmax=1,
+                      edgecolors="white", linewidth=0.5)
+    ax.set_xlim(0, 12)
+    ax.set_ylim(max(rows, 1), 0)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    ax.set_xticks(np.arange(12) + 0.5, MONTH_LABELS, rotation=45)
+    ax.set_yticks(np.arange(rows) + 0.5, list(job.names), rotation=0)
+    ax.tick_params(length=0)
+    ax.xaxis.set_ticks_position("top")
+    ax.xaxis.set_label_position("top")
+
+    # Add a red line through the column of the current month
+    ax.axvline(x=job.month - 0.5, color="red", linestyle="-", linewidth=2)
+    legend_elements = [
+        Line2D([0], [0], color="red", lw=2, label="Current Month")]
+    ax.legend(handles=legend_elements,
+              loc="upper right", bbox_to_anchor=(1.2, 1))
+    ax.set_title(job.title, loc="center")
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format=job.fmt, bbox_inches="tight", dpi=job.dpi)
+    return buffer.getvalue()
@@ -0,0 +1,160 @@
+# pylint: disable=E0401
+"""
+Lightweight spawning calendar renderers working straight from spawn grids.
+
+`render_svg()` draws the same calendar as the matplotlib heatmap (one row
+per fish, month columns, the current month marked by a red line and a
+legend) as a small SVG document, and `calendar_grid()` returns the raw grid
+for the front end to draw itself. Neither needs the plotting stack, so both
+take milliseconds; the matplotlib PNG stays available as a high-res export.
+"""
+import json
+from xml.sax.saxutils import escape
+import numpy as np
+
+MONTH_NAMES = ("January", "February", "March", "April", "May", "June",
+               "July", "August", "September", "October", "November",
+               "December")
+
+CELL_WIDTH = 56
+ROW_HEIGHT = 20
+FONT_SIZE = 12
+CHAR_WIDTH = 7  # rough advance of the sans-serif font at FONT_SIZE
+HEADER_HEIGHT = 96
+LEGEND_WIDTH = 130
+
+# The ends of matplotlib's "Greens" colormap, as used by the heatmap.
+EMPTY_COLOUR = "#f7fcf5"
+SPAWN_COLOUR = "#00441b"
+
+
+def _runs(row: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Returns the (start, length) of each run of spawning months in a row.
+    """
+
+    padded = np.concatenate(([0], row.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[::2].tolist(), (edges[1::2] - edges[::2]).tolist()))
+
+
+def calendar_grid(names: list[str], grid: np.ndarray, title: str,
+                  month: int) -> dict:
+    """
+    Returns the calendar as plain data for the front end to draw.
+
+    Args:
+        names (list[str]): The fish names, one per row of `grid`.
+        grid (np.ndarray): Shape (len(names), 12); 1 means spawning.
+        title (str): The title of the calendar.
+        month (int): The month (1-12) to mark as current.
+
+    Returns:
+        (dict): The "title", "months", "current_month", "names" and 0/1
+                "rows" of the calendar.
+    """
+
+    return {
+        "title": title,
+        "months": list(MONTH_NAMES),
+        "current_month": month,
+        "names": list(names),
+        "rows": np.asarray(grid, dtype=np.uint8).reshape(-1, 12).tolist(),
+    }
+
+
+def render_grid_json(names: list[str], grid: np.ndarray, title: str,
+                     month: int) -> bytes:
+    """
+    Returns `calendar_grid()` encoded as compact JSON.
+    """
+
+    return json.dumps(calendar_grid(names, grid, title, month),
+                      separators=(",", ":")).encode("utf-8")
+
+
+def render_svg(names: list[str], grid: np.ndarray, title: str,
+               month: int) -> bytes:
+    """
+    Renders a 0/1 spawn grid in a calendar style as an SVG document.
+
+    Consecutive spawning months are drawn as one rectangle and the cell
+    borders as a single path, so the document stays a few KB.
+
+    Args:
+        names (list[str]): The fish names, one per row of `grid`.
+        grid (np.ndarray): Shape (len(names), 12); 1 means spawning.
+        title (str): The title of the calendar.
+        month (int): The month (1-12) to mark with the red line.
+
+    Returns:
+        (bytes): The SVG document.
+    """
+
+    grid = np.asarray(grid).reshape(-1, 12)
+    rows = len(grid)
+
+    left = max((len(name) for name in names), default=0) * CHAR_WIDTH + 12
+    width = left + 12 * CELL_WIDTH + LEGEND_WIDTH
+    height = HEADER_HEIGHT + max(rows, 1) * ROW_HEIGHT + 8
+    grid_width = 12 * CELL_WIDTH
+    grid_height = rows * ROW_HEIGHT
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+        f'height="{height}" viewBox="0 0 {width} {height}" '
+        f'font-family="sans-serif" font-size="{FONT_SIZE}">',
+        f'<text x="{left + grid_width // 2}" y="18" text-anchor="middle" '
+        f'font-size="{FONT_SIZE + 4}">{escape(title)}</text>',
+    ]
+
+    for index, name in enumerate(MONTH_NAMES):
+        x = left + index * CELL_WIDTH + CELL_WIDTH // 2
+        parts.append(f'<text transform="translate({x},{HEADER_HEIGHT - 6}) '
+                     f'rotate(-45)">{name}</text>')
+
+    parts.append(f'<g transform="translate({left},{HEADER_HEIGHT})">')
+    parts.append(f'<rect width="{grid_width}" height="{grid_height}" '
+                 f'fill="{EMPTY_COLOUR}"/>')
+
+    cells = []
+    for row, values in enumerate(grid):
+        y = row * ROW_HEIGHT
+        cells.extend(f'<rect x="{start * CELL_WIDTH}" y="{y}" '
+                     f'width="{length * CELL_WIDTH}" height="{ROW_HEIGHT}"/>'
+                     for start, length in _runs(values))
+    parts.append(f'<g fill="{SPAWN_COLOUR}">{"".join(cells)}</g>')
+
+    lines = [f"M0 {row * ROW_HEIGHT}H{grid_width}"
+             for row in range(rows + 1)]
+    lines += [f"M{col * CELL_WIDTH} 0V{grid_height}" for col in range(13)]
+    parts.append(f'<path d="{"".join(lines)}" stroke="white" '
+                 f'stroke-width="1"/>')
+
+    # Through the middle of the month's column, like the raster axvline.
+    current = (month - 0.5) * CELL_WIDTH
+    parts.append(f'<line x1="{current}" y1="0" x2="{current}" '
+                 f'y2="{grid_height}" stroke="red" stroke-width="2"/>')
+    parts.append("</g>")
+
+    labels = "".join(
+        f'<text x="{left - 6}" y="{HEADER_HEIGHT + row * ROW_HEIGHT + 14}">'
+        f'{escape(name)}</text>' for row, name in enumerate(names))
+    parts.append(f'<g text-anchor="end">{labels}</g>')
+
+    legend_x = left + grid_width + 12
+    parts.append(f'<line x1="{legend_x}" y1="{HEADER_HEIGHT + 8}" '
+                 f'x2="{legend_x + 24}" y2="{HEADER_HEIGHT + 8}" '
+                 f'stroke="red" stroke-width="2"/>'
+                 f'<text x="{legend_x + 30}" y="{HEADER_HEIGHT + 12}">'
+                 f'Current Month</text>')
+    parts.append("</svg>")
+
+    return "".join(parts).encode("utf-8")
+
+
+# Format name to renderer, for the formats that need no plotting stack.
+RENDERERS = {
+    "svg": render_svg,
+    "json": render_grid_json,
+}
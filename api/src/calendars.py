@@ -0,0 +1,234 @@
+# pylint: disable=E0401
+"""
+On-demand spawning calendar rendering.
+
+Calendars are rendered only when requested and memoised in a bounded LRU
+keyed by (category, hemisphere, uncaught items, month, format), so nothing
+is drawn at import time and concurrent users never share or overwrite image
+files. Every catalog category with a spawn table (fish, insects, sea
+creatures) has calendars.
+
+SVG and grid JSON are built straight from the spawn masks; PNG, WebP and PDF
+are the high-resolution exports, drawn by the matplotlib heatmap on the
+`render_farm` worker processes at a configurable DPI.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+from .calendar_render import DEFAULT_DPI, MAX_DPI, RenderJob
+from .calendar_svg import RENDERERS
+from .metrics import CALENDAR_CACHE, CALENDAR_RENDER_LATENCY
+from .render_farm import render_farm
+
+HEMISPHERES: dict[str, str] = {
+    "nh": "Northern Hemisphere",
+    "sh": "Southern Hemisphere",
+}
+
+# Format name to response mimetype.
+FORMATS: dict[str, str] = {
+    "svg": "image/svg+xml",
+    "json": "application/json",
+    "png": "image/png",
+    "webp": "image/webp",
+    "pdf": "application/pdf",
+}
+
+CACHE_MAX_ENTRIES = int(os.getenv("CALENDAR_CACHE_ENTRIES", "64"))
+CACHE_MAX_BYTES = int(os.getenv("CALENDAR_CACHE_BYTES", str(64 * 2**20)))
+
+CalendarKey = tuple[str, str, frozenset[str], int, str, int]
+
+
+class CalendarCache:
+    """
+    Thread-safe LRU of rendered calendars bounded by entry count and total
+    size in bytes.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[CalendarKey, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: CalendarKey) -> Optional[bytes]:
+        """
+        Returns the cached image for `key`, marking it recently used.
+
+        Args:
+            key (CalendarKey): The calendar key.
+
+        Returns:
+            (bytes | None): The image, or None on a miss.
+        """
+
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def put(self, key: CalendarKey, image: bytes) -> None:
+        """
+        Stores `image` under `key`, evicting least recently used entries
+        until the cache is back within its bounds.
+
+        Args:
+            key (CalendarKey): The calendar key.
+            image (bytes): The rendered image.
+        """
+
+        if len(image) > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+
+            self._entries[key] = image
+            self._size += len(image)
+
+            while (len(self._entries) > self.max_entries
+                   or self._size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        """
+        Empties the cache.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+calendar_cache = CalendarCache()
+
+
+class CalendarRequest(NamedTuple):
+    """
+    One calendar of a `render_calendars()` batch; see `render_calendar()`.
+    """
+
+    hemisphere: str
+    uncaught: Iterable[str]
+    month: Optional[int] = None
+    fmt: str = "png"
+    category: str = "fish"
+    dpi: int = DEFAULT_DPI
+
+
+def render_calendars(requests: list[CalendarRequest]) -> list[bytes]:
+    """
+    Returns a batch of spawning calendars, rendering the cache misses in
+    parallel: matplotlib formats on the render farm, the others inline.
+
+    Args:
+        requests (list[CalendarRequest]): The calendars, e.g. both
+                                          hemispheres for many users.
+
+    Returns:
+        (list[bytes]): The rendered calendars, in request order.
+
+    Raises:
+        KeyError: If a hemisphere, format or category is unknown.
+        ValueError: If a DPI is not within 1 and `MAX_DPI`.
+        RenderQueueFull: If the render farm has no room for the misses.
+    """
+
+    # Imported lazily so the datasheets only load once a calendar is
+    # actually needed.
+    from src import main  # pylint: disable=C0415
+
+    now = datetime.now().month
+    images: list[Optional[bytes]] = [None] * len(requests)
+    misses: dict[CalendarKey, list[int]] = {}
+    jobs: dict[CalendarKey, RenderJob] = {}
+
+    for i, request in enumerate(requests):
+        if request.hemisphere not in HEMISPHERES or \
+                request.fmt not in FORMATS:
+            raise KeyError((request.hemisphere, request.fmt))
+        if not 1 <= request.dpi <= MAX_DPI:
+            raise ValueError(f"dpi must be within 1 and {MAX_DPI}")
+        dpi = DEFAULT_DPI if request.fmt in RENDERERS else request.dpi
+        key = (request.category, request.hemisphere,
+               frozenset(request.uncaught), request.month or now,
+               request.fmt, dpi)
+
+        image = calendar_cache.get(key)
+        CALENDAR_CACHE.inc(result="miss" if image is None else "hit")
+        if image is not None:
+            images[i] = image
+            continue
+        if key in misses:
+            misses[key].append(i)
+            continue
+        misses[key] = [i]
+
+        store = main.catalog_engine.store(request.category)
+        if store is None or store.spawns is None:
+            raise KeyError(request.category)
+        title = f"{store.title} – {HEMISPHERES[request.hemisphere]}"
+        names, grid = store.spawns.month_grid(request.hemisphere, key[2])
+
+        if request.fmt in RENDERERS:
+            labels = {"category": store.category,
+                      "hemisphere": request.hemisphere}
+            with CALENDAR_RENDER_LATENCY.time(format=request.fmt, **labels):
+                images[i] = RENDERERS[request.fmt](names, grid, title,
+                                                   key[3])
+            calendar_cache.put(key, images[i])
+        else:
+            jobs[key] = RenderJob(tuple(names), grid, title, key[3], dpi,
+                                  request.fmt)
+
+    if jobs:
+        rendered = render_farm.render_batch(list(jobs.values()))
+        for key, image in zip(jobs, rendered):
+            calendar_cache.put(key, image)
+            images[misses[key][0]] = image
+
+    for indices in misses.values():
+        for i in indices[1:]:
+            images[i] = images[indices[0]]
+    return images
+
+
+def render_calendar(hemisphere: str, uncaught: Iterable[str],
+                    month: Optional[int] = None, fmt: str = "png",
+                    category: str = "fish", dpi: int = DEFAULT_DPI) -> bytes:
+    """
+    Returns the spawning calendar for the uncaught items of a category and
+    hemisphere, rendering it only on a cache miss.
+
+    Args:
+        hemisphere (str): "nh" or "sh".
+        uncaught (Iterable[str]): The uncaught item names to plot.
+        month (int, optional): The month (1-12) to highlight. Defaults to the
+                               current month.
+        fmt (str): One of `FORMATS`. Defaults to "png".
+        category (str): A catalog category with a spawn table. Defaults to
+                        "fish".
+        dpi (int): The resolution of PNG and WebP images. Defaults to
+                   `DEFAULT_DPI`.
+
+    Returns:
+        (bytes): The rendered calendar.
+
+    Raises:
+        KeyError: If `hemisphere` is not "nh" or "sh", `fmt` is unknown or
+                  `category` has no spawn table.
+        ValueError: If `dpi` is not within 1 and `MAX_DPI`.
+        RenderQueueFull: If the render farm is full.
+    """
+
+    return render_calendars([CalendarRequest(hemisphere, uncaught, month,
+                                             fmt, category, dpi)])[0]
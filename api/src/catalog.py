@@ -0,0 +1,265 @@
+# pylint: disable=E0401
+"""
+One catalog engine for every item category.
+
+Each category is a `CategoryStore`: a columnar view over its datasheet in the
+snapshot, so a column is decoded once, on first use, into a single list and
+nothing is materialised per row. Rows are handed out as `Record` views with
+`__slots__`, which hold only the store and a row number. All categories share
+one `CatalogResolver`, and critter categories carry their `SpawnTable`, so
+calendars and availability work the same for fish, insects and sea
+creatures. Adding a category means adding one entry to `CATEGORIES`.
+"""
+from dataclasses import dataclass
+from typing import Iterator, Optional
+from .names import CatalogResolver, normalise
+from .snapshot import Datasheet, Snapshot
+from .spawn_engine import SpawnTable
+
+
+@dataclass(frozen=True)
+class CategoryInfo:
+    """
+    Static description of a category.
+
+    Attributes:
+        sheet (str): The datasheet key in the snapshot.
+        title (str): The human readable, plural title.
+    """
+
+    sheet: str
+    title: str
+
+
+# Category name (as stored in collections) to its datasheet, in resolution
+# priority order.
+CATEGORIES: dict[str, CategoryInfo] = {
+    "fish": CategoryInfo("fish", "Fish"),
+    "insect": CategoryInfo("insects", "Insects"),
+    "sea creature": CategoryInfo("sea_creatures", "Sea Creatures"),
+    "fossil": CategoryInfo("fossils", "Fossils"),
+    "gyroid": CategoryInfo("gyroids", "Gyroids"),
+    "artwork": CategoryInfo("artwork", "Artwork"),
+}
+
+
+class Record:
+    """
+    A read-only view of one datasheet row.
+    """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "CategoryStore", row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, column: str) -> Optional[str]:
+        return self.store.column(column)[self.row]
+
+    def get(self, column: str,
+            default: Optional[str] = None) -> Optional[str]:
+        """
+        Returns a cell, or `default` for unknown columns and missing cells.
+        """
+
+        if column not in self.store.sheet:
+            return default
+        value = self[column]
+        return default if value is None else value
+
+    @property
+    def name(self) -> str:
+        """
+        Returns:
+            (str): The item name.
+        """
+
+        return self["Name"]
+
+    def to_json(self, fields: Optional[list[str]] = None) -> dict:
+        """
+        Returns the row as json.
+
+        Args:
+            fields (list[str], optional): The columns to include. Defaults to
+                                          every column.
+
+        Returns:
+            (dict): Column name to value, None for missing cells.
+        """
+
+        return {column: self[column]
+                for column in (fields or self.store.columns)}
+
+    def __repr__(self) -> str:
+        return f"<Record({self.store.category}: {self.name})>"
+
+
+class CategoryStore:
+    """
+    The items of one category, stored column by column.
+    """
+
+    def __init__(self, category: str, info: CategoryInfo, sheet: Datasheet,
+                 spawns: Optional[SpawnTable] = None):
+        self.category = category
+        self.title = info.title
+        self.sheet = sheet
+        self.spawns = spawns
+
+        # Variants (genuine / fake artwork, gyroid colours) share a name;
+        # every name keeps its first position.
+        self._rows: dict[str, list[int]] = {}
+        for row, name in enumerate(sheet.names):
+            if name is not None:
+                self._rows.setdefault(name, []).append(row)
+        self.names: list[str] = list(self._rows)
+
+    @property
+    def slug(self) -> str:
+        """
+        Returns:
+            (str): The category as used in URLs, e.g. "sea_creature".
+        """
+
+        return self.category.replace(" ", "_")
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        Returns:
+            (list[str]): The datasheet columns.
+        """
+
+        return self.sheet.columns
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    def __iter__(self) -> Iterator[Record]:
+        return (Record(self, rows[0]) for rows in self._rows.values())
+
+    def column(self, column: str) -> list[Optional[str]]:
+        """
+        Returns a whole column, one value per datasheet row.
+
+        Raises:
+            KeyError: If the column does not exist.
+        """
+
+        if column not in self.sheet:
+            raise KeyError(column)
+        return self.sheet[column]
+
+    def record(self, name: str) -> Optional[Record]:
+        """
+        Returns the first row of an item.
+
+        Args:
+            name (str): The canonical item name.
+
+        Returns:
+            (Record | None): The row, or None for unknown names.
+        """
+
+        rows = self._rows.get(name)
+        return Record(self, rows[0]) if rows else None
+
+    def variants(self, name: str) -> list[Record]:
+        """
+        Returns every row of an item, e.g. the genuine and fake artwork.
+
+        Args:
+            name (str): The canonical item name.
+
+        Returns:
+            (list[Record]): The rows, empty for unknown names.
+        """
+
+        return [Record(self, row) for row in self._rows.get(name, ())]
+
+
+class Catalog:
+    """
+    Every category store plus the shared name index.
+    """
+
+    def __init__(self, stores: dict[str, CategoryStore],
+                 aliases: Optional[dict[str, str]] = None):
+        self.stores = stores
+        self.resolver = CatalogResolver(
+            {category: store.names for category, store in stores.items()},
+            aliases)
+        self._slugs: dict[str, str] = {}
+        for category, store in stores.items():
+            for key in (category, store.slug, CATEGORIES[category].sheet):
+                self._slugs[normalise(key)] = category
+
+    def __iter__(self) -> Iterator[CategoryStore]:
+        return iter(self.stores.values())
+
+    def store(self, category: str) -> Optional[CategoryStore]:
+        """
+        Returns a category store by name, URL slug or datasheet key, e.g.
+        "sea creature", "sea_creature" or "sea_creatures".
+
+        Args:
+            category (str): The category.
+
+        Returns:
+            (CategoryStore | None): The store, or None if unknown.
+        """
+
+        resolved = self._slugs.get(normalise(category))
+        return self.stores[resolved] if resolved else None
+
+    def names(self) -> dict[str, list[str]]:
+        """
+        Returns:
+            (dict[str, list[str]]): Category to its item names.
+        """
+
+        return {category: store.names
+                for category, store in self.stores.items()}
+
+    def lookup(self, name: str) -> Optional[Record]:
+        """
+        Resolves a user supplied name in any category.
+
+        Args:
+            name (str): The user supplied name.
+
+        Returns:
+            (Record | None): The item's first row, or None if unknown.
+        """
+
+        hit = self.resolver.resolve(name)
+        return self.stores[hit[0]].record(hit[1]) if hit else None
+
+
+def build_catalog(snapshot: Snapshot,
+                  aliases: Optional[dict[str, str]] = None) -> Catalog:
+    """
+    Builds the catalog over the datasheets of a snapshot.
+
+    Args:
+        snapshot (Snapshot): The loaded snapshot.
+        aliases (dict[str, str], optional): Alternative spelling to
+                                            canonical name.
+
+    Returns:
+        (Catalog): The catalog.
+    """
+
+    stores = {
+        category: CategoryStore(category, info,
+                                snapshot.datasheets[info.sheet],
+                                snapshot.spawns.get(info.sheet))
+        for category, info in CATEGORIES.items()
+        if info.sheet in snapshot.datasheets
+    }
+    return Catalog(stores, aliases)
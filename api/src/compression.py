@@ -0,0 +1,103 @@
+# pylint: disable=E0401
+"""
+Negotiated response compression.
+
+Text responses of at least `COMPRESS_MIN_SIZE` bytes are compressed with
+brotli (when the `brotli` package is installed) or gzip, whichever the
+client prefers. Streamed responses have no size up front and are always
+compressed, chunk by chunk, so they stay streamed. Responses that already
+carry a `Content-Encoding` (e.g. from `response_cache`) are left alone.
+"""
+import gzip
+import os
+import zlib
+from typing import Iterable, Iterator
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+COMPRESSIBLE = ("application/json", "image/svg+xml", "text/")
+
+
+def _stream_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED,
+                                  16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _stream_brotli(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = brotli.Compressor(quality=min(COMPRESS_LEVEL, 11))
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _compressible(response: Response) -> bool:
+    return (response.status_code == 200
+            and not response.direct_passthrough
+            and "Content-Encoding" not in response.headers
+            and response.mimetype is not None
+            and response.mimetype.startswith(COMPRESSIBLE))
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compresses `response` in place if the current request accepts it.
+
+    Args:
+        response (Response): The outgoing response.
+
+    Returns:
+        (Response): The same response, possibly compressed.
+    """
+
+    if not _compressible(response):
+        return response
+
+    offered = (["br"] if brotli is not None else []) + ["gzip"]
+    encoding = request.accept_encodings.best_match(offered)
+    response.vary.add("Accept-Encoding")
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        stream = _stream_brotli if encoding == "br" else _stream_gzip
+        response.response = stream(response.iter_encoded())
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(
+            brotli.compress(body, quality=min(COMPRESS_LEVEL, 11))
+            if encoding == "br" else
+            gzip.compress(body, COMPRESS_LEVEL, mtime=0))
+
+    response.headers["Content-Encoding"] = encoding
+    if response.get_etag()[0]:  # the entity changed, so must its tag
+        tag, weak = response.get_etag()
+        response.set_etag(f"{tag}-{encoding}", weak)
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Installs response compression on the app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    app.after_request(compress_response)
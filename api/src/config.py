@@ -18,7 +18,10 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
-from .database import db
+from .compression import init_compression
+from .database import init_database
+from .fast_json import FastJSONProvider
+from .metrics import init_metrics
 
 load_dotenv()
 
@@ -29,12 +32,13 @@ def config_app():
     """
 
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
 
     CORS(app)
 
     app.config['SECRET_KEY'] = os.getenv("SECRET_KEY")
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///mydatabase.db"
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-    db.init_app(app)
+    db = init_database(app)
+    init_metrics(app)
+    init_compression(app)
     return (app, db)
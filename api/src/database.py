@@ -1,7 +1,258 @@
 # pylint: disable=E0401
 """
-Intantiates the database.
+Intantiates the database and configures the storage layer.
+
+`DATABASE_URL` picks the primary database: SQLite by default, or Postgres
+(`postgres://` URLs are accepted too). File-backed SQLite connections are
+switched to WAL journaling with the `SQLITE_PRAGMAS` on connect, so readers
+keep going while an ingest writes. Network databases get a sized, recycled,
+pre-pinged connection pool.
+
+`DATABASE_READ_URL` optionally names a read replica (or, for SQLite, a
+read-only snapshot such as `sqlite:///file:snap.db?mode=ro&uri=true`).
+Selects issued inside `replica_reads()` go there; everything else, and any
+select issued while the session is flushing, stays on the primary.
 """
+import os
+import sqlite3
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+
+DEFAULT_DATABASE_URL = "sqlite:///mydatabase.db"
+REPLICA_BIND = "replica"
+
+# Applied to every new SQLite connection, in order. A negative cache_size is
+# in KiB.
+SQLITE_PRAGMAS: dict[str, str] = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": str(-int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "temp_store": "MEMORY",
+}
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "15"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+class RoutingSession(Session):
+    """
+    Session sending plain selects to the read replica inside
+    `replica_reads()`.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _replica_reads.get() and not self._flushing \
+                and isinstance(clause, Select):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause, bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+@contextmanager
+def replica_reads() -> Iterator[None]:
+    """
+    Routes the selects issued in the block to the read replica, if one is
+    configured. Only use it where slightly stale data is acceptable.
+    """
+
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def normalise_url(url: str) -> str:
+    """
+    Accepts the `postgres://` scheme some hosts hand out, which SQLAlchemy
+    no longer does.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        (str): The URL SQLAlchemy understands.
+    """
+
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def engine_options(url: str) -> dict:
+    """
+    Returns the engine options for a database URL.
+
+    Args:
+        url (str): The database URL.
+
+    Returns:
+        (dict): `create_engine()` keyword arguments.
+    """
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:") or \
+                "mode=memory" in str(parsed):
+            return {}  # Flask-SQLAlchemy shares one in-memory connection
+        return {"pool_size": DB_POOL_SIZE,
+                "max_overflow": DB_MAX_OVERFLOW,
+                "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT}}
+
+    return {"pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "pool_pre_ping": True}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    del connection_record
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            try:
+                cursor.execute(f"PRAGMA {name}={value}")
+            except sqlite3.DatabaseError:  # e.g. WAL on a read-only file
+                pass
+    finally:
+        cursor.close()
+
+
+def init_database(app: Flask) -> SQLAlchemy:
+    """
+    Configures the primary database, the optional read replica and the
+    SQLite pragmas, and binds `db` to the app.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Returns:
+        (SQLAlchemy): The application database.
+    """
+
+    url = normalise_url(os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    app.config["SQLALCHEMY_DATABASE_URI"] = url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(url)
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    read_url = os.getenv("DATABASE_READ_URL")
+    if read_url:
+        read_url = normalise_url(read_url)
+        app.config["SQLALCHEMY_BINDS"] = {
+            REPLICA_BIND: {"url": read_url, **engine_options(read_url)}}
+
+    db.init_app(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite" and not event.contains(
+                    engine, "connect", _apply_sqlite_pragmas):
+                event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return db
+
+
+def sqlite_settings(engine: Engine) -> dict[str, str]:
+    """
+    Reads back the `SQLITE_PRAGMAS` in effect on a connection of `engine`.
+
+    Args:
+        engine (Engine): A SQLite engine.
+
+    Returns:
+        (dict[str, str]): Pragma name to its current value.
+    """
+
+    with engine.connect() as conn:
+        return {name: str(conn.exec_driver_sql(f"PRAGMA {name}").scalar())
+                for name in SQLITE_PRAGMAS}
+
+
+def upgrade_schema(database: SQLAlchemy) -> list[str]:
+    """
+    Adds the nullable columns and indexes that the models define but
+    existing tables lack, and widens string columns declared longer than
+    they were created.
+
+    `create_all()` only creates missing tables, so databases created before
+    a column was added would otherwise fail on every query touching it, and
+    Postgres would reject values longer than the old column length. SQLite
+    does not enforce lengths, so its columns are left as they are.
+
+    Args:
+        database (SQLAlchemy): The application database.
+
+    Returns:
+        (list[str]): The "table.column" and index names that were added or
+                     widened.
+    """
+
+    inspector = inspect(database.engine)
+    tables = set(inspector.get_table_names())
+    dialect = database.engine.dialect
+    preparer = dialect.identifier_preparer
+    added = []
+
+    with database.engine.begin() as conn:
+        for table in database.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {c["name"]: c["type"]
+                       for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                column_type = column.type.compile(dialect)
+                if column.name in present:
+                    if dialect.name != "sqlite" and _is_wider(
+                            column.type, present[column.name]):
+                        conn.execute(text(
+                            f"ALTER TABLE {preparer.quote(table.name)} "
+                            f"ALTER COLUMN {preparer.quote(column.name)} "
+                            f"TYPE {column_type}"))
+                        added.append(f"{table.name}.{column.name}")
+                    continue
+                if not column.nullable:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN "
+                    f"{preparer.quote(column.name)} {column_type}"))
+                added.append(f"{table.name}.{column.name}")
+
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    added.append(index.name)
+
+    return added
+
+
+def _is_wider(declared, existing) -> bool:
+    """
+    Whether a declared string column is longer than the existing one.
+
+    Args:
+        declared (TypeEngine): The column type on the model.
+        existing (TypeEngine): The column type reflected from the database.
+
+    Returns:
+        (bool): True if both have a length and the declared one is larger.
+    """
 
-db = SQLAlchemy()
+    declared_length = getattr(declared, "length", None)
+    existing_length = getattr(existing, "length", None)
+    return (declared_length is not None and existing_length is not None
+            and declared_length > existing_length)
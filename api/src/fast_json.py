@@ -0,0 +1,137 @@
+# pylint: disable=E0401
+"""
+Fast and streaming JSON encoding.
+
+`dumps` uses orjson when it is installed and the standard library otherwise;
+both produce compact UTF-8 bytes. `FastJSONProvider` routes Flask's
+`jsonify` through it. `stream_json_array` encodes large lists chunk by chunk,
+so a big payload never exists in memory as one dict or one string, and
+`stream_query` feeds it from a server-side cursor with `yield_per`.
+"""
+import json
+from typing import Any, Callable, Iterable, Iterator, Optional
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+from flask_sqlalchemy import SQLAlchemy
+
+try:
+    import orjson
+except ImportError:  # orjson is optional
+    orjson = None
+
+# Rows encoded per yielded chunk; also the ORM `yield_per` batch size.
+CHUNK_ROWS = 200
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> bytes:
+    """
+    Serialises `obj` to compact JSON.
+
+    Args:
+        obj: Any JSON serialisable object.
+        sort_keys (bool, optional): Whether to sort object keys.
+
+    Returns:
+        (bytes): The UTF-8 encoded JSON.
+    """
+
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+        except TypeError:  # e.g. non-str keys, which json coerces
+            pass
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider encoding with `dumps`.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs or orjson is None:
+            return super().dumps(obj, **kwargs)
+        return dumps(obj, sort_keys=self.sort_keys).decode("utf-8")
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps(obj, sort_keys=self.sort_keys) + b"\n",
+            mimetype=self.mimetype)
+
+
+def stream_json_array(key: str, items: Iterable[Any],
+                      extra: Optional[dict] = None,
+                      chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Encodes `{key: [*items], **extra}` incrementally.
+
+    Args:
+        key (str): The key holding the array.
+        items (Iterable): The JSON serialisable array items.
+        extra (dict, optional): Further top-level keys.
+        chunk_rows (int, optional): Items encoded per yielded chunk.
+
+    Returns:
+        (Iterator[bytes]): The JSON document in chunks.
+    """
+
+    yield b"{" + dumps(key) + b":["
+    batch: list[bytes] = []
+    first = True
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= chunk_rows:
+            yield (b"" if first else b",") + b",".join(batch)
+            batch, first = [], False
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]"
+    for name, value in (extra or {}).items():
+        yield b"," + dumps(name) + b":" + dumps(value)
+    yield b"}"
+
+
+def stream_query(db: SQLAlchemy, statement,
+                 to_json: Callable[[Any], Any],
+                 yield_per: int = CHUNK_ROWS) -> Iterator[Any]:
+    """
+    Iterates the JSON of every row of an ORM select, fetching `yield_per`
+    rows at a time instead of loading the whole result.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        statement (Select): E.g. `select(Fish).order_by(Fish.id)`.
+        to_json (Callable): Converts one entity to JSON.
+        yield_per (int, optional): The cursor batch size.
+
+    Returns:
+        (Iterator): The JSON of each row.
+    """
+
+    result = db.session.execute(
+        statement.execution_options(yield_per=yield_per))
+    try:
+        for row in result.scalars():
+            yield to_json(row)
+    finally:
+        result.close()
+
+
+def stream_response(chunks: Iterable[bytes],
+                    mimetype: str = "application/json") -> Response:
+    """
+    Wraps encoded chunks in a streamed response; `compression` compresses it
+    on the fly when the client accepts it.
+
+    Args:
+        chunks (Iterable[bytes]): E.g. from `stream_json_array()`.
+        mimetype (str, optional): The content type.
+
+    Returns:
+        (Response): The streamed response.
+    """
+
+    return Response(chunks, mimetype=mimetype)
@@ -0,0 +1,263 @@
+# pylint: disable=E0401
+"""
+Filtered, sorted, paginated and field-projected queries over `Fish`.
+
+Filters become indexed WHERE clauses, availability filters a bitwise AND on
+the month masks, and pagination is keyset based: the cursor carries the sort
+value and id of the last row, so every page is one index range scan no
+matter how deep the client pages. Rows with no value in a nullable sort
+column (`price`) come last in either direction. Only the requested columns
+are selected.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, or_, select
+from werkzeug.datastructures import MultiDict
+from .images import icon_url
+from .models import Fish
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# JSON field name (as in `Fish.to_json`) to column name.
+FIELDS: dict[str, str] = {
+    "id": "id",
+    "name": "name",
+    "imageUrl": "image_url",
+    "iconUrl": "image_digest",
+    "rarity": "rarity",
+    "price": "price",
+    "location": "location",
+    "size": "size",
+    "time": "time",
+    "nhMonths": "nh_months",
+    "shMonths": "sh_months",
+}
+
+# JSON fields derived from their column's value, as in `Fish.to_json`.
+DERIVED: dict[str, Callable] = {
+    "iconUrl": icon_url,
+}
+
+SORTABLE: tuple[str, ...] = ("id", "name", "price", "location", "size",
+                             "rarity")
+
+# Query parameters that select the query API over the cached full list.
+QUERY_PARAMS = frozenset(["location", "size", "rarity", "min_price",
+                          "max_price", "month", "hemisphere", "sort",
+                          "limit", "cursor", "fields"])
+
+
+class QueryError(ValueError):
+    """
+    Raised for invalid query parameters.
+    """
+
+
+@dataclass(frozen=True)
+class FishQuery:
+    """
+    A parsed fish query.
+    """
+
+    locations: tuple[str, ...] = ()
+    sizes: tuple[str, ...] = ()
+    rarities: tuple[str, ...] = ()
+    min_price: Optional[int] = None
+    max_price: Optional[int] = None
+    month: Optional[int] = None
+    hemisphere: str = "nh"
+    sort: str = "id"
+    descending: bool = False
+    limit: int = DEFAULT_LIMIT
+    after: Optional[tuple] = None
+    fields: tuple[str, ...] = field(default_factory=lambda: tuple(FIELDS))
+
+
+def _split(args: MultiDict, name: str) -> tuple[str, ...]:
+    """
+    Returns the values of a repeatable, comma separated parameter.
+    """
+
+    return tuple(value.strip() for raw in args.getlist(name)
+                 for value in raw.split(",") if value.strip())
+
+
+def _int(args: MultiDict, name: str, low: Optional[int] = None,
+         high: Optional[int] = None) -> Optional[int]:
+    """
+    Returns an optional integer parameter, checked against its bounds.
+    """
+
+    raw = args.get(name)
+    if raw is None or raw == "":
+        return None
+    try:
+        value = int(raw)
+    except ValueError as e:
+        raise QueryError(f"'{name}' must be an integer.") from e
+    if (low is not None and value < low) or \
+            (high is not None and value > high):
+        raise QueryError(f"'{name}' must be between {low} and {high}.")
+    return value
+
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    """
+    Returns the opaque cursor pointing after a row.
+    """
+
+    raw = json.dumps([sort, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Returns the (sort value, id) a cursor points after.
+
+    Raises:
+        QueryError: If the cursor is malformed or from another sort order.
+    """
+
+    try:
+        cursor_sort, value, row_id = json.loads(
+            base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise QueryError("Invalid 'cursor'.") from e
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise QueryError("The 'cursor' belongs to another sort order.")
+    return (value, row_id)
+
+
+def parse_fish_query(args: MultiDict) -> FishQuery:
+    """
+    Parses the query string of a fish query.
+
+    Args:
+        args (MultiDict): The request arguments.
+
+    Returns:
+        (FishQuery): The query.
+
+    Raises:
+        QueryError: If a parameter is invalid.
+    """
+
+    sort = args.get("sort", "id")
+    descending = sort.startswith("-")
+    sort = sort.lstrip("-")
+    if sort not in SORTABLE:
+        raise QueryError(f"'sort' must be one of {', '.join(SORTABLE)}.")
+
+    hemisphere = args.get("hemisphere", "nh").lower()
+    if hemisphere not in ("nh", "sh"):
+        raise QueryError("'hemisphere' must be 'nh' or 'sh'.")
+
+    fields = _split(args, "fields") or tuple(FIELDS)
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown:
+        raise QueryError(f"Unknown fields: {', '.join(unknown)}.")
+
+    cursor = args.get("cursor")
+
+    return FishQuery(
+        locations=_split(args, "location"),
+        sizes=_split(args, "size"),
+        rarities=_split(args, "rarity"),
+        min_price=_int(args, "min_price"),
+        max_price=_int(args, "max_price"),
+        month=_int(args, "month", 1, 12),
+        hemisphere=hemisphere,
+        sort=sort,
+        descending=descending,
+        limit=_int(args, "limit", 1, MAX_LIMIT) or DEFAULT_LIMIT,
+        after=decode_cursor(cursor, args.get("sort", "id")) if cursor
+        else None,
+        fields=tuple(dict.fromkeys(fields)),
+    )
+
+
+def run_fish_query(db: SQLAlchemy, query: FishQuery) -> dict:
+    """
+    Runs a fish query.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        query (FishQuery): The query.
+
+    Returns:
+        (dict): The matching "fish" (only the requested fields) and the
+                "nextCursor", None on the last page.
+    """
+
+    table = Fish.__table__
+    sort_column = table.c[FIELDS[query.sort]]
+
+    columns = [table.c[FIELDS[name]] for name in query.fields]
+    statement = select(*columns, table.c.id.label("_id"),
+                       sort_column.label("_sort"))
+
+    conditions = []
+    if query.locations:
+        conditions.append(table.c.location.in_(query.locations))
+    if query.sizes:
+        conditions.append(table.c.size.in_(query.sizes))
+    if query.rarities:
+        conditions.append(table.c.rarity.in_(query.rarities))
+    if query.min_price is not None:
+        conditions.append(table.c.price >= query.min_price)
+    if query.max_price is not None:
+        conditions.append(table.c.price <= query.max_price)
+    if query.month is not None:
+        mask = table.c[f"{query.hemisphere}_month_mask"]
+        conditions.append(mask.op("&")(1 << (query.month - 1)) != 0)
+
+    if query.after is not None:
+        value, row_id = query.after
+        after_id = table.c.id < row_id if query.descending \
+            else table.c.id > row_id
+        if value is None:
+            # Past the last non-null value: only nulls are left.
+            conditions.append(and_(sort_column.is_(None), after_id))
+        else:
+            after_value = sort_column < value if query.descending \
+                else sort_column > value
+            branches = [after_value, and_(sort_column == value, after_id)]
+            if sort_column.nullable:
+                branches.append(sort_column.is_(None))
+            conditions.append(or_(*branches))
+
+    if conditions:
+        statement = statement.where(and_(*conditions))
+
+    order = [sort_column, table.c.id]
+    if query.descending:
+        order = [column.desc() for column in order]
+    if sort_column.nullable:
+        order.insert(0, sort_column.is_(None))  # NULLS LAST, on any backend
+    statement = statement.order_by(*order).limit(query.limit + 1)
+
+    rows = db.session.execute(statement).all()
+    page = rows[:query.limit]
+
+    next_cursor = None
+    if len(rows) > query.limit:
+        last = page[-1]
+        next_cursor = encode_cursor(
+            ("-" if query.descending else "") + query.sort,
+            last._sort, last._id)  # pylint: disable=W0212
+
+    fish = []
+    for row in page:
+        item = dict(zip(query.fields, row[:len(query.fields)]))
+        for name in DERIVED.keys() & item.keys():
+            item[name] = DERIVED[name](item[name])
+        fish.append(item)
+
+    return {
+        "fish": fish,
+        "nextCursor": next_cursor,
+    }
@@ -0,0 +1,414 @@
+# pylint: disable=E0401
+"""
+Local, content-addressed cache of the remote critter images.
+
+Each remote image is downloaded once (during the ingest / sync), checked to
+really be an image and stored under the SHA-256 of its bytes. Resized WebP
+variants (PNG where Pillow lacks WebP) are rendered from that original, so a
+digest and size always name the same bytes and can be served with immutable
+cache headers. The `CachedImage` table maps each source URL to its digest,
+and `Fish.image_digest` links the fish to it.
+
+The cache directory is kept under `IMAGE_CACHE_MAX_BYTES` by evicting the
+least recently used files. Evicted variants are re-rendered, and evicted
+originals re-downloaded, the next time they are asked for.
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Optional
+import requests
+from flask_sqlalchemy import SQLAlchemy
+from PIL import Image, UnidentifiedImageError, features
+from requests.adapters import HTTPAdapter
+from sqlalchemy import bindparam, select, update
+from urllib3.util.retry import Retry
+from .models import CachedImage, Fish
+from .upsert import upsert_rows
+
+STATIC_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR",
+                            os.path.join(STATIC_DIR, "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES",
+                                      str(64 * 1024 * 1024)))
+IMAGE_MAX_WORKERS = int(os.getenv("IMAGE_MAX_WORKERS", "8"))
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "10"))
+MAX_SOURCE_BYTES = 5 * 1024 * 1024
+
+VARIANT_SIZES: tuple[int, ...] = (64, 128, 256)
+ICON_SIZE = 128
+VARIANT_FORMAT = "webp" if features.check("webp") else "png"
+MIMETYPES = {"webp": "image/webp", "png": "image/png"}
+
+# Serving refreshes a file's LRU timestamp at most this often.
+TOUCH_INTERVAL = 3600
+
+
+class ImageError(ValueError):
+    """
+    Raised when downloaded bytes are not a usable image.
+    """
+
+
+def icon_url(digest: Optional[str], size: int = ICON_SIZE) -> Optional[str]:
+    """
+    Returns the local URL of an image variant.
+
+    Args:
+        digest (str, optional): The image digest.
+        size (int): One of `VARIANT_SIZES`.
+
+    Returns:
+        (str | None): E.g. "/images/<digest>-128.webp", or None without a
+                      digest.
+    """
+
+    if not digest:
+        return None
+    return f"/images/{digest}-{size}.{VARIANT_FORMAT}"
+
+
+class ImageCache:
+    """
+    The content-addressed image files, bounded in size.
+    """
+
+    def __init__(self, root: str = IMAGE_CACHE_DIR,
+                 max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name)
+
+    def original_path(self, digest: str) -> str:
+        """
+        Returns:
+            (str): Where the original image of `digest` is stored.
+        """
+
+        return self._path(digest)
+
+    def variant_path(self, digest: str, size: int) -> str:
+        """
+        Returns:
+            (str): Where the `size` variant of `digest` is stored.
+        """
+
+        return self._path(f"{digest}-{size}.{VARIANT_FORMAT}")
+
+    def has_original(self, digest: str) -> bool:
+        """
+        Returns:
+            (bool): Whether the original of `digest` is cached.
+        """
+
+        return os.path.exists(self.original_path(digest))
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(handle, "wb") as file:
+            file.write(data)
+        os.replace(temporary, path)
+
+    def store(self, data: bytes) -> str:
+        """
+        Stores an original image and renders its variants.
+
+        Args:
+            data (bytes): The downloaded image.
+
+        Returns:
+            (str): The image digest.
+
+        Raises:
+            ImageError: If `data` is not an image Pillow can read.
+        """
+
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image.verify()
+        except (UnidentifiedImageError, Image.DecompressionBombError,
+                OSError, SyntaxError) as e:
+            raise ImageError(f"Not an image: {e}") from e
+
+        digest = sha256(data).hexdigest()
+        if not self.has_original(digest):
+            self._write(self.original_path(digest), data)
+        for size in VARIANT_SIZES:
+            self.variant(digest, size)
+        return digest
+
+    def variant(self, digest: str, size: int) -> Optional[str]:
+        """
+        Returns the path of a variant, rendering it from the original if it
+        is not cached.
+
+        Args:
+            digest (str): The image digest.
+            size (int): One of `VARIANT_SIZES`.
+
+        Returns:
+            (str | None): The variant's path, or None if the original is not
+                          cached either.
+        """
+
+        path = self.variant_path(digest, size)
+        try:
+            if os.stat(path).st_mtime < time.time() - TOUCH_INTERVAL:
+                os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+
+        try:
+            with Image.open(self.original_path(digest)) as image:
+                image = image.convert("RGBA")
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+                buffer = io.BytesIO()
+                if VARIANT_FORMAT == "webp":
+                    image.save(buffer, "WEBP", quality=85, method=4)
+                else:
+                    image.save(buffer, "PNG", optimize=True)
+        except FileNotFoundError:
+            return None
+
+        self._write(path, buffer.getvalue())
+        return path
+
+    def usage(self) -> int:
+        """
+        Returns:
+            (int): The bytes used by the cached files.
+        """
+
+        return sum(size for _, size, _ in self._files())
+
+    def _files(self) -> list[tuple[str, int, float]]:
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def evict(self) -> int:
+        """
+        Deletes the least recently used files until the cache is back under
+        90% of `max_bytes`.
+
+        Returns:
+            (int): The number of files deleted.
+        """
+
+        with self._lock:
+            files = self._files()
+            used = sum(size for _, size, _ in files)
+            if used <= self.max_bytes:
+                return 0
+
+            deleted = 0
+            for path, size, _ in sorted(files, key=lambda file: file[2]):
+                if used <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                used -= size
+                deleted += 1
+            return deleted
+
+
+image_cache = ImageCache()
+
+
+def make_image_session(
+        pool_size: int = IMAGE_MAX_WORKERS) -> requests.Session:
+    """
+    Creates a session for image downloads. Unlike the Nookipedia session it
+    sends no API key, as images live on other hosts.
+
+    Args:
+        pool_size (int): The maximum number of pooled connections per host.
+
+    Returns:
+        (requests.Session): The configured session.
+    """
+
+    retry = Retry(total=2, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(["GET"]), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download_image(url: str, session: requests.Session) -> tuple[bytes, str]:
+    """
+    Downloads an image, refusing anything over `MAX_SOURCE_BYTES`.
+
+    Args:
+        url (str): The image URL.
+        session (requests.Session): The session to use.
+
+    Returns:
+        (tuple(bytes, str)): The image and its content type.
+
+    Raises:
+        requests.RequestException: If the download fails.
+        ImageError: If the image is too large.
+    """
+
+    with session.get(url, timeout=IMAGE_TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) > MAX_SOURCE_BYTES:
+                raise ImageError("Image too large.")
+        return (bytes(data), response.headers.get("Content-Type", ""))
+
+
+def cache_images(db: SQLAlchemy, urls: list[str],
+                 session: Optional[requests.Session] = None,
+                 cache: ImageCache = image_cache,
+                 max_workers: int = IMAGE_MAX_WORKERS
+                 ) -> tuple[dict[str, str], dict[str, str]]:
+    """
+    Makes sure every URL is in the image cache, downloading only those that
+    are not (or whose files were evicted).
+
+    Args:
+        db (SQLAlchemy): The application database.
+        urls (list[str]): The image URLs.
+        session (requests.Session, optional): The session to use.
+        cache (ImageCache, optional): The image cache.
+        max_workers (int): The maximum number of downloads in flight.
+
+    Returns:
+        (tuple(dict[str, str], dict[str, str])): URL to digest for every
+            cached URL, and URL to error message for every failed one.
+    """
+
+    urls = list(dict.fromkeys(url for url in urls if url))
+    digests = {
+        url: digest for url, digest in db.session.execute(
+            select(CachedImage.url, CachedImage.digest)
+            .where(CachedImage.url.in_(urls)))
+        if cache.has_original(digest)
+    }
+    missing = [url for url in urls if url not in digests]
+    failures: dict[str, str] = {}
+    if not missing:
+        return (digests, failures)
+
+    session = session or make_image_session()
+    fetched_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def fetch(url: str) -> dict:
+        data, content_type = download_image(url, session)
+        return {"url": url, "digest": cache.store(data),
+                "content_type": content_type[:40], "size": len(data),
+                "fetched_at": fetched_at}
+
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {url: pool.submit(fetch, url) for url in missing}
+        for url, future in futures.items():
+            try:
+                rows.append(future.result())
+            except (requests.RequestException, ImageError) as e:
+                failures[url] = str(e)
+
+    if rows:
+        upsert_rows(db, CachedImage, rows,
+                    ("url", "digest", "content_type", "size", "fetched_at"),
+                    key="url")
+        digests.update((row["url"], row["digest"]) for row in rows)
+    cache.evict()
+    return (digests, failures)
+
+
+def cache_fish_images(db: SQLAlchemy,
+                      session: Optional[requests.Session] = None,
+                      cache: ImageCache = image_cache) -> dict:
+    """
+    Caches the image of every fish and links `Fish.image_digest` to it.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        session (requests.Session, optional): The session to use.
+        cache (ImageCache, optional): The image cache.
+
+    Returns:
+        (dict): The number of fish whose icon was "linked" (changed) and the
+                per URL download "failures".
+    """
+
+    table = Fish.__table__
+    fish = db.session.execute(
+        select(table.c.id, table.c.image_url, table.c.image_digest)).all()
+    digests, failures = cache_images(
+        db, [row.image_url for row in fish], session, cache)
+
+    links = [{"b_id": row.id, "image_digest": digests[row.image_url]}
+             for row in fish
+             if row.image_url in digests
+             and row.image_digest != digests[row.image_url]]
+    try:
+        if links:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam("b_id"))
+                .values(image_digest=bindparam("image_digest")), links)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"linked": len(links), "failures": failures}
+
+
+def serve_path(db: SQLAlchemy, digest: str, size: int,
+               cache: ImageCache = image_cache) -> Optional[str]:
+    """
+    Returns the file of an image variant, re-rendering or re-downloading it
+    if it was evicted.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        digest (str): The image digest.
+        size (int): One of `VARIANT_SIZES`.
+        cache (ImageCache, optional): The image cache.
+
+    Returns:
+        (str | None): The variant's path, or None for unknown images.
+    """
+
+    path = cache.variant(digest, size)
+    if path is not None:
+        return path
+
+    url = db.session.execute(select(CachedImage.url).where(
+        CachedImage.digest == digest).limit(1)).scalar()
+    if url is None:
+        return None
+    digests, _ = cache_images(db, [url], cache=cache)
+    if digests.get(url) != digest:  # the source has changed since
+        return None
+    return cache.variant(digest, size)
@@ -0,0 +1,429 @@
+# pylint: disable=E0401
+"""
+In-process background jobs with a persistent job table.
+
+`JobQueue.submit()` records a job in the `Job` table and hands it to a small
+thread pool, returning its id straight away; clients then poll
+`/jobs/<id>` for the status, progress and result. A queued or running job
+with the same kind and parameters is returned instead of queueing a
+duplicate.
+
+Several processes (gunicorn workers) may share the job table. A worker
+claims a queued job with one conditional update, so each job runs exactly
+once, and records itself as the job's `owner`. While a job runs, its owner
+refreshes the job's `heartbeat_at` every `JOB_HEARTBEAT_INTERVAL` seconds.
+A running job is only requeued by `recover()` once its owner is gone: a
+dead process on this host, or a heartbeat older than
+`JOB_HEARTBEAT_TIMEOUT` seconds. Every started queue runs `recover()` on
+start and then with each heartbeat.
+
+Job bookkeeping goes through its own short transactions on the engine, so a
+job rolling back its work never loses its own status updates.
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, NamedTuple, Optional, Union
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from .metrics import JOB_DURATION, JOBS
+from .models import Job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+ACTIVE_STATUSES = ("queued", "running")
+
+# How often a job's progress is written at most, in seconds.
+PROGRESS_INTERVAL = 0.5
+
+# How often running jobs are marked alive, and after how long without a
+# heartbeat they count as abandoned, in seconds.
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "10"))
+JOB_HEARTBEAT_TIMEOUT = float(os.getenv("JOB_HEARTBEAT_TIMEOUT",
+                                        str(6 * JOB_HEARTBEAT_INTERVAL)))
+
+
+
+class JobOutput(NamedTuple):
+    """
+    What a job producing a file returns: its JSON serialisable result plus
+    the file, which is stored with the job so any process can serve it.
+    """
+
+    result: dict
+    data: bytes
+    mimetype: str
+
+
+# A job function receives its parameters and a callback taking the fraction
+# done (0-1), and returns a JSON serialisable result or a `JobOutput`.
+JobFunc = Callable[[dict, Callable[[float], None]], Union[dict, JobOutput]]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def job_key(kind: str, params: dict) -> str:
+    """
+    Returns the deduplication key of a job.
+
+    Args:
+        kind (str): The job kind.
+        params (dict): The job parameters.
+
+    Returns:
+        (str): The hex SHA-256 of the kind and canonical parameters.
+    """
+
+    canonical = json.dumps([kind, params], sort_keys=True,
+                           separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _owner_alive(owner: str) -> Optional[bool]:
+    """
+    Returns whether the process behind a job owner still runs, if that can
+    be told from here.
+
+    Args:
+        owner (str): The "host:pid:token" owner.
+
+    Returns:
+        (bool | None): False if it was a process on this host that exited,
+                       None if it is elsewhere or its pid is taken (the pid
+                       may have been reused).
+    """
+
+    try:
+        host, pid, _ = owner.rsplit(":", 2)
+        pid = int(pid)
+    except ValueError:
+        return None
+    if host != socket.gethostname():
+        return None
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Someone else's process has that pid now
+    return None
+
+
+class JobQueue:
+    """
+    Runs registered job kinds on a thread pool, tracked in the `Job` table.
+    """
+
+    def __init__(self, app: Flask, db: SQLAlchemy,
+                 workers: int = JOB_WORKERS):
+        self.app = app
+        self.db = db
+        self.workers = max(1, workers)
+        self._handlers: dict[str, JobFunc] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._owner: Optional[tuple[int, str]] = None
+        self._stop = threading.Event()
+
+    @property
+    def owner(self) -> str:
+        """
+        Returns:
+            (str): This process as a job owner, "host:pid:token". The random
+                   token tells apart processes that reuse a pid.
+        """
+
+        if self._owner is None or self._owner[0] != os.getpid():
+            self._owner = (os.getpid(), f"{socket.gethostname()}:"
+                           f"{os.getpid()}:{uuid.uuid4().hex[:8]}")
+        return self._owner[1]
+
+    @property
+    def kinds(self) -> list[str]:
+        """
+        Returns:
+            (list[str]): The registered job kinds.
+        """
+
+        return list(self._handlers)
+
+    def register(self, kind: str, func: JobFunc) -> None:
+        """
+        Registers the function running jobs of `kind`.
+
+        Args:
+            kind (str): The job kind.
+            func (JobFunc): The function running the job.
+        """
+
+        self._handlers[kind] = func
+
+    def start(self) -> "JobQueue":
+        """
+        Starts the worker pool and the heartbeat on first use, requeues the
+        jobs abandoned by dead processes and picks up every queued job.
+        """
+
+        with self._lock:
+            if self._executor is not None:
+                return self
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="job")
+            threading.Thread(target=self._heartbeat, name="job-heartbeat",
+                             daemon=True).start()
+
+        table = Job.__table__
+        with self.app.app_context():
+            self.recover()
+            with self.db.engine.connect() as conn:
+                pending = conn.execute(
+                    select(table.c.id)
+                    .where(table.c.status == "queued")
+                    .order_by(table.c.created_at)).scalars().all()
+
+        # Claiming is atomic, so jobs other processes also pick up are safe.
+        for job_id in pending:
+            self._executor.submit(self._run, job_id)
+        return self
+
+    def recover(self) -> list[str]:
+        """
+        Requeues the running jobs whose owner is gone: a process on this
+        host that exited, or one silent for `JOB_HEARTBEAT_TIMEOUT` seconds.
+
+        Returns:
+            (list[str]): The ids of the requeued jobs.
+        """
+
+        table = Job.__table__
+        stale = _utcnow() - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT)
+        with self.db.engine.begin() as conn:
+            running = conn.execute(
+                select(table.c.id, table.c.owner, table.c.heartbeat_at)
+                .where(table.c.status == "running")).all()
+            requeued = []
+            for job_id, owner, heartbeat_at in running:
+                if owner == self.owner:
+                    continue
+                if heartbeat_at is not None and heartbeat_at >= stale and \
+                        (owner is None or _owner_alive(owner) is not False):
+                    continue
+                # Unless another process requeued or heartbeat it meanwhile.
+                claimed = conn.execute(
+                    update(table)
+                    .where(table.c.id == job_id)
+                    .where(table.c.status == "running")
+                    .where(table.c.owner.is_not_distinct_from(owner))
+                    .where(table.c.heartbeat_at.is_not_distinct_from(
+                        heartbeat_at))
+                    .values(status="queued", owner=None, started_at=None,
+                            heartbeat_at=None))
+                if claimed.rowcount == 1:
+                    requeued.append(job_id)
+        return requeued
+
+    def stop(self) -> None:
+        """
+        Stops the heartbeat, so the running jobs of this queue soon count as
+        abandoned. Jobs already running finish anyway.
+        """
+
+        self._stop.set()
+
+    def _heartbeat(self) -> None:
+        table = Job.__table__
+        while not self._stop.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                with self.app.app_context():
+                    with self.db.engine.begin() as conn:
+                        conn.execute(update(table)
+                                     .where(table.c.owner == self.owner)
+                                     .where(table.c.status == "running")
+                                     .values(heartbeat_at=_utcnow()))
+                    requeued = self.recover()
+            except SQLAlchemyError:
+                continue  # The database is busy or down; try next beat
+            for job_id in requeued:
+                self._executor.submit(self._run, job_id)
+
+    def submit(self, kind: str, params: dict) -> tuple[dict, bool]:
+        """
+        Queues a job unless an identical one is already queued or running.
+
+        Args:
+            kind (str): A registered job kind.
+            params (dict): The JSON serialisable job parameters.
+
+        Returns:
+            (tuple(dict, bool)): The job and whether it was newly created.
+
+        Raises:
+            KeyError: If `kind` is not registered.
+        """
+
+        if kind not in self._handlers:
+            raise KeyError(kind)
+
+        self.start()
+        key = job_key(kind, params)
+        job_id = uuid.uuid4().hex
+
+        with self._lock:
+            existing = self._find_active(key)
+            if existing is not None:
+                return (existing, False)
+            try:
+                with self.db.engine.begin() as conn:
+                    conn.execute(insert(Job.__table__).values(
+                        id=job_id, kind=kind, key=key,
+                        params=json.dumps(params), status="queued",
+                        progress=0.0, created_at=_utcnow()))
+            except IntegrityError:
+                # Another process queued the same job first.
+                existing = self._find_active(key)
+                if existing is not None:
+                    return (existing, False)
+                raise
+
+        JOBS.inc(kind=kind, status="queued")
+        self._executor.submit(self._run, job_id)
+        return (self.get(job_id), True)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Returns a job by id.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            (dict | None): The job, or None if there is no such job.
+        """
+
+        job = self.db.session.get(Job, job_id)
+        if job is None:
+            return None
+        self.db.session.refresh(job)
+        return job.to_json()
+
+    def output(self, job_id: str) -> Optional[tuple[bytes, str]]:
+        """
+        Returns the file a finished job produced.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            (tuple(bytes, str) | None): The file and its mimetype, or None
+                                        if the job produced none (yet).
+        """
+
+        table = Job.__table__
+        with self.db.engine.connect() as conn:
+            row = conn.execute(
+                select(table.c.output, table.c.output_type)
+                .where(table.c.id == job_id)
+                .where(table.c.status == "done")).first()
+        if row is None or row.output is None:
+            return None
+        return (row.output, row.output_type)
+
+    def _find_active(self, key: str) -> Optional[dict]:
+        job = self.db.session.execute(
+            select(Job).where(Job.key == key)
+            .where(Job.status.in_(ACTIVE_STATUSES))).scalar_one_or_none()
+        if job is None:
+            return None
+        self.db.session.refresh(job)
+        return job.to_json()
+
+    def _update(self, job_id: str, **values) -> None:
+        with self.db.engine.begin() as conn:
+            conn.execute(update(Job.__table__)
+                         .where(Job.__table__.c.id == job_id)
+                         .values(**values))
+
+    def _progress(self, job_id: str) -> Callable[[float], None]:
+        """
+        Returns a callback recording a job's progress, throttled to one
+        write per `PROGRESS_INTERVAL`.
+        """
+
+        last = [0.0]
+
+        def report(fraction: float) -> None:
+            now = time.monotonic()
+            if now - last[0] >= PROGRESS_INTERVAL:
+                last[0] = now
+                self._update(job_id, progress=min(max(fraction, 0.0), 1.0))
+
+        return report
+
+    def _claim(self, job_id: str) -> Optional[tuple[str, str]]:
+        """
+        Marks a queued job as running in this process, unless another
+        process got to it first.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            (tuple(str, str) | None): The job kind and JSON parameters, or
+                                      None if the job is not ours to run.
+        """
+
+        table = Job.__table__
+        now = _utcnow()
+        with self.db.engine.begin() as conn:
+            claimed = conn.execute(
+                update(table)
+                .where(table.c.id == job_id)
+                .where(table.c.status == "queued")
+                .values(status="running", owner=self.owner, started_at=now,
+                        heartbeat_at=now))
+            if claimed.rowcount != 1:
+                return None
+            return tuple(conn.execute(
+                select(table.c.kind, table.c.params)
+                .where(table.c.id == job_id)).one())
+
+    def _run(self, job_id: str) -> None:
+        with self.app.app_context():
+            job = self._claim(job_id)
+            if job is None:
+                return
+
+            kind, params = job
+            start = time.perf_counter()
+
+            try:
+                result = self._handlers[kind](json.loads(params),
+                                              self._progress(job_id))
+            except Exception as e:  # pylint: disable=W0718
+                self.db.session.rollback()
+                self._update(job_id, status="failed",
+                             error=f"{e.__class__.__name__}: {e}",
+                             finished_at=_utcnow())
+                status = "failed"
+            else:
+                output = {}
+                if isinstance(result, JobOutput):
+                    output = {"output": result.data,
+                              "output_type": result.mimetype}
+                    result = result.result
+                self._update(job_id, status="done", progress=1.0,
+                             result=json.dumps(result),
+                             finished_at=_utcnow(), **output)
+                status = "done"
+
+            JOBS.inc(kind=kind, status=status)
+            JOB_DURATION.observe(time.perf_counter() - start, kind=kind)
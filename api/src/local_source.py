@@ -0,0 +1,105 @@
+# pylint: disable=E0401
+"""
+Offline ingest of the `Fish` table from the bundled data files.
+
+`fish_datasheet.csv` supplies the prices, locations, shadow sizes, times and
+months, and `fish_info.json` the image URLs (and fallbacks for anything the
+datasheet lacks). Both are read from the compiled snapshot, their names are
+reconciled through the catalog resolver (normalisation plus the `renamed`
+aliases), and the rows are written in the same shape and with the same
+single-transaction upsert as the Nookipedia ingest. No network is involved,
+so new nodes and CI can be provisioned without an API key. The bundled files
+carry no rarity, so a local ingest keeps the rarity already stored (from an
+earlier Nookipedia ingest) and leaves it empty only for new fish.
+
+The other categories need no ingest: they are served from the snapshot.
+"""
+from typing import Iterator, Optional
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import select
+from .images import cache_fish_images
+from .models import Fish
+from .spawn_engine import HEMISPHERE_INDEX, MONTHS, format_months
+from .upsert import upsert_fish
+
+
+def local_fish_rows(rarities: Optional[dict[str, str]] = None
+                    ) -> Iterator[dict]:
+    """
+    Builds `Fish` rows from the bundled datasheet and `fish_info.json`.
+
+    Args:
+        rarities (dict[str, str], optional): Fish name to the rarity to
+                                             keep, as the bundled files have
+                                             none. Defaults to empty.
+
+    Returns:
+        (Iterator[dict]): Column name to value, one dict per fish, in
+                          datasheet order.
+    """
+
+    from src import main  # pylint: disable=C0415
+
+    rarities = rarities or {}
+    store = main.catalog_engine.stores["fish"]
+    spawns = store.spawns
+
+    info = {}
+    for fish in main.snapshot.fish_info:
+        name = main.fish_names.resolve(fish["name"])
+        if name is not None:
+            info[name] = fish
+
+    month_columns = [f"NH {month}" for month in MONTHS]
+    for record in store:
+        name = record.name
+        fish = info.get(name, {})
+        row = spawns.index[name]
+
+        # The datasheet separates some hour ranges with no-break spaces.
+        time = next((record[column] for column in month_columns
+                     if record[column] not in (None, "NA")),
+                    fish.get("time", "")).replace("\xa0", " ")
+        masks = {
+            hemisphere: int(spawns.month_masks[index, row])
+            for hemisphere, index in HEMISPHERE_INDEX.items()
+        }
+
+        yield {
+            "name": name,
+            "image_url": fish.get("imageURL", ""),
+            "rarity": rarities.get(name, ""),
+            "price": int(record.get("Sell") or fish.get("sellPrice") or 0),
+            "location": record.get("Where/How") or fish.get("location", ""),
+            "size": record.get("Shadow") or fish.get("size", ""),
+            "time": time,
+            "nh_months": format_months(masks["nh"]),
+            "sh_months": format_months(masks["sh"]),
+            "nh_month_mask": masks["nh"],
+            "sh_month_mask": masks["sh"],
+        }
+
+
+def ingest_local_fish(db: SQLAlchemy, with_images: bool = False) -> dict:
+    """
+    Upserts the `Fish` table from the bundled data files.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        with_images (bool, optional): Also download the fish images into the
+                                      image cache, which needs the network.
+
+    Returns:
+        (dict): The number of rows "inserted", "updated" and "unchanged",
+                with the "failures" and, with images, the "images" summary,
+                like `sync.ingest_fish()`.
+    """
+
+    table = Fish.__table__
+    rarities = dict(db.session.execute(select(table.c.name,
+                                              table.c.rarity)).all())
+    counts = {**upsert_fish(db, list(local_fish_rows(rarities))),
+              "failures": {}}
+    if with_images:
+        counts["images"] = cache_fish_images(db)
+    return counts
@@ -6,11 +6,22 @@ Crossing: New Horizons. It includes functions for plotting spawning calendars,
 filtering data, and finding the closest matches for user input.
 
 Functions:
+    render_spawn_grid(names: list[str], grid: np.ndarray, title: str,
+                      month: int = None, dpi: int = 300) -> bytes:
+        Renders a 0/1 spawn grid as a calendar and returns the PNG bytes.
+
+    render_spawning_calendar(dataframe: pd.DataFrame, title: str,
+                             month: int = None, dpi: int = 300) -> bytes:
+        Renders the spawning calendar for the fish and returns the PNG bytes.
+
     plot_spawning_calendar(dataframe: pd.DataFrame, title: str, filename: str)
         -> None:
             Creates a plot for the fish in a calendar style and saves it as an
             image.
 
+    get_frame(name: str) -> pd.DataFrame:
+        Returns a datasheet as a DataFrame, reading it on first use.
+
     get_caught_fish(fishes_caught: list[str]) -> list[str]:
         Returns a list of caught fish names based on the input list of fish
         names.
@@ -26,35 +37,33 @@ Functions:
         Finds and returns the closest matches for the user input from the list
         of all fish names.
 
+    resolve_collection(items: list[str]) -> tuple:
+        Resolves a user's whole collection across every category in one pass.
+
     get_problems(input_fish: list[str]) -> set[str]:
         Identifies and returns a set of fish names that are not present in the
         list of all fish names.
 """
+from __future__ import annotations
+import os
 from datetime import datetime
-from typing import Optional
-import pandas as pd
-import seaborn as sns
-import matplotlib
-import matplotlib.pyplot as plt
-from matplotlib.lines import Line2D
-from thefuzz import process as fuzz_process
+from typing import TYPE_CHECKING, Optional
+import numpy as np
+from .catalog import Catalog, build_catalog
+from .names import CatalogResolver, NameResolver, normalise
+from .calendar_render import RenderJob, render_job
+from .render_farm import render_farm
+from .search import SearchIndex
+from .snapshot import DATA_DIR, Snapshot, load_snapshot
+from .spawn_engine import SpawnTable
 # from unidecode import unidecode  # For Music Filtering
 
-sea_creatures_df: pd.DataFrame = pd.read_csv(
-    "data/sea_creatures_datasheet.csv")
-sea_creatures: list[str] = list(sea_creatures_df["Name"].copy())
-
-insects_df: pd.DataFrame = pd.read_csv("data/insects_datasheet.csv")
-insects: list[str] = list(insects_df["Name"].copy())
-
-fossils_df: pd.DataFrame = pd.read_csv("data/fossils_datasheet.csv")
-fossils: list[str] = list(fossils_df["Name"].copy())
+if TYPE_CHECKING:
+    import pandas as pd
 
-gyroids_df: pd.DataFrame = pd.read_csv("data/gyroids_datasheet.csv")
-gyroids: list[str] = list(gyroids_df["Name"].copy())
-
-artwork_df: pd.DataFrame = pd.read_csv("data/artwork_datasheet.csv")
-artwork: list[str] = list(set(artwork_df["Name"].copy()))
+# The compiled datasheets (see `build_snapshot.py`); pandas and matplotlib
+# are only imported once a DataFrame or chart is requested.
+snapshot: Snapshot = load_snapshot()
 
 # Music Filtering
 # music: pd.DataFrame = pd.read_csv("data/music_datasheet.csv")
@@ -97,7 +106,19 @@ renamed: dict[str, str] = {  # Dict of items that need to be renamed
     "mahi mahi": "mahi-mahi"
 }
 
-fish_df = pd.read_csv("data/fish_datasheet.csv")
+# Columnar stores for every category with one shared name index
+catalog_engine: Catalog = build_catalog(snapshot, renamed)
+
+sea_creatures: list[str] = catalog_engine.stores["sea creature"].names
+
+insects: list[str] = catalog_engine.stores["insect"].names
+
+fossils: list[str] = catalog_engine.stores["fossil"].names
+
+gyroids: list[str] = catalog_engine.stores["gyroid"].names
+
+# One entry per artwork, in datasheet order (genuine and fake share a name)
+artwork: list[str] = catalog_engine.stores["artwork"].names
 
 # Relevant columns for NH_df
 NH_columns = ["Name",
@@ -106,7 +127,6 @@ NH_columns = ["Name",
               "NH Jul", "NH Aug", "NH Sep",
               "NH Oct", "NH Nov", "NH Dec"
               ]
-NH_df = fish_df[NH_columns].copy()
 
 # Relevant columns for SH_df
 SH_columns = ["Name",
@@ -115,90 +135,173 @@ SH_columns = ["Name",
               "SH Jul", "SH Aug", "SH Sep",
               "SH Oct", "SH Nov", "SH Dec"
               ]
-SH_df = fish_df[SH_columns].copy()
 
-matplotlib.use('Agg')  # no GUI to allow updates from site
+# Packed month/hour availability masks, compiled once
+fish_spawns: SpawnTable = snapshot.spawns["fish"]
+
+_frames: dict[str, pd.DataFrame] = {}
+
+# Lazily built DataFrames, still reachable as module attributes
+_frame_attributes: dict[str, str] = {
+    "fish_df": "fish",
+    "NH_df": "NH",
+    "SH_df": "SH",
+    "sea_creatures_df": "sea_creatures",
+    "insects_df": "insects",
+    "fossils_df": "fossils",
+    "gyroids_df": "gyroids",
+    "artwork_df": "artwork",
+}
 
 
-def plot_spawning_calendar(
-    dataframe: pd.DataFrame, title: str, filename: str
-) -> None:
+def get_frame(name: str) -> pd.DataFrame:
     """
-    Creates a plot for the fish in a calendar style and saves it as image.
+    Returns a datasheet as a DataFrame, reading it on first use.
+
+    Args:
+        name (str): The datasheet, e.g. "fish", or "NH" / "SH" for the fish
+                    hemisphere columns.
+
+    Returns:
+        (pd.DataFrame): The datasheet.
+    """
+
+    frame = _frames.get(name)
+    if frame is None:
+        if name in ("NH", "SH"):
+            columns = NH_columns if name == "NH" else SH_columns
+            frame = get_frame("fish")[columns].copy()
+        else:
+            import pandas as pd  # pylint: disable=C0415,W0621
+
+            frame = pd.read_csv(os.path.join(DATA_DIR,
+                                             f"{name}_datasheet.csv"))
+        _frames[name] = frame
+    return frame
+
+
+def __getattr__(name: str):
+    if name in _frame_attributes:
+        return get_frame(_frame_attributes[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def render_spawn_grid(names: list[str], grid: np.ndarray, title: str,
+                      month: Optional[int] = None, dpi: int = 300) -> bytes:
+    """
+    Renders a 0/1 spawn grid in a calendar style and returns the PNG bytes.
+
+    Args:
+        names (list[str]): The fish names, one per row of `grid`.
+        grid (np.ndarray): Shape (len(names), 12); 1 means spawning.
+        title (str): The title of the plot.
+        month (int, optional): The month (1-12) to mark with the red line.
+                               Defaults to the current month.
+        dpi (int): The resolution of the image. Defaults to 300.
+
+    Returns:
+        (bytes): The PNG image.
+    """
+
+    return render_job(RenderJob(tuple(names), np.asarray(grid), title,
+                                month or datetime.now().month, dpi))
+
+
+def render_spawning_calendar(dataframe: pd.DataFrame, title: str,
+                             month: Optional[int] = None,
+                             dpi: int = 300) -> bytes:
+    """
+    Renders the fish in a calendar style and returns the PNG bytes.
 
     Args:
         dataframe (pd.DataFrame): The dataframe with the data for the plot.
         title (str): The title of the plot.
-        filename (str): The filename of the saved image.
+        month (int, optional): The month (1-12) to mark with the red line.
+                               Defaults to the current month.
+        dpi (int): The resolution of the image. Defaults to 300.
 
     Returns:
-        (None): This just creates the image files given the fish data.
+        (bytes): The PNG image.
     """
 
-    plt.figure(figsize=(12, len(dataframe) * 0.5))
     # Convert to 1s and NaNs (1 means spawning, NaN means no spawn)
     spawn_data = dataframe.set_index("Name").notna().astype(int)
 
-    ax = sns.heatmap(spawn_data, cmap="Greens", linewidths=0.5, cbar=False)
-
-    ax.set_xticklabels(["January", "February", "March",
-                        "April", "May", "June",
-                        "July", "August", "September",
-                        "October", "November", "December"
-                        ]
-                       )
+    return render_spawn_grid(list(spawn_data.index), spawn_data.to_numpy(),
+                             title, month, dpi)
 
-    plt.xlabel("")
-    ax.xaxis.set_ticks_position("top")
-    ax.xaxis.set_label_position("top")
 
-    # Add a red line between the columns of the current month
-    current_month = datetime.now().month
-    ax.axvline(x=current_month - 0.5, color="red", linestyle="-", linewidth=2)
-    # Create a custom legend
-    legend_elements = [
-        Line2D([0], [0], color="red", lw=2, label="Current Month")]
-    ax.legend(handles=legend_elements,
-              loc="upper right", bbox_to_anchor=(1.2, 1))
+def plot_spawning_calendar(
+    dataframe: pd.DataFrame, title: str, filename: str
+) -> None:
+    """
+    Creates a plot for the fish in a calendar style and saves it as image.
 
-    plt.ylabel("")
-    plt.title(title, loc="center")
-    plt.xticks(rotation=45)
-    plt.yticks()
+    Args:
+        dataframe (pd.DataFrame): The dataframe with the data for the plot.
+        title (str): The title of the plot.
+        filename (str): The filename of the saved image.
 
-    plt.savefig("static/images/" + filename, bbox_inches="tight", dpi=300)
-    # plt.show()
+    Returns:
+        (None): This just creates the image files given the fish data.
+    """
 
-    plt.close()
+    with open("static/images/" + filename, "wb") as image:
+        image.write(render_spawning_calendar(dataframe, title))
 
 
-def update_calendars(nh_df: pd.DataFrame = NH_df,
-                     sh_df: pd.DataFrame = SH_df) -> None:
+def update_calendars(nh_df: Optional[pd.DataFrame] = None,
+                     sh_df: Optional[pd.DataFrame] = None) -> None:
     """Updates the calendar images based on the fish dataframes.
 
     Args:
-        nh_df (pd.DataFrame): Northern hemisphere fish data.
-        sh_df (pd.DataFrame): Southern hemisphere fish data.
+        nh_df (pd.DataFrame, optional): Northern hemisphere fish data.
+                                        Defaults to every fish.
+        sh_df (pd.DataFrame, optional): Southern hemisphere fish data.
+                                        Defaults to every fish.
 
     Returns:
-        (None): This just calls plot_spawning_calendar() for both hemispheres.
+        (None): This renders both hemispheres in parallel on the render
+                farm and saves them as image files.
     """
 
-    plot_spawning_calendar(nh_df, "Northern Hemisphere",
-                           "NH_spawning_calendar.png")
-    plot_spawning_calendar(sh_df, "Southern Hemisphere",
-                           "SH_spawning_calendar.png")
+    month = datetime.now().month
+    calendars = {
+        "NH_spawning_calendar.png": (get_frame("NH") if nh_df is None
+                                     else nh_df, "Northern Hemisphere"),
+        "SH_spawning_calendar.png": (get_frame("SH") if sh_df is None
+                                     else sh_df, "Southern Hemisphere"),
+    }
+
+    jobs = []
+    for dataframe, title in calendars.values():
+        spawn_data = dataframe.set_index("Name").notna().astype(int)
+        jobs.append(RenderJob(tuple(spawn_data.index),
+                              spawn_data.to_numpy(), title, month))
+
+    for filename, image in zip(calendars, render_farm.render_batch(jobs)):
+        with open("static/images/" + filename, "wb") as file:
+            file.write(image)
 
 
-update_calendars()
+all_fish_list_unsorted: list[str] = catalog_engine.stores["fish"].names
 
-all_fishes: list[str] = sorted(
-    list(fish_df["Name"].dropna().unique()), key=str.lower)
+all_fishes: list[str] = sorted(all_fish_list_unsorted, key=str.lower)
 
 CURRENT_IMAGE = "static/images/NH_spawning_calendar.png"
-all_fish_list_unsorted: str = fish_df["Name"].dropna().unique().tolist()
 all_fish_list: list[str] = sorted(all_fish_list_unsorted, key=str.lower)
 
+# Pre-normalised fuzzy search index over the fish names
+fish_index: SearchIndex = SearchIndex((fish, "fish") for fish in all_fishes)
+
+# Every loaded datasheet's names, by category
+catalog: dict[str, list[str]] = catalog_engine.names()
+
+# Canonical name lookups (normalised names and `renamed` aliases)
+catalog_names: CatalogResolver = catalog_engine.resolver
+fish_names: NameResolver = catalog_names.resolvers["fish"]
+_aliases: dict[str, str] = {normalise(old): new for old, new in renamed.items()}
+
 
 def get_caught_fish(fishes_caught: list[str]) -> list[str]:
     """
@@ -221,17 +324,9 @@ def get_caught_fish(fishes_caught: list[str]) -> list[str]:
     except IndexError:
         return []
 
-    caught_items = set()
-
-    for fishy in fishes_caught:
-        fish_name = fishy.strip().replace("_", " ")
-        fish_name = renamed.get(fish_name, fish_name)
-
-        caught_items.add(fish_name)
+    caught_fish, _ = fish_names.resolve_many(fishes_caught)
 
-    res = [fish for fish in all_fishes if fish in caught_items]
-
-    return sorted(res, key=str.lower)
+    return caught_fish
 
 
 def process_fish_data(input_fish_list: Optional[list[str]] = None) -> tuple[
@@ -255,22 +350,18 @@ def process_fish_data(input_fish_list: Optional[list[str]] = None) -> tuple[
     """
 
     caught_fish = get_caught_fish(input_fish_list or [])
-    caught_fish = sorted(caught_fish, key=str.lower)
-
-    uncaught_fish = [fish for fish in all_fishes if fish not in caught_fish]
-    uncaught_fish = sorted(uncaught_fish, key=str.lower)
 
-    df_nh_uncaught = NH_df[NH_df["Name"].isin(uncaught_fish)].copy()
-    df_sh_uncaught = SH_df[SH_df["Name"].isin(uncaught_fish)].copy()
+    # `all_fishes` is already sorted, so both lists come out sorted.
+    caught_set = set(caught_fish)
+    uncaught_fish = [fish for fish in all_fishes if fish not in caught_set]
 
-    update_calendars(df_nh_uncaught, df_sh_uncaught)
+    nh_df, sh_df = get_frame("NH"), get_frame("SH")
+    df_nh_uncaught = nh_df[nh_df["Name"].isin(uncaught_fish)].copy()
+    df_sh_uncaught = sh_df[sh_df["Name"].isin(uncaught_fish)].copy()
 
     return (caught_fish, uncaught_fish, df_nh_uncaught, df_sh_uncaught)
 
 
-caught, uncaught, uncaught_NH_df, uncaught_SH_df = process_fish_data()
-
-
 def filter_data(arr: list[str], filter_by: list[str]) -> list[str]:
     """
     Filters out elements from the input list `arr` that are present in the
@@ -285,16 +376,12 @@ def filter_data(arr: list[str], filter_by: list[str]) -> list[str]:
                      `filter_by`, ignoring case.
     """
 
-    arr = [renamed.get(insect, insect)
-           for insect in arr]
+    excluded = {normalise(thing) for thing in filter_by}
 
-    filtered_arr = []
-
-    for item in arr:
-        if item.lower() not in [thing.lower() for thing in filter_by]:
-            filtered_arr.append(item)
+    arr = [_aliases.get(normalise(insect), insect)
+           for insect in arr]
 
-    return filtered_arr
+    return [item for item in arr if normalise(item) not in excluded]
 
 
 def get_closest_match(user_in: str, threshold: int = 80) -> list[str]:
@@ -318,54 +405,40 @@ def get_closest_match(user_in: str, threshold: int = 80) -> list[str]:
                      either direct substring matching or fuzzy matching.
     """
 
-    possible_matches = [
-        fish for fish in all_fishes if user_in.lower() in fish.lower()
-    ]
+    return list(fish_index.closest_match(user_in, threshold))
 
-    if possible_matches:
-        possible_matches_scores = [
-            fuzz_process.extractOne(user_in, [fish])[1]
-            for fish in possible_matches
-        ]
-        possible_matches_max_score = max(possible_matches_scores)
-    else:
-        possible_matches_max_score = 0
 
-    matches = fuzz_process.extract(user_in, all_fishes, limit=len(all_fishes))
-    filtered_matches = [match for match,
-                        score in matches if score >= threshold]
-
-    if filtered_matches:
-        filtered_matches_scores = [
-            score for _, score in matches if score >= threshold
-        ]
-        filtered_matches_max_score = max(filtered_matches_scores)
-    else:
-        filtered_matches_max_score = 0
-
-    if possible_matches_max_score > filtered_matches_max_score:
-        return possible_matches
+def get_problems(input_fish: list[str]) -> set[str]:
+    """
+    Identifies fish names in the input list that do not resolve to any name in
+    the predefined list of all fishes.
 
-    if filtered_matches_max_score > possible_matches_max_score:
-        return filtered_matches
+    Args:
+        input_fish (list[str]): A list of fish names to be checked.
 
-    if len(possible_matches) >= len(filtered_matches):
-        return possible_matches
+    Returns:
+        (set[str]): Fish names that are not found in the predefined
+                    list of all fishes.
+    """
 
-    return filtered_matches
+    return {item for item in input_fish if fish_names.resolve(item) is None}
 
 
-def get_problems(input_fish: list[str]) -> set[str]:
+def resolve_collection(items: list[str]) -> tuple[dict[str, list[str]],
+                                                  list[str]]:
     """
-    Identifies fish names in the input list that are not present in the
-    predefined list of all fishes.
+    Resolves a user's whole collection (fish, insects, sea creatures, fossils,
+    gyroids and artwork mixed together) in a single pass.
 
     Args:
-        input_fish (list[str]): A list of fish names to be checked.
+        items (list[str]): The item names the user has collected.
 
     Returns:
-        (set[str]): Fish names that are not found in the predefined
-                    list of all fishes.
+        (tuple(dict[str, list[str]], list[str])):
+
+            - resolved (dict[str, list[str]]): Category to the canonical names
+                                               collected.
+            - unknown (list[str]): The items that could not be resolved.
     """
 
-    return {item for item in input_fish if item not in all_fishes}
+    return catalog_names.resolve_collection(items)
@@ -0,0 +1,615 @@
+# pylint: disable=E0401
+"""
+Request-level instrumentation exported in the Prometheus text format.
+
+`init_metrics()` hooks the Flask request cycle and SQLAlchemy's cursor events
+to record per-route latency and per-request SQL query counts and time. Other
+modules record into the shared histograms below (Nookipedia calls, calendar
+renders). With `ACNH_PROFILING=1`, any request can be sampled by adding
+`?profile=1`, which replaces its body with collapsed stacks ready for
+flamegraph tooling.
+
+Metrics live in process memory. When the app runs in several processes
+(gunicorn workers), set `PROMETHEUS_MULTIPROC_DIR` to a directory shared by
+them: every process then writes its values there from a background thread
+every `METRICS_FLUSH_INTERVAL` seconds (and whenever it serves '/metrics'),
+and '/metrics' reports the sum over all of them, whichever worker answers.
+Files of exited workers are folded into one archive by `archive_process()`,
+so counters never go backwards when workers are recycled.
+"""
+import glob
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+PROFILE_INTERVAL = float(os.getenv("ACNH_PROFILE_INTERVAL", "0.001"))
+
+METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1"))
+ARCHIVE_FILE = "metrics-archive.json"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n") \
+        .replace('"', r'\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple,
+                   extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"'
+             for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """
+    A monotonically increasing counter with labels.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str,
+                 labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increments the counter for the given label values.
+        """
+
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def state(self) -> dict[tuple, float]:
+        """
+        Returns:
+            (dict[tuple, float]): Label values to the count.
+        """
+
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(states: list[dict]) -> dict[tuple, float]:
+        """
+        Returns:
+            (dict[tuple, float]): The sum of several `state()`s.
+        """
+
+        merged: dict[tuple, float] = {}
+        for state in states:
+            for key, value in state.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def clear(self) -> None:
+        """
+        Forgets every value.
+        """
+
+        with self._lock:
+            self._values.clear()
+
+    def collect(self, state: Optional[dict] = None) -> list[str]:
+        """
+        Args:
+            state (dict, optional): The values to format. Defaults to this
+                                    process's.
+
+        Returns:
+            (list[str]): The sample lines.
+        """
+
+        values = self.state() if state is None else state
+        return [f"{self.name}{_format_labels(self.labels, key)} "
+                f"{_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram:
+    """
+    A cumulative histogram with fixed buckets and labels.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str,
+                 labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Records one observation for the given label values.
+        """
+
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Observes the duration of the `with` block in seconds.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def state(self) -> dict[tuple, list]:
+        """
+        Returns:
+            (dict[tuple, list]): Label values to the bucket counts followed
+                                 by the sum.
+        """
+
+        with self._lock:
+            return {key: [*counts, self._sums[key]]
+                    for key, counts in self._counts.items()}
+
+    @staticmethod
+    def merge(states: list[dict]) -> dict[tuple, list]:
+        """
+        Returns:
+            (dict[tuple, list]): The sum of several `state()`s.
+        """
+
+        merged: dict[tuple, list] = {}
+        for state in states:
+            for key, values in state.items():
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], values)]
+                else:
+                    merged[key] = list(values)
+        return merged
+
+    def clear(self) -> None:
+        """
+        Forgets every observation.
+        """
+
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+    def collect(self, state: Optional[dict] = None) -> list[str]:
+        """
+        Args:
+            state (dict, optional): The values to format. Defaults to this
+                                    process's.
+
+        Returns:
+            (list[str]): The sample lines.
+        """
+
+        values = self.state() if state is None else state
+
+        lines = []
+        for key, (*bucket_counts, total) in values.items():
+            for bound, count in zip(self.buckets, bucket_counts):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket"
+                             f"{_format_labels(self.labels, key, le)} {count}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {float(total)!r}")
+            lines.append(f"{self.name}_count{labels} {bucket_counts[-1]}")
+        return lines
+
+
+def _read_states(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_states(path: str, document: dict) -> None:
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(handle, "w", encoding="utf-8") as file:
+        json.dump(document, file, separators=(",", ":"))
+    os.replace(temporary, path)
+
+
+class Registry:
+    """
+    The set of metrics exported on '/metrics'.
+    """
+
+    def __init__(self, directory: Optional[str] = METRICS_DIR):
+        self.directory = directory
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._file: Optional[tuple[int, str]] = None
+        self._flusher: Optional[tuple[int, threading.Thread]] = None
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str,
+                labels: tuple[str, ...] = ()) -> Counter:
+        """
+        Returns the counter called `name`, creating it on first use.
+        """
+
+        return self._register(Counter(name, description, labels))
+
+    def histogram(self, name: str, description: str,
+                  labels: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        """
+        Returns the histogram called `name`, creating it on first use.
+        """
+
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def _all(self) -> list:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def clear(self) -> None:
+        """
+        Forgets every value, e.g. in a worker forked from a process that
+        already recorded (and dumped) some.
+        """
+
+        for metric in self._all():
+            metric.clear()
+
+    @property
+    def path(self) -> Optional[str]:
+        """
+        Returns:
+            (str | None): This process's file in `directory`, if shared.
+        """
+
+        if self.directory is None:
+            return None
+        # A forked child must not overwrite its parent's file, and a reused
+        # pid must not overwrite a dead worker's, hence the random suffix.
+        if self._file is None or self._file[0] != os.getpid():
+            self._file = (os.getpid(), os.path.join(
+                self.directory,
+                f"metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"))
+        return self._file[1]
+
+    def dump(self) -> None:
+        """
+        Writes this process's values to its file in the shared directory.
+        """
+
+        path = self.path
+        if path is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        _write_states(path, {
+            "pid": os.getpid(),
+            "metrics": {metric.name: [[list(key), value] for key, value
+                                      in metric.state().items()]
+                        for metric in self._all()},
+        })
+
+    def start_flushing(self) -> None:
+        """
+        Starts a thread in this process running `dump()` every
+        `METRICS_FLUSH_INTERVAL` seconds, unless one runs already. Threads
+        do not survive a fork, so each worker starts its own on first use.
+        """
+
+        if self.directory is None or (self._flusher is not None and
+                                      self._flusher[0] == os.getpid()):
+            return
+        with self._lock:
+            if self._flusher is not None and \
+                    self._flusher[0] == os.getpid():
+                return
+            thread = threading.Thread(target=self._flush, daemon=True,
+                                      name="metrics-flush")
+            self._flusher = (os.getpid(), thread)
+        thread.start()
+
+    def _flush(self) -> None:
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.dump()
+            except OSError:
+                pass  # e.g. the directory was cleaned up; retry next time
+
+    def _shared_states(self) -> dict[str, list[dict]]:
+        """
+        Reads every process file, then the archive, skipping files the
+        archive already absorbed (read in this order, a file archived
+        in between is counted exactly once).
+        """
+
+        documents = []
+        for path in glob.glob(os.path.join(self.directory, "metrics-*.json")):
+            if os.path.basename(path) != ARCHIVE_FILE:
+                document = _read_states(path)
+                if document is not None:
+                    documents.append((os.path.basename(path), document))
+
+        archive = _read_states(os.path.join(self.directory, ARCHIVE_FILE)) \
+            or {"merged": [], "metrics": {}}
+        merged = set(archive["merged"])
+        documents = [document for name, document in documents
+                     if name not in merged]
+        documents.append(archive)
+
+        states: dict[str, list[dict]] = {}
+        for document in documents:
+            for name, values in document["metrics"].items():
+                states.setdefault(name, []).append(
+                    {tuple(key): value for key, value in values})
+        return states
+
+    def archive_process(self, pid: int) -> None:
+        """
+        Folds the files of an exited process into the archive and deletes
+        them. Run by the one process supervising the others (the gunicorn
+        master), never concurrently.
+
+        Args:
+            pid (int): The exited process id.
+        """
+
+        if self.directory is None:
+            return
+        paths = glob.glob(os.path.join(self.directory,
+                                       f"metrics-{pid}-*.json"))
+        if not paths:
+            return
+
+        archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+        archive = _read_states(archive_path) or {"merged": [], "metrics": {}}
+        names = {os.path.basename(path) for path in paths}
+        documents = [archive] + [document for document in map(_read_states,
+                                                               paths)
+                                 if document is not None]
+
+        metrics = {metric.name: metric for metric in self._all()}
+        merged_metrics = {}
+        for name in {name for document in documents
+                     for name in document["metrics"]}:
+            states = [{tuple(key): value for key, value
+                       in document["metrics"].get(name, [])}
+                      for document in documents]
+            merge = metrics[name].merge if name in metrics else Counter.merge
+            merged_metrics[name] = [[list(key), value] for key, value
+                                    in merge(states).items()]
+
+        existing = {os.path.basename(path) for path in glob.glob(
+            os.path.join(self.directory, "metrics-*.json"))}
+        _write_states(archive_path, {
+            "merged": sorted((set(archive["merged"]) & existing) | names),
+            "metrics": merged_metrics,
+        })
+        for path in paths:
+            os.remove(path)
+
+    def render(self) -> str:
+        """
+        Returns:
+            (str): Every metric in the Prometheus text exposition format,
+                   summed over every process sharing `directory`.
+        """
+
+        shared = None
+        if self.directory is not None:
+            self.dump()
+            shared = self._shared_states()
+
+        lines = []
+        for metric in self._all():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect(
+                None if shared is None
+                else metric.merge(shared.get(metric.name, []))))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_LATENCY = REGISTRY.histogram(
+    "acnh_http_request_duration_seconds",
+    "Time spent handling HTTP requests.", ("endpoint", "method", "status"))
+REQUEST_SQL_QUERIES = REGISTRY.histogram(
+    "acnh_http_request_sql_queries",
+    "SQL queries executed per HTTP request.", ("endpoint",), COUNT_BUCKETS)
+REQUEST_SQL_TIME = REGISTRY.histogram(
+    "acnh_http_request_sql_duration_seconds",
+    "Time spent in SQL per HTTP request.", ("endpoint",))
+SQL_QUERY_LATENCY = REGISTRY.histogram(
+    "acnh_sql_query_duration_seconds", "Time spent per SQL query.")
+NOOKIPEDIA_LATENCY = REGISTRY.histogram(
+    "acnh_nookipedia_request_duration_seconds",
+    "Time spent per outbound Nookipedia request.", ("status",))
+CALENDAR_RENDER_LATENCY = REGISTRY.histogram(
+    "acnh_calendar_render_duration_seconds",
+    "Time spent rendering a spawning calendar.",
+    ("category", "hemisphere", "format"))
+CALENDAR_CACHE = REGISTRY.counter(
+    "acnh_calendar_cache_total",
+    "Calendar cache lookups by result.", ("result",))
+RENDER_JOBS = REGISTRY.counter(
+    "acnh_render_jobs_total",
+    "Render farm jobs by result (done, failed, rejected).", ("result",))
+JOBS = REGISTRY.counter(
+    "acnh_jobs_total", "Background jobs by kind and status.",
+    ("kind", "status"))
+JOB_DURATION = REGISTRY.histogram(
+    "acnh_job_duration_seconds", "Time spent running background jobs.",
+    ("kind",))
+
+
+def observe_nookipedia_response(response, *args, **kwargs):
+    """
+    A `requests` response hook recording the round trip time.
+    """
+
+    del args, kwargs
+    NOOKIPEDIA_LATENCY.observe(response.elapsed.total_seconds(),
+                               status=response.status_code)
+    return response
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread at a fixed interval.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(  # pylint: disable=W0212
+                self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:"
+                             f"{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        """
+        Starts sampling.
+        """
+
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops sampling.
+        """
+
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """
+        Returns:
+            (str): One "frame;frame;frame count" line per distinct stack.
+        """
+
+        return "".join(f"{stack} {count}\n"
+                       for stack, count in self.stacks.most_common())
+
+
+def _endpoint() -> str:
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):  # pylint: disable=R0913,R0917
+    del cursor, statement, parameters, context, executemany
+    conn.info.setdefault("acnh_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):  # pylint: disable=R0913,R0917
+    del cursor, statement, parameters, context, executemany
+    elapsed = time.perf_counter() - conn.info["acnh_query_start"].pop()
+    SQL_QUERY_LATENCY.observe(elapsed)
+    if has_request_context() and "acnh_sql_queries" in g:
+        g.acnh_sql_queries += 1
+        g.acnh_sql_seconds += elapsed
+
+
+def init_metrics(app: Flask) -> None:
+    """
+    Installs the request, SQL and profiling hooks on the app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    app.config.setdefault("PROFILING_ENABLED",
+                          os.getenv("ACNH_PROFILING", "0") == "1")
+
+    if not event.contains(Engine, "before_cursor_execute",
+                          _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_request_timer() -> None:
+        g.acnh_request_start = time.perf_counter()
+        g.acnh_sql_queries = 0
+        g.acnh_sql_seconds = 0.0
+        g.acnh_profiler = None
+        if app.config["PROFILING_ENABLED"] and request.args.get("profile"):
+            g.acnh_profiler = SamplingProfiler(threading.get_ident()).start()
+
+    @app.after_request
+    def record_request(response: Response) -> Response:
+        if "acnh_request_start" not in g:
+            return response
+
+        endpoint = _endpoint()
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - g.acnh_request_start,
+            endpoint=endpoint, method=request.method,
+            status=response.status_code)
+        REQUEST_SQL_QUERIES.observe(g.acnh_sql_queries, endpoint=endpoint)
+        REQUEST_SQL_TIME.observe(g.acnh_sql_seconds, endpoint=endpoint)
+        REGISTRY.start_flushing()
+
+        profiler: Optional[SamplingProfiler] = g.acnh_profiler
+        if profiler is not None:
+            profiler.stop()
+            response = Response(profiler.collapsed(), mimetype="text/plain")
+            response.headers["X-Profile-Samples"] = str(
+                sum(profiler.stacks.values()))
+        return response
@@ -1,6 +1,7 @@
 """
 This module defines the database for the application.
 """
+import json
 from .database import db
 
 
@@ -9,29 +10,54 @@ class Fish(db.Model):
     The database model for the fish.
     """
 
+    __table_args__ = (
+        # Keyset pagination on the sortable columns.
+        db.Index("ix_fish_price_id", "price", "id"),
+        db.Index("ix_fish_location_id", "location", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(20), unique=True, nullable=False)
     image_url = db.Column(db.String(300), nullable=False)
-    rarity = db.Column(db.String(10), nullable=False)
+    rarity = db.Column(db.String(10), nullable=False, index=True)
     price = db.Column(db.Integer)
     location = db.Column(db.String(80), nullable=False)
-    size = db.Column(db.String(8), nullable=False)
-    time = db.Column(db.String(20), nullable=False)
+    size = db.Column(db.String(20), nullable=False, index=True)
+    time = db.Column(db.String(40), nullable=False)
     nh_months = db.Column(db.String(20), nullable=False)
     sh_months = db.Column(db.String(20), nullable=False)
 
+    # The months above as 12-bit masks (bit m set for month m + 1), so
+    # availability filters are a bitwise AND instead of string parsing.
+    nh_month_mask = db.Column(db.Integer)
+    sh_month_mask = db.Column(db.Integer)
+
+    # Incremental sync state: a hash of the columns above plus the HTTP
+    # validators of the last fetch, so unchanged fish are never rewritten.
+    content_hash = db.Column(db.String(64))
+    etag = db.Column(db.String(128))
+    last_modified = db.Column(db.String(40))
+    fetched_at = db.Column(db.DateTime)
+
+    # Digest of the locally cached copy of `image_url`, see `src.images`.
+    image_digest = db.Column(db.String(64))
+
     def to_json(self) -> dict:
         """
         Returns the fish data as json.
 
         Returns:
-            (dict): JSON representation of fish data.
+            (dict): JSON representation of fish data. "iconUrl" is the
+                    locally served icon, None until it has been cached.
         """
 
+        from .images import icon_url  # pylint: disable=C0415
+
         return {
             "id": self.id,
             "name": self.name,
             "imageUrl": self.image_url,
+            "iconUrl": icon_url(self.image_digest),
             "rarity": self.rarity,
             "price": self.price,
             "location": self.location,
@@ -50,3 +76,179 @@ class Fish(db.Model):
         """
 
         return f"<Fish(name={self.name})>"
+
+
+class CachedImage(db.Model):
+    """
+    The database model for a remote image held in the local image cache.
+    """
+
+    url = db.Column(db.String(300), primary_key=True)
+    digest = db.Column(db.String(64), nullable=False, index=True)
+    content_type = db.Column(db.String(40))
+    size = db.Column(db.Integer)
+    fetched_at = db.Column(db.DateTime)
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the CachedImage object.
+
+        Returns:
+            (str): A formatted string representing the CachedImage instance.
+        """
+
+        return f"<CachedImage(digest={self.digest[:12]}, url={self.url})>"
+
+
+class DataVersion(db.Model):
+    """
+    The database model for the version of a table's data, bumped on every
+    write, so each process can tell when its caches of it went stale.
+    """
+
+    name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the DataVersion object.
+
+        Returns:
+            (str): A formatted string representing the DataVersion instance.
+        """
+
+        return f"<DataVersion(name={self.name}, version={self.version})>"
+
+
+class User(db.Model):
+    """
+    The database model for a user tracking their collection.
+    """
+
+    id = db.Column(db.String(64), primary_key=True)
+    created_at = db.Column(db.DateTime, nullable=False,
+                           server_default=db.func.now())
+
+    items = db.relationship("CollectedItem", back_populates="user",
+                            cascade="all, delete-orphan", lazy="dynamic")
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the User object.
+
+        Returns:
+            (str): A formatted string representing the User instance.
+        """
+
+        return f"<User(id={self.id})>"
+
+
+class CollectedItem(db.Model):
+    """
+    The database model for one item in a user's collection.
+    """
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "category", "name",
+                            name="uq_collected_item"),
+        db.Index("ix_collected_item_category_name", "category", "name"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(64), db.ForeignKey("user.id"),
+                        nullable=False, index=True)
+    category = db.Column(db.String(20), nullable=False)
+    name = db.Column(db.String(80), nullable=False)
+
+    user = db.relationship("User", back_populates="items")
+
+    def to_json(self) -> dict:
+        """
+        Returns the collected item as json.
+
+        Returns:
+            (dict): JSON representation of the collected item.
+        """
+
+        return {"category": self.category, "name": self.name}
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the CollectedItem object.
+
+        Returns:
+            (str): A formatted string representing the CollectedItem instance.
+        """
+
+        return f"<CollectedItem(user={self.user_id}, name={self.name})>"
+
+
+class Job(db.Model):
+    """
+    The database model for a background job and its progress.
+    """
+
+    # At most one queued or running job per dedup key, also across processes.
+    __table_args__ = (
+        db.Index("uq_job_active_key", "key", unique=True,
+                 sqlite_where=db.text("status IN ('queued', 'running')"),
+                 postgresql_where=db.text(
+                     "status IN ('queued', 'running')")),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    key = db.Column(db.String(64), nullable=False, index=True)
+    params = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default="queued",
+                       index=True)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False,
+                           server_default=db.func.now())
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # The "host:pid:token" of the process running the job, and when it last
+    # confirmed it still is.
+    owner = db.Column(db.String(120))
+    heartbeat_at = db.Column(db.DateTime)
+    # A file the job produced, e.g. a rendered calendar, and its mimetype.
+    # Deferred, so polling a job never loads it.
+    output = db.deferred(db.Column(db.LargeBinary))
+    output_type = db.Column(db.String(80))
+
+    def to_json(self) -> dict:
+        """
+        Returns the job as json.
+
+        Returns:
+            (dict): JSON representation of the job.
+        """
+
+        def timestamp(value):
+            return value.isoformat() if value else None
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": json.loads(self.params),
+            "status": self.status,
+            "progress": self.progress,
+            "result": json.loads(self.result) if self.result else None,
+            "error": self.error,
+            "createdAt": timestamp(self.created_at),
+            "startedAt": timestamp(self.started_at),
+            "finishedAt": timestamp(self.finished_at),
+            "outputType": self.output_type,
+        }
+
+    def __repr__(self) -> str:
+        """
+        Returns a string representation of the Job object.
+
+        Returns:
+            (str): A formatted string representing the Job instance.
+        """
+
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
@@ -0,0 +1,159 @@
+# pylint: disable=E0401
+"""
+Canonical name resolution for user supplied item names.
+
+User input such as "pop_eyed_goldfish" or "Mahi Mahi" is normalised
+(whitespace, underscores, case) and mapped through the alias table onto the
+datasheet spelling with a single dict lookup, so resolving a whole pasted
+collection is linear in its size.
+"""
+from typing import Iterable, Optional
+
+
+def normalise(name: str) -> str:
+    """
+    Normalises a user supplied name for lookup.
+
+    Args:
+        name (str): The raw name, e.g. " Pop_eyed  Goldfish ".
+
+    Returns:
+        (str): The lookup key, e.g. "pop eyed goldfish".
+    """
+
+    return " ".join(name.replace("_", " ").split()).casefold()
+
+
+class NameResolver:
+    """
+    Resolves names onto one canonical list of names.
+    """
+
+    def __init__(self, names: Iterable[str],
+                 aliases: Optional[dict[str, str]] = None):
+        self.names: list[str] = list(dict.fromkeys(names))
+        self.order: dict[str, int] = {
+            name: position for position, name in enumerate(self.names)}
+        self._lookup: dict[str, str] = {
+            normalise(name): name for name in self.names}
+
+        for alias, name in (aliases or {}).items():
+            canonical = self._lookup.get(normalise(name))
+            if canonical is not None:
+                self._lookup.setdefault(normalise(alias), canonical)
+
+    def __contains__(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def lookup_items(self) -> Iterable[tuple[str, str]]:
+        """
+        Returns:
+            (Iterable[tuple[str, str]]): (lookup key, canonical name) pairs,
+                                         aliases included.
+        """
+
+        return self._lookup.items()
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Args:
+            name (str): The user supplied name.
+
+        Returns:
+            (str | None): The canonical name, or None if it is unknown.
+        """
+
+        return self._lookup.get(normalise(name))
+
+    def resolve_many(self, names: Iterable[str]) -> tuple[
+            list[str], list[str]]:
+        """
+        Resolves many names in one pass.
+
+        Args:
+            names (Iterable[str]): The user supplied names.
+
+        Returns:
+            (tuple(list[str], list[str])):
+
+                - resolved (list[str]): Distinct canonical names, in the
+                                        order of `self.names`.
+                - unknown (list[str]): The inputs that did not resolve.
+        """
+
+        found: set[str] = set()
+        unknown: list[str] = []
+
+        for name in names:
+            canonical = self._lookup.get(normalise(name))
+            if canonical is None:
+                unknown.append(name)
+            else:
+                found.add(canonical)
+
+        return (sorted(found, key=self.order.__getitem__), unknown)
+
+
+class CatalogResolver:
+    """
+    Resolves names across several categories at once.
+
+    When two categories share a name, the first category listed wins.
+    """
+
+    def __init__(self, categories: dict[str, Iterable[str]],
+                 aliases: Optional[dict[str, str]] = None):
+        self.resolvers: dict[str, NameResolver] = {
+            category: NameResolver(names, aliases)
+            for category, names in categories.items()}
+
+        self._lookup: dict[str, tuple[str, str]] = {}
+        for category, resolver in self.resolvers.items():
+            for key, name in resolver.lookup_items():
+                self._lookup.setdefault(key, (category, name))
+
+    def resolve(self, name: str) -> Optional[tuple[str, str]]:
+        """
+        Args:
+            name (str): The user supplied name.
+
+        Returns:
+            (tuple(str, str) | None): The (category, canonical name), or None
+                                      if it is unknown.
+        """
+
+        return self._lookup.get(normalise(name))
+
+    def resolve_collection(self, names: Iterable[str]) -> tuple[
+            dict[str, list[str]], list[str]]:
+        """
+        Resolves a whole user collection across every category in one pass.
+
+        Args:
+            names (Iterable[str]): The user supplied names.
+
+        Returns:
+            (tuple(dict[str, list[str]], list[str])):
+
+                - resolved (dict[str, list[str]]): Category to the distinct
+                                                   canonical names found.
+                - unknown (list[str]): The inputs that did not resolve.
+        """
+
+        found: dict[str, set[str]] = {
+            category: set() for category in self.resolvers}
+        unknown: list[str] = []
+
+        for name in names:
+            hit = self._lookup.get(normalise(name))
+            if hit is None:
+                unknown.append(name)
+            else:
+                found[hit[0]].add(hit[1])
+
+        resolved = {
+            category: sorted(found[category],
+                             key=self.resolvers[category].order.__getitem__)
+            for category in self.resolvers}
+
+        return (resolved, unknown)
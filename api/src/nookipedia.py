@@ -0,0 +1,370 @@
+# pylint: disable=E0401
+"""
+Client for the Nookipedia fish API.
+
+All requests go through a single pooled `requests.Session` whose adapter
+retries 429/5xx responses with exponential backoff (honouring `Retry-After`).
+Per-fish detail records are fetched concurrently on a bounded thread pool and
+failures are collected per fish instead of aborting the whole ingest.
+`fetch_fish_changes()` sends the stored `ETag` / `Last-Modified` validators
+so unchanged fish come back as cheap 304s.
+
+The base URL can be pointed at a local stub server through the
+`NOOKIPEDIA_URL` environment variable.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from .metrics import observe_nookipedia_response
+from .spawn_engine import parse_months
+
+load_dotenv()
+
+API_KEY = os.getenv("NOOKIPEDIA_API_KEY")
+BASE_URL = os.getenv("NOOKIPEDIA_URL", "https://api.nookipedia.com")
+URL = f"{BASE_URL.rstrip('/')}/nh/fish"
+
+MAX_WORKERS = int(os.getenv("NOOKIPEDIA_MAX_WORKERS", "8"))
+MAX_RETRIES = int(os.getenv("NOOKIPEDIA_MAX_RETRIES", "5"))
+BACKOFF_FACTOR = float(os.getenv("NOOKIPEDIA_BACKOFF", "0.5"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+headers = {"X-API-KEY": API_KEY, "Accept-Version": "1.7.0"}
+
+# Called with (done, total) as a batch of fetches progresses.
+Progress = Callable[[int, int], None]
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class DetailResponse:
+    """
+    The outcome of a conditional detail request.
+
+    Attributes:
+        name (str): The fish name.
+        record (dict | None): The fish record, or None if not modified.
+        etag (str | None): The `ETag` validator to send next time.
+        last_modified (str | None): The `Last-Modified` validator to send
+                                    next time.
+    """
+
+    name: str
+    record: Optional[dict]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    @property
+    def not_modified(self) -> bool:
+        """
+        Returns:
+            (bool): Whether the server answered 304 Not Modified.
+        """
+
+        return self.record is None
+
+
+class NookipediaError(Exception):
+    """
+    Raised when Nookipedia returns a non-200 response after all retries.
+    """
+
+    def __init__(self, status_code: int, message: str = ""):
+        super().__init__(message or f"Nookipedia returned {status_code}")
+        self.status_code = status_code
+
+
+def make_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """
+    Creates a session with a connection pool sized for `pool_size` concurrent
+    requests and retry/backoff on throttling and server errors.
+
+    Args:
+        pool_size (int): The maximum number of pooled connections per host.
+
+    Returns:
+        (requests.Session): The configured session.
+    """
+
+    retry = Retry(total=MAX_RETRIES,
+                  backoff_factor=BACKOFF_FACTOR,
+                  status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset(["GET"]),
+                  respect_retry_after_header=True,
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(headers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.hooks["response"].append(observe_nookipedia_response)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared pooled session, creating it on first use.
+
+    Returns:
+        (requests.Session): The shared session.
+    """
+
+    global _session  # pylint: disable=W0603
+
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+        return _session
+
+
+def fetch_fish_names(session: Optional[requests.Session] = None) -> list[str]:
+    """
+    Fetches the list of all fish names.
+
+    Args:
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+
+    Returns:
+        (list[str]): The fish names known to Nookipedia.
+
+    Raises:
+        NookipediaError: If the request does not succeed.
+    """
+
+    session = session or get_session()
+    response = session.get(url=URL,
+                           params={"excludedetails": "true"},
+                           timeout=30)
+
+    if response.status_code != 200:
+        raise NookipediaError(response.status_code)
+
+    return response.json()
+
+
+def fetch_fish_detail(name: str,
+                      session: Optional[requests.Session] = None) -> dict:
+    """
+    Fetches the detail record for a single fish.
+
+    Args:
+        name (str): The fish name.
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+
+    Returns:
+        (dict): The Nookipedia fish record.
+
+    Raises:
+        NookipediaError: If the request does not succeed.
+    """
+
+    session = session or get_session()
+    response = session.get(url=f"{URL}/{name}", timeout=10)
+
+    if response.status_code != 200:
+        raise NookipediaError(response.status_code)
+
+    return response.json()
+
+
+def fetch_fish_detail_if_changed(
+        name: str, etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        session: Optional[requests.Session] = None) -> DetailResponse:
+    """
+    Fetches the detail record for a single fish unless it is unchanged
+    since the validators of the previous fetch.
+
+    Args:
+        name (str): The fish name.
+        etag (str, optional): The `ETag` of the previous fetch.
+        last_modified (str, optional): The `Last-Modified` of the previous
+                                       fetch.
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+
+    Returns:
+        (DetailResponse): The record, or None as record when not modified.
+
+    Raises:
+        NookipediaError: If the request does not succeed.
+    """
+
+    session = session or get_session()
+    conditions = {}
+    if etag:
+        conditions["If-None-Match"] = etag
+    if last_modified:
+        conditions["If-Modified-Since"] = last_modified
+
+    response = session.get(url=f"{URL}/{name}", headers=conditions,
+                           timeout=10)
+
+    if response.status_code == 304:
+        return DetailResponse(name, None, etag, last_modified)
+    if response.status_code != 200:
+        raise NookipediaError(response.status_code)
+
+    return DetailResponse(name, response.json(),
+                          response.headers.get("ETag"),
+                          response.headers.get("Last-Modified"))
+
+
+def _fetch_concurrently(fetch: Callable[[str], object], names: list[str],
+                        max_workers: int,
+                        progress: Optional[Progress] = None) -> tuple[
+                            dict, dict[str, str]]:
+    """
+    Calls `fetch(name)` for every name on a bounded thread pool, reporting
+    (done, total) to `progress` as fetches complete.
+
+    Returns:
+        (tuple(dict, dict[str, str])): Name to result, and name to error
+                                       message for every failed fetch.
+    """
+
+    results: dict = {}
+    failures: dict[str, str] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(fetch, name): name for name in names}
+
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except (NookipediaError, requests.RequestException,
+                    ValueError) as e:
+                failures[name] = str(e)
+            if progress is not None:
+                progress(done, len(names))
+
+    return (results, failures)
+
+
+def fetch_all_fish(names: Optional[list[str]] = None,
+                   max_workers: int = MAX_WORKERS,
+                   session: Optional[requests.Session] = None,
+                   progress: Optional[Progress] = None) -> tuple[
+                       list[dict], dict[str, str]]:
+    """
+    Fetches the detail records for many fish concurrently.
+
+    Args:
+        names (list[str], optional): The fish to fetch. Defaults to every fish
+                                     returned by `fetch_fish_names()`.
+        max_workers (int): The maximum number of requests in flight.
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+        progress (Progress, optional): Called with (done, total) after each
+                                       fetch completes.
+
+    Returns:
+        (tuple(list[dict], dict[str, str])):
+
+            - records (list[dict]): Fetched records, in the order of `names`.
+            - failures (dict[str, str]): Fish name to error message for every
+                                         fish that could not be fetched.
+
+    Raises:
+        NookipediaError: If the list of names has to be fetched and fails.
+    """
+
+    session = session or get_session()
+    if names is None:
+        names = fetch_fish_names(session)
+
+    results, failures = _fetch_concurrently(
+        lambda name: fetch_fish_detail(name, session), names, max_workers,
+        progress)
+
+    records = [results[name] for name in names if name in results]
+    return (records, failures)
+
+
+def fetch_fish_changes(validators: dict[str, tuple[Optional[str],
+                                                   Optional[str]]],
+                       names: Optional[list[str]] = None,
+                       max_workers: int = MAX_WORKERS,
+                       session: Optional[requests.Session] = None) -> tuple[
+                           list[DetailResponse], dict[str, str]]:
+    """
+    Conditionally fetches the detail records for many fish concurrently.
+
+    Args:
+        validators (dict): Fish name to the (etag, last_modified) of its
+                           previous fetch. Fish without an entry are fetched
+                           unconditionally.
+        names (list[str], optional): The fish to check. Defaults to every
+                                     fish returned by `fetch_fish_names()`.
+        max_workers (int): The maximum number of requests in flight.
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+
+    Returns:
+        (tuple(list[DetailResponse], dict[str, str])): The responses, in the
+            order of `names`, and fish name to error message for every fish
+            that could not be fetched.
+
+    Raises:
+        NookipediaError: If the list of names has to be fetched and fails.
+    """
+
+    session = session or get_session()
+    if names is None:
+        names = fetch_fish_names(session)
+
+    results, failures = _fetch_concurrently(
+        lambda name: fetch_fish_detail_if_changed(
+            name, *validators.get(name, (None, None)), session=session),
+        names, max_workers)
+
+    return ([results[name] for name in names if name in results], failures)
+
+
+def to_fish_row(fish_info: dict) -> dict:
+    """
+    Maps a Nookipedia fish record onto the columns of `src.models.Fish`.
+
+    Args:
+        fish_info (dict): The Nookipedia fish record.
+
+    Returns:
+        (dict): Column name to value.
+    """
+
+    available = fish_info["north"]["availability_array"][0]
+
+    def month_mask(hemisphere: dict) -> int:
+        if hemisphere.get("months_array"):
+            return sum(1 << (month - 1) for month in
+                       set(hemisphere["months_array"]) if 1 <= month <= 12)
+        return parse_months(hemisphere["months"])
+
+    return {
+        "name": fish_info["name"],
+        "image_url": fish_info["image_url"],
+        "rarity": fish_info["rarity"],
+        "price": fish_info["sell_nook"],
+        "location": fish_info["location"],
+        "size": fish_info["shadow_size"],
+        "time": available["time"],
+        "nh_months": fish_info["north"]["months"],
+        "sh_months": fish_info["south"]["months"],
+        "nh_month_mask": month_mask(fish_info["north"]),
+        "sh_month_mask": month_mask(fish_info["south"]),
+    }
@@ -0,0 +1,227 @@
+# pylint: disable=E0401
+"""
+"What can I catch now?" planning over the critter categories.
+
+A `Planner` unpacks a category's spawn hour masks once into a boolean
+(hemisphere × month × hour × critter) index, plus sell prices and
+difficulty ranks as NumPy arrays. A query for the next N hours is then one
+fancy-indexing gather of N + 1 index rows, an AND with the user's uncaught
+mask and a sort; no strings are parsed per request.
+
+"Now" is taken in the caller's time zone, as the game follows the console's
+local clock.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import numpy as np
+from .catalog import CategoryStore
+from .spawn_engine import HEMISPHERE_INDEX
+
+DEFAULT_TIMEZONE = os.getenv("PLANNER_DEFAULT_TZ", "UTC")
+MAX_HOURS = 24 * 7
+
+# Difficulty columns per category, with their values from easiest to
+# hardest. Categories without one rank every critter 0.
+DIFFICULTY: dict[str, tuple[str, tuple[str, ...]]] = {
+    "fish": ("Catch Difficulty",
+             ("Very Easy", "Easy", "Medium", "Hard", "Very Hard")),
+    "sea creature": ("Movement Speed",
+                     ("Stationary", "Very slow", "Slow", "Medium", "Fast",
+                      "Very fast")),
+}
+
+SORT_KEYS = ("sell", "difficulty", "name")
+
+
+def resolve_timezone(name: Optional[str]) -> tzinfo:
+    """
+    Returns the time zone for an IANA name or a "+HH:MM" UTC offset.
+
+    Args:
+        name (str, optional): E.g. "Europe/London" or "-05:00". Defaults to
+                              `DEFAULT_TIMEZONE`.
+
+    Returns:
+        (tzinfo): The time zone.
+
+    Raises:
+        ValueError: If the name is not a known zone or offset.
+    """
+
+    name = name or DEFAULT_TIMEZONE
+    if name[0] in "+-":
+        try:
+            hours, _, minutes = name[1:].partition(":")
+            offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        except ValueError as e:
+            raise ValueError(f"Invalid UTC offset '{name}'.") from e
+        return timezone(-offset if name[0] == "-" else offset)
+
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown time zone '{name}'.") from e
+
+
+@dataclass(frozen=True)
+class PlanQuery:
+    """
+    A planner query.
+
+    Attributes:
+        now (datetime): The local time to plan from.
+        hemisphere (str): "nh" or "sh".
+        hours (int): How many hours ahead to look; 0 means right now only.
+        sort (str): One of `SORT_KEYS`.
+        descending (bool): Whether to sort highest first.
+        limit (int, optional): The maximum number of results.
+    """
+
+    now: datetime
+    hemisphere: str = "nh"
+    hours: int = 0
+    sort: str = "sell"
+    descending: bool = True
+    limit: Optional[int] = None
+
+
+class Planner:
+    """
+    The precomputed time-window index of one critter category.
+    """
+
+    def __init__(self, store: CategoryStore):
+        if store.spawns is None:
+            raise ValueError(f"{store.category} has no spawn data.")
+
+        self.store = store
+        self.spawns = store.spawns
+
+        # (2, 12, 24, n): bit `hour` of every hour mask, unpacked once.
+        hour_bits = np.arange(24, dtype=np.uint32)
+        self.slots: np.ndarray = (
+            (self.spawns.hour_masks[:, :, None, :] >> hour_bits[:, None])
+            & 1).astype(bool)
+
+        # The spawn table is compiled from the same datasheet, row for row.
+        rows = range(len(self.spawns))
+        self.sell: np.ndarray = np.array(
+            [_to_int(store.column("Sell")[row]) for row in rows],
+            dtype=np.int64)
+
+        self.difficulty: np.ndarray = np.zeros(len(rows), dtype=np.int8)
+        self.difficulty_labels: list[Optional[str]] = [None] * len(rows)
+        column, levels = DIFFICULTY.get(store.category, (None, ()))
+        if column and column in store.sheet:
+            values = store.column(column)
+            self.difficulty_labels = [values[row] for row in rows]
+            self.difficulty = np.array(
+                [levels.index(value) if value in levels else 0
+                 for value in self.difficulty_labels], dtype=np.int8)
+
+        self._where = [_cell(store, "Where/How", row) for row in rows]
+        self._shadow = [_cell(store, "Shadow", row) for row in rows]
+
+    def window(self, query: PlanQuery) -> np.ndarray:
+        """
+        Returns the catchability of every critter over the query window.
+
+        Args:
+            query (PlanQuery): The query.
+
+        Returns:
+            (np.ndarray): Bool of shape (hours + 1, n); row k is the hour
+                          starting k hours after `query.now`.
+        """
+
+        start = query.now.replace(minute=0, second=0, microsecond=0)
+        times = [start + timedelta(hours=k) for k in range(query.hours + 1)]
+        months = np.array([t.month - 1 for t in times])
+        hours = np.array([t.hour for t in times])
+        return self.slots[HEMISPHERE_INDEX[query.hemisphere], months, hours]
+
+    def plan(self, query: PlanQuery, among=None) -> list[dict]:
+        """
+        Lists the selected critters catchable within the query window.
+
+        Args:
+            query (PlanQuery): The query.
+            among (Selection, optional): E.g. the uncaught critters.
+
+        Returns:
+            (list[dict]): One entry per catchable critter, sorted as asked,
+                          with "availableNow" and "availableInHours" (0 for
+                          now, else the first hour within the window).
+        """
+
+        window = self.window(query)
+        selected = window.any(axis=0) & self.spawns.select(among)
+        rows = np.flatnonzero(selected)
+        first = window[:, rows].argmax(axis=0)
+
+        sign = -1 if query.descending else 1
+        if query.sort == "name":
+            order = sorted(range(len(rows)),
+                           key=lambda i: self.spawns.names[rows[i]].lower(),
+                           reverse=query.descending)
+        else:
+            primary = self.sell if query.sort == "sell" else self.difficulty
+            # lexsort sorts by the last key first; ties go to the soonest,
+            # then the most valuable critter.
+            order = np.lexsort((-self.sell[rows], first,
+                                sign * primary[rows].astype(np.int64)))
+            order = order.tolist()
+
+        if query.limit is not None:
+            order = order[:query.limit]
+
+        return [{
+            "name": self.spawns.names[rows[i]],
+            "sell": int(self.sell[rows[i]]),
+            "difficulty": self.difficulty_labels[rows[i]],
+            "where": self._where[rows[i]],
+            "shadow": self._shadow[rows[i]],
+            "availableNow": bool(first[i] == 0),
+            "availableInHours": int(first[i]),
+        } for i in order]
+
+
+def _to_int(value: Optional[str]) -> int:
+    try:
+        return int(str(value).replace(",", ""))
+    except ValueError:
+        return 0
+
+
+def _cell(store: CategoryStore, column: str, row: int) -> Optional[str]:
+    return store.column(column)[row] if column in store.sheet else None
+
+
+_planners: dict[str, Planner] = {}
+
+
+def get_planner(category: str) -> Optional[Planner]:
+    """
+    Returns the planner of a catalog category, building it on first use.
+
+    Args:
+        category (str): The category name, slug or datasheet key.
+
+    Returns:
+        (Planner | None): The planner, or None if the category is unknown or
+                          has no spawn data.
+    """
+
+    from src import main  # pylint: disable=C0415
+
+    store = main.catalog_engine.store(category)
+    if store is None or store.spawns is None:
+        return None
+
+    planner = _planners.get(store.category)
+    if planner is None:
+        planner = _planners.setdefault(store.category, Planner(store))
+    return planner
@@ -0,0 +1,184 @@
+# pylint: disable=E0401
+"""
+A pool of worker processes rendering spawning calendars with matplotlib.
+
+Calendars are drawn through the object-oriented `Figure` API on the Agg
+canvas, with no pyplot state machine, so renders never share global state
+and run on every core at once: `RenderFarm` hands `RenderJob`s to a
+`ProcessPoolExecutor`. Batches (both hemispheres, many users) are submitted
+together and rendered in parallel.
+
+At most `RENDER_QUEUE_SIZE` jobs may be queued or running. Submitting more
+blocks the caller until a slot frees up, for at most `RENDER_QUEUE_WAIT`
+seconds, after which `RenderQueueFull` is raised instead of queueing without
+bound, so callers can answer with a 503 and a Retry-After.
+
+Workers are started lazily on the first render. With the default
+"forkserver" start method they fork from a server that has already imported
+matplotlib and the drawing code, which lives in the leaf module
+`calendar_render` so that neither the server nor the workers load the Flask
+app. New workers start in milliseconds and never inherit the web server's
+threads or connections.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence
+from . import calendar_render
+from .calendar_render import RenderJob, render_job
+from .metrics import RENDER_JOBS
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 1)))
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE",
+                                  str(4 * RENDER_WORKERS)))
+RENDER_START_METHOD = os.getenv("RENDER_START_METHOD", "forkserver")
+# How long a job waits for room in the queue, and for its result, in seconds.
+RENDER_QUEUE_WAIT = float(os.getenv("RENDER_QUEUE_WAIT", "2"))
+RENDER_TIMEOUT = float(os.getenv("RENDER_TIMEOUT", "60"))
+
+
+class RenderQueueFull(Exception):
+    """
+    Raised when the render queue has no room for more jobs.
+    """
+
+
+class RenderFarm:
+    """
+    Renders `RenderJob`s on a bounded pool of worker processes.
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS,
+                 queue_size: int = RENDER_QUEUE_SIZE,
+                 start_method: str = RENDER_START_METHOD):
+        self.workers = max(1, workers)
+        self.queue_size = max(self.workers, queue_size)
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """
+        Returns:
+            (int): The number of jobs queued or running.
+        """
+
+        # pylint: disable=W0212
+        return self.queue_size - self._slots._value
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                if self.start_method == "forkserver":
+                    context.set_forkserver_preload(
+                        ["matplotlib.backends.backend_agg",
+                         "matplotlib.figure", calendar_render.__name__])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context)
+            return self._executor
+
+    def _release(self, future: Future) -> None:
+        self._slots.release()
+        if future.cancelled():
+            return
+        error = future.exception()
+        RENDER_JOBS.inc(result="failed" if error else "done")
+        if isinstance(error, BrokenProcessPool):
+            # A worker died (e.g. killed for memory); start a new pool.
+            with self._lock:
+                self._executor = None
+
+    def submit_batch(self, jobs: Sequence[RenderJob],
+                     wait: float = RENDER_QUEUE_WAIT) -> list[Future]:
+        """
+        Queues a batch of jobs. Each job waits up to `wait` seconds for room
+        in the queue, so a batch larger than the queue is fed in as earlier
+        jobs finish; if any job times out, the whole batch is cancelled.
+
+        Args:
+            jobs (Sequence[RenderJob]): The calendars to render.
+            wait (float, optional): How long each job may wait for room.
+
+        Returns:
+            (list[Future]): One future per job, resolving to its image.
+
+        Raises:
+            RenderQueueFull: If the queue stayed full for `wait` seconds.
+        """
+
+        futures: list[Future] = []
+        for job in jobs:
+            acquired = self._slots.acquire(timeout=wait) if wait > 0 \
+                else self._slots.acquire(blocking=False)
+            if not acquired:
+                for queued in futures:
+                    queued.cancel()
+                RENDER_JOBS.inc(len(jobs) - len(futures), result="rejected")
+                raise RenderQueueFull(
+                    f"{self.pending} of {self.queue_size} render slots used")
+            try:
+                future = self._pool().submit(render_job, job)
+            except BaseException:
+                self._slots.release()
+                for queued in futures:
+                    queued.cancel()
+                raise
+            future.add_done_callback(self._release)
+            futures.append(future)
+        return futures
+
+    def submit(self, job: RenderJob,
+               wait: float = RENDER_QUEUE_WAIT) -> Future:
+        """
+        Queues one job; see `submit_batch()`.
+        """
+
+        return self.submit_batch([job], wait)[0]
+
+    def render_batch(self, jobs: Sequence[RenderJob],
+                     timeout: float = RENDER_TIMEOUT) -> list[bytes]:
+        """
+        Renders a batch of jobs in parallel and waits for every image.
+
+        Args:
+            jobs (Sequence[RenderJob]): The calendars to render.
+            timeout (float, optional): How long to wait for each image.
+
+        Returns:
+            (list[bytes]): The images, in job order.
+
+        Raises:
+            RenderQueueFull: If the queue stayed full; see `submit_batch()`.
+        """
+
+        futures = self.submit_batch(jobs)
+        try:
+            return [future.result(timeout) for future in futures]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def render(self, job: RenderJob, timeout: float = RENDER_TIMEOUT) -> bytes:
+        """
+        Renders one job; see `render_batch()`.
+        """
+
+        return self.render_batch([job], timeout)[0]
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes; they are started again on the next job.
+        """
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+render_farm = RenderFarm()
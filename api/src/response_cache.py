@@ -0,0 +1,225 @@
+# pylint: disable=E0401
+"""
+In-process cache of pre-serialised, pre-compressed JSON response bodies.
+
+A cached body is built once, compressed with gzip (and brotli when the
+`brotli` package is installed), tagged with a strong ETag derived from its
+content and then served as-is until `invalidate()` is called. Conditional
+requests carrying a matching `If-None-Match` get a bodyless 304.
+
+`invalidate()` only reaches the process calling it. A cache given a
+`version` function (e.g. a data version stored in the database) also
+rebuilds when the version changes, checked at most every
+`VERSION_CHECK_INTERVAL` seconds, so writes by other processes show up too.
+
+Builders may return the body as encoded chunks (see `fast_json`) rather than
+a payload, in which case it is hashed and compressed as it streams in.
+"""
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+from flask import Request, Response
+from .fast_json import dumps
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+CACHE_CONTROL = "no-cache"
+VERSION_CHECK_INTERVAL = float(os.getenv("VERSION_CHECK_INTERVAL", "1"))
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """
+    A serialised response body with its compressed variants.
+    """
+
+    etag: str
+    encodings: dict[str, bytes] = field(default_factory=dict)
+
+
+def build_cached_body(payload) -> CachedBody:
+    """
+    Serialises `payload` to JSON and pre-compresses it.
+
+    Args:
+        payload: Any JSON serialisable object.
+
+    Returns:
+        (CachedBody): The serialised body and its compressed variants.
+    """
+
+    return build_cached_body_from_chunks([dumps(payload, sort_keys=True)])
+
+
+def build_cached_body_from_chunks(chunks: Iterable[bytes]) -> CachedBody:
+    """
+    Hashes and compresses an encoded body chunk by chunk.
+
+    Args:
+        chunks (Iterable[bytes]): The serialised body, e.g. from
+                                  `fast_json.stream_json_array()`.
+
+    Returns:
+        (CachedBody): The body and its compressed variants.
+    """
+
+    digest = hashlib.sha256()
+    identity, gzipped = io.BytesIO(), io.BytesIO()
+    compressor = brotli.Compressor() if brotli is not None else None
+    brotli_parts = []
+    with gzip.GzipFile(fileobj=gzipped, mode="wb", mtime=0) as gzip_file:
+        for chunk in chunks:
+            digest.update(chunk)
+            identity.write(chunk)
+            gzip_file.write(chunk)
+            if compressor is not None:
+                brotli_parts.append(compressor.process(chunk))
+
+    encodings = {"identity": identity.getvalue(),
+                 "gzip": gzipped.getvalue()}
+    if compressor is not None:
+        brotli_parts.append(compressor.finish())
+        encodings["br"] = b"".join(brotli_parts)
+
+    return CachedBody(etag=digest.hexdigest()[:32], encodings=encodings)
+
+
+class ResponseCache:
+    """
+    Holds one `CachedBody` built lazily from `builder` until invalidated.
+
+    `builder` returns either a JSON serialisable payload or an iterator of
+    encoded chunks. `version`, if given, returns the version of the data
+    the builder reads; the body is rebuilt whenever it changes.
+    """
+
+    def __init__(self, builder: Callable[[], object],
+                 version: Optional[Callable[[], object]] = None,
+                 check_interval: float = VERSION_CHECK_INTERVAL):
+        self._builder = builder
+        self._version = version
+        self.check_interval = check_interval
+        self._cached: Optional[CachedBody] = None
+        self._built_version: object = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        """
+        Returns whether the data changed since the body was built, asking
+        `version` at most every `check_interval` seconds.
+        """
+
+        if self._version is None or \
+                time.monotonic() - self._checked < self.check_interval:
+            return False
+        self._checked = time.monotonic()
+        return self._version() != self._built_version
+
+    def get(self) -> CachedBody:
+        """
+        Returns the cached body, building it on first use and after the
+        data version changed.
+
+        Returns:
+            (CachedBody): The cached body.
+        """
+
+        cached = self._cached
+        if cached is not None and not self._stale():
+            return cached
+
+        with self._lock:
+            if self._cached is None or self._cached is cached:
+                # Read the version first: a write landing during the build
+                # then triggers another rebuild instead of being missed.
+                version = self._version() if self._version else None
+                built = self._builder()
+                self._cached = (build_cached_body_from_chunks(built)
+                                if isinstance(built, Iterator)
+                                else build_cached_body(built))
+                self._built_version = version
+                self._checked = time.monotonic()
+            return self._cached
+
+    def invalidate(self) -> None:
+        """
+        Drops the cached body so the next request rebuilds it.
+        """
+
+        with self._lock:
+            self._cached = None
+
+    def respond(self, request: Request) -> Response:
+        """
+        Builds the response for `request` from the cached body.
+
+        Args:
+            request (Request): The incoming request.
+
+        Returns:
+            (Response): A 304 if the client's ETag matches, otherwise the body
+                        in the best encoding the client accepts.
+        """
+
+        return make_cached_response(self.get(), request)
+
+
+def _negotiate(cached: CachedBody, request: Request) -> str:
+    """
+    Picks the best available encoding accepted by the client.
+    """
+
+    offered = [enc for enc in ("br", "gzip") if enc in cached.encodings]
+    best = request.accept_encodings.best_match(offered + ["identity"],
+                                               default="identity")
+    return best if best in cached.encodings else "identity"
+
+
+def _etag_for(cached: CachedBody, encoding: str) -> str:
+    """
+    Strong ETags must differ between encodings of the same body.
+    """
+
+    return cached.etag if encoding == "identity" else \
+        f"{cached.etag}-{encoding}"
+
+
+def make_cached_response(cached: CachedBody, request: Request) -> Response:
+    """
+    Builds a response for `request` from `cached`, honouring
+    `If-None-Match` and `Accept-Encoding`.
+
+    Args:
+        cached (CachedBody): The cached body.
+        request (Request): The incoming request.
+
+    Returns:
+        (Response): The 200 or 304 response.
+    """
+
+    encoding = _negotiate(cached, request)
+    etag = _etag_for(cached, encoding)
+
+    if_none_match = request.if_none_match
+    current_tags = {_etag_for(cached, enc) for enc in cached.encodings}
+    if any(if_none_match.contains_weak(tag) for tag in current_tags):
+        response = Response(status=304)
+    else:
+        response = Response(cached.encodings[encoding],
+                            mimetype="application/json")
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.vary.add("Accept-Encoding")
+    return response
@@ -5,6 +5,17 @@ This module intiates the routes for the application.
 from flask import Flask
 from .make_fish_list import make_fish_list_route
 from .get_fish_list import get_fish_list_route
+from .calendar import calendar_route
+from .search import search_route
+from .collections import collections_route
+from .metrics import metrics_route
+from .sync import sync_route
+from .jobs import jobs_route
+from .catalog import catalog_route
+from .planner import planner_route
+from .images import images_route
+from .availability import availability_route
+from .health import health_route
 
 
 def register_routes(app: Flask, db):
@@ -17,3 +28,14 @@ def register_routes(app: Flask, db):
     """
     make_fish_list_route(app, db)
     get_fish_list_route(app)
+    calendar_route(app, db)
+    search_route(app)
+    collections_route(app, db)
+    metrics_route(app)
+    sync_route(app, db)
+    jobs_route(app, db)
+    catalog_route(app)
+    planner_route(app, db)
+    images_route(app, db)
+    availability_route(app)
+    health_route(app, db)
@@ -0,0 +1,63 @@
+# pylint: disable=E0401
+"""
+Routes serving the precomputed availability files.
+
+In production these files can equally be served by the web server or a CDN
+straight from `AVAILABILITY_DIR`; only `manifest.json` must not be cached for
+long.
+"""
+import os
+import re
+from flask import Flask, abort, request, send_from_directory
+from src.availability import AVAILABILITY_DIR, MANIFEST
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_HASHED = re.compile(r"[a-z_]+-[ns]h\.[0-9a-f]{16}\.json")
+
+
+def availability_route(app: Flask):
+    """
+    Register the availability routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    directory = os.path.abspath(AVAILABILITY_DIR)
+
+    @app.route("/availability", methods=["GET"])
+    @app.route("/availability/manifest.json", methods=["GET"])
+    def availability_manifest():
+        """
+        Handles requests to the '/availability' route: the manifest naming
+        the current file of each "<category>/<hemisphere>".
+        """
+
+        if not os.path.exists(os.path.join(directory, MANIFEST)):
+            abort(404)
+        response = send_from_directory(directory, MANIFEST, max_age=0)
+        response.cache_control.no_cache = True
+        return response
+
+    @app.route("/availability/<name>", methods=["GET"])
+    def availability_file(name: str):
+        """
+        Handles requests to the '/availability/<name>' route. File names
+        include a hash of their content, so they are cached for a year.
+        """
+
+        if not _HASHED.fullmatch(name):
+            abort(404)
+
+        gzipped = request.accept_encodings["gzip"] and \
+            os.path.exists(os.path.join(directory, name + ".gz"))
+        response = send_from_directory(
+            directory, name + ".gz" if gzipped else name,
+            mimetype="application/json", max_age=IMMUTABLE_MAX_AGE)
+        if gzipped:
+            response.headers["Content-Encoding"] = "gzip"
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
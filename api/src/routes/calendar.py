@@ -0,0 +1,212 @@
+# pylint: disable=E0401
+"""
+Routes serving the spawning calendar images.
+"""
+import zipfile
+from io import BytesIO
+from typing import Optional
+from flask import Flask, Response, abort, request
+from flask_sqlalchemy import SQLAlchemy
+from werkzeug.exceptions import ServiceUnavailable
+from src.calendars import FORMATS, HEMISPHERES, CalendarRequest
+from src.calendars import render_calendar, render_calendars
+from src.calendar_render import DEFAULT_DPI, MAX_DPI
+from src.render_farm import RenderQueueFull
+from src.user_collections import get_collection
+
+MAX_RENDER_BATCH = 500
+
+# Seconds a client is asked to wait when the render queue is full.
+RETRY_AFTER = 2
+
+
+def valid_render_options(dpi, month) -> bool:
+    """
+    Checks the `dpi` and optional `month` of a JSON render request. Both
+    must be JSON integers: `True` and `3.0` compare equal to ints in Python
+    but are rejected.
+
+    Args:
+        dpi: The requested resolution, 1 to `MAX_DPI`.
+        month: The month (1-12) to mark, or None.
+
+    Returns:
+        (bool): Whether both are valid.
+    """
+
+    def is_int(value) -> bool:
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    return is_int(dpi) and 1 <= dpi <= MAX_DPI and \
+        (month is None or (is_int(month) and 1 <= month <= 12))
+
+
+def uncaught_items(db: SQLAlchemy, category: str,
+                   user_id: Optional[str] = None,
+                   caught: Optional[list[str]] = None) -> list[str]:
+    """
+    Returns the items of a category missing from a user's stored collection,
+    or from the given caught list when no user is given.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        category (str): The catalog category.
+        user_id (str, optional): The user whose collection to use.
+        caught (list[str], optional): The caught item names, as typed.
+
+    Returns:
+        (list[str]): The uncaught item names, in catalog order.
+    """
+
+    from src import main  # pylint: disable=C0415
+
+    if user_id:
+        have = set(get_collection(db, user_id)[category])
+    else:
+        resolver = main.catalog_names.resolvers[category]
+        have = set(resolver.resolve_many(
+            item for item in caught or [] if item)[0])
+
+    return [name for name in main.catalog_engine.stores[category].names
+            if name not in have]
+
+
+def uncaught_fish(db: SQLAlchemy, user_id: Optional[str] = None,
+                  caught: Optional[list[str]] = None) -> list[str]:
+    """
+    Returns the uncaught fish; see `uncaught_items()`.
+    """
+
+    return uncaught_items(db, "fish", user_id, caught)
+
+
+def calendar_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the calendar routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    @app.errorhandler(RenderQueueFull)
+    def render_queue_full(error: RenderQueueFull):
+        return ServiceUnavailable(f"The render queue is full ({error}).",
+                                  retry_after=RETRY_AFTER).get_response()
+
+    def calendar_response(category: str, hemisphere: str) -> Response:
+        from src import main  # pylint: disable=C0415
+
+        store = main.catalog_engine.store(category)
+        hemisphere = hemisphere.lower()
+        if store is None or store.spawns is None or \
+                hemisphere not in HEMISPHERES:
+            abort(404)
+
+        fmt = request.args.get("format", "svg").lower()
+        dpi = request.args.get("dpi", DEFAULT_DPI, type=int)
+        if fmt not in FORMATS or not 1 <= dpi <= MAX_DPI:
+            abort(400)
+
+        uncaught = uncaught_items(db, store.category, request.args.get("user"),
+                                  request.args.get("caught", "").split(","))
+
+        response = Response(render_calendar(hemisphere, uncaught, fmt=fmt,
+                                            category=store.category, dpi=dpi),
+                            mimetype=FORMATS[fmt])
+        response.headers["Cache-Control"] = "private, max-age=3600"
+        return response
+
+    @app.route("/calendar/<hemisphere>", methods=["GET"])
+    def calendar(hemisphere: str):
+        """
+        Handles requests to the '/calendar/<hemisphere>' route.
+
+        The optional `caught` query parameter is a comma separated list of
+        caught fish, which are left off the calendar. Alternatively `user`
+        names a user whose stored collection is used instead.
+
+        `format` picks "svg" (the default), "json" (the raw grid for the
+        front end to draw) or "png", "webp" or "pdf" (the high-resolution
+        matplotlib exports, at `dpi`, default 300). When the render farm is
+        full they answer 503 with a Retry-After.
+        """
+
+        return calendar_response("fish", hemisphere)
+
+    @app.route("/catalog/<category>/calendar/<hemisphere>", methods=["GET"])
+    def category_calendar(category: str, hemisphere: str):
+        """
+        Handles requests to the '/catalog/<category>/calendar/<hemisphere>'
+        route: the '/calendar/<hemisphere>' calendar for any category with
+        spawn data, e.g. "insect" or "sea_creature".
+        """
+
+        return calendar_response(category, hemisphere)
+
+    @app.route("/calendar/render", methods=["POST"])
+    def render_batch():
+        """
+        Handles requests to the '/calendar/render' route: many calendars at
+        once, rendered in parallel on the render farm and returned as a ZIP
+        of "<user>/<category>-<hemisphere>.<format>" files.
+
+        The JSON body names stored `users` and/or inline `collections`
+        ({label: [caught, ...]}), the `hemispheres` (default both), and
+        optionally `category`, `format` (default "png"), `dpi` and `month`.
+        The batch is fed to the farm as slots free up, and rejected with a
+        503 if the farm stays full.
+        """
+
+        from src import main  # pylint: disable=C0415
+
+        body = request.get_json(silent=True) or {}
+        users = body.get("users") or []
+        collections = body.get("collections") or {}
+        hemispheres = body.get("hemispheres") or list(HEMISPHERES)
+        store = main.catalog_engine.store(str(body.get("category", "fish")))
+        fmt = str(body.get("format", "png")).lower()
+        dpi = body.get("dpi", DEFAULT_DPI)
+        month = body.get("month")
+
+        if not isinstance(users, list) or \
+                not isinstance(collections, dict) or \
+                not isinstance(hemispheres, list) or \
+                not all(isinstance(user, str) and user for user in users) or \
+                not all(isinstance(caught, list)
+                        for caught in collections.values()):
+            abort(400, description='Expected a JSON body {"users": [str, '
+                  '...], "collections": {label: [str, ...]}}.')
+        if store is None or store.spawns is None or fmt not in FORMATS or \
+                not set(hemispheres) <= set(HEMISPHERES) or \
+                not valid_render_options(dpi, month):
+            abort(400)
+
+        labels = [*users, *collections]
+        if len(labels) * len(hemispheres) > MAX_RENDER_BATCH:
+            abort(400, description=f"At most {MAX_RENDER_BATCH} calendars "
+                  "per batch.")
+
+        requests = []
+        for label in labels:
+            uncaught = uncaught_items(db, store.category, label) \
+                if label in users else \
+                uncaught_items(db, store.category,
+                               caught=list(map(str, collections[label])))
+            requests.extend(CalendarRequest(hemisphere, uncaught, month, fmt,
+                                            store.category, dpi)
+                            for hemisphere in hemispheres)
+
+        images = iter(render_calendars(requests))
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zipped:
+            for label in labels:
+                for hemisphere in hemispheres:
+                    zipped.writestr(f"{label}/{store.slug}-{hemisphere}.{fmt}",
+                                    next(images))
+
+        response = Response(archive.getvalue(), mimetype="application/zip")
+        response.headers["Content-Disposition"] = \
+            "attachment; filename=calendars.zip"
+        response.headers["Cache-Control"] = "private, no-store"
+        return response
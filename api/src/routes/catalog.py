@@ -0,0 +1,118 @@
+# pylint: disable=E0401
+"""
+Generic routes over every catalog category.
+"""
+from itertools import islice
+from flask import Flask, abort, jsonify, request, stream_with_context
+from src.fast_json import stream_json_array, stream_response
+
+MAX_LIMIT = 500
+
+
+def catalog_route(app: Flask):
+    """
+    Register the catalog routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    def get_store(category: str):
+        from src import main  # pylint: disable=C0415
+
+        store = main.catalog_engine.store(category)
+        if store is None:
+            abort(404)
+        return store
+
+    def parse_fields(store):
+        fields = [field for field in
+                  request.args.get("fields", "Name").split(",") if field]
+        unknown = [field for field in fields if field not in store.sheet]
+        if unknown:
+            return fields, (jsonify({"message": "Unknown fields: "
+                                     f"{', '.join(unknown)}."}), 400)
+        return fields, None
+
+    @app.route("/catalog", methods=["GET"])
+    def catalog():
+        """
+        Handles requests to the '/catalog' route: every category with its
+        size, columns and whether it has spawn calendars.
+        """
+
+        from src import main  # pylint: disable=C0415
+
+        return jsonify({"categories": [
+            {"category": store.category,
+             "slug": store.slug,
+             "title": store.title,
+             "count": len(store),
+             "columns": store.columns,
+             "hasCalendar": store.spawns is not None}
+            for store in main.catalog_engine]})
+
+    @app.route("/catalog/<category>", methods=["GET"])
+    def catalog_items(category: str):
+        """
+        Handles requests to the '/catalog/<category>' route.
+
+        Query parameters: `fields` (comma separated datasheet columns,
+        default "Name"), `offset` and `limit` (default and at most 500).
+        """
+
+        store = get_store(category)
+        fields, error = parse_fields(store)
+        if error:
+            return error
+
+        offset = max(request.args.get("offset", 0, type=int), 0)
+        limit = min(max(request.args.get("limit", MAX_LIMIT, type=int), 1),
+                    MAX_LIMIT)
+
+        records = islice(store, offset, offset + limit)
+        payload = {"category": store.category,
+                   "total": len(store),
+                   "items": [record.to_json(fields) for record in records]}
+        return jsonify(payload)
+
+    @app.route("/catalog/<category>/export", methods=["GET"])
+    def catalog_export(category: str):
+        """
+        Handles requests to the '/catalog/<category>/export' route: every
+        item of the category at once, with the `fields` of
+        '/catalog/<category>' (default every column). The body is encoded
+        and compressed as it is sent rather than built up front.
+        """
+
+        store = get_store(category)
+        if "fields" not in request.args:
+            fields = store.columns
+        else:
+            fields, error = parse_fields(store)
+            if error:
+                return error
+
+        items = (record.to_json(fields) for record in store)
+        return stream_response(stream_with_context(stream_json_array(
+            "items", items, {"category": store.category,
+                             "total": len(store)})))
+
+    @app.route("/catalog/<category>/items/<name>", methods=["GET"])
+    def catalog_item(category: str, name: str):
+        """
+        Handles requests to the '/catalog/<category>/items/<name>' route:
+        every datasheet row of one item (e.g. genuine and fake artwork).
+        """
+
+        from src import main  # pylint: disable=C0415
+
+        store = get_store(category)
+        canonical = main.catalog_names.resolvers[store.category].resolve(name)
+        if canonical is None:
+            abort(404)
+
+        return jsonify({"category": store.category,
+                        "name": canonical,
+                        "rows": [record.to_json()
+                                 for record in store.variants(canonical)]})
@@ -0,0 +1,137 @@
+# pylint: disable=E0401
+"""
+Routes for per-user collections.
+"""
+from flask import Flask, abort, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+from src.batch_status import batch_status, load_collections, resolve_batch
+from src.calendars import HEMISPHERES
+from src.user_collections import add_items, collection_status
+from src.user_collections import get_collection, remove_items
+from src.user_collections import replace_collection
+
+MAX_USER_ID_LENGTH = 64
+MAX_BATCH_USERS = 10000
+
+
+def _items_from_request() -> list[str]:
+    """
+    Reads the "items" list from the JSON body, aborting with a 400 if it is
+    missing or malformed.
+    """
+
+    body = request.get_json(silent=True) or {}
+    items = body.get("items")
+    if not isinstance(items, list) or \
+            not all(isinstance(item, str) for item in items):
+        abort(400, description='Expected a JSON body {"items": [str, ...]}.')
+    return items
+
+
+def _check_user_id(user_id: str) -> None:
+    if not user_id or len(user_id) > MAX_USER_ID_LENGTH:
+        abort(400, description="Invalid user id.")
+
+
+def collections_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the collection routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    @app.route("/users/<user_id>/collection",
+               methods=["GET", "POST", "PUT", "DELETE"])
+    def collection(user_id: str):
+        """
+        Handles requests to the '/users/<user_id>/collection' route.
+
+        GET returns the collection, POST adds the "items" of the JSON body,
+        PUT replaces the collection with them and DELETE removes them.
+        """
+
+        _check_user_id(user_id)
+
+        if request.method == "GET":
+            return jsonify({"user": user_id,
+                            "collection": get_collection(db, user_id)})
+
+        items = _items_from_request()
+        if request.method == "POST":
+            return jsonify(add_items(db, user_id, items))
+        if request.method == "PUT":
+            return jsonify(replace_collection(db, user_id, items))
+        return jsonify(remove_items(db, user_id, items))
+
+    @app.route("/users/<user_id>/status", methods=["GET"])
+    def collection_status_route(user_id: str):
+        """
+        Handles requests to the '/users/<user_id>/status' route.
+
+        The optional `hemisphere` query parameter is "nh" (default) or "sh".
+        """
+
+        _check_user_id(user_id)
+
+        hemisphere = request.args.get("hemisphere", "nh").lower()
+        if hemisphere not in HEMISPHERES:
+            abort(400, description="Unknown hemisphere.")
+
+        return jsonify(collection_status(db, user_id, hemisphere))
+
+    @app.route("/users/status", methods=["POST"])
+    def batch_status_route():
+        """
+        Handles requests to the '/users/status' route: the
+        '/users/<user_id>/status' of many users in one call.
+
+        The JSON body holds `collections` (user id to item names, as typed),
+        `users` (ids whose stored collections are used), or both, plus the
+        optional `hemisphere` ("nh"), `categories` (default all) and `names`
+        (default true; false returns counts instead of item lists).
+        """
+
+        from src import main  # pylint: disable=C0415
+
+        body = request.get_json(silent=True) or {}
+        collections = body.get("collections") or {}
+        user_ids = body.get("users") or []
+        if not isinstance(collections, dict) or \
+                not all(isinstance(items, list) and
+                        all(isinstance(item, str) for item in items)
+                        for items in collections.values()) or \
+                not isinstance(user_ids, list) or \
+                not all(isinstance(user, str) for user in user_ids):
+            abort(400, description='Expected a JSON body {"collections": '
+                  '{user: [str, ...]}, "users": [str, ...]}.')
+        if len(collections) + len(user_ids) > MAX_BATCH_USERS:
+            abort(400, description=f"At most {MAX_BATCH_USERS} users.")
+        for user in [*collections, *user_ids]:
+            _check_user_id(user)
+
+        hemisphere = str(body.get("hemisphere", "nh")).lower()
+        if hemisphere not in HEMISPHERES:
+            abort(400, description="Unknown hemisphere.")
+
+        categories = body.get("categories")
+        if categories is not None:
+            stores = [main.catalog_engine.store(str(category))
+                      for category in categories] \
+                if isinstance(categories, list) else [None]
+            if None in stores:
+                abort(400, description="Unknown category.")
+            categories = [store.category for store in stores]
+
+        names = body.get("names", True)
+        if not isinstance(names, bool):
+            abort(400, description='"names" must be true or false.')
+
+        resolved, unknown = resolve_batch(collections)
+        resolved.update(load_collections(db, user_ids))
+
+        result = batch_status(resolved, hemisphere, categories=categories,
+                              names=names)
+        result["unknown"] = unknown
+        return jsonify(result)
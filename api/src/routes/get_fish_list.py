@@ -2,8 +2,62 @@
 """
 Desc
 """
-from flask import Flask, jsonify
+from typing import Iterator
+from flask import Flask, jsonify, request
+from sqlalchemy import select
+from src.availability import build_availability
+from src.database import db, replica_reads
+from src.fast_json import stream_json_array, stream_query
+from src.fish_query import QUERY_PARAMS, QueryError
+from src.fish_query import parse_fish_query, run_fish_query
 from src.models import Fish
+from src.response_cache import ResponseCache
+from src.upsert import bump_data_version, get_data_version
+
+
+def build_fish_list() -> Iterator[bytes]:
+    """
+    Encodes the '/get_fish_list' payload, every fish under the "fish" key,
+    streaming the rows from the database in batches.
+
+    Returns:
+        (Iterator[bytes]): The encoded JSON in chunks.
+    """
+
+    return stream_json_array(
+        "fish", stream_query(db, select(Fish).order_by(Fish.id),
+                             Fish.to_json))
+
+
+def fish_data_version() -> int:
+    """
+    Returns:
+        (int): The shared version of the `Fish` table's data.
+    """
+
+    return get_data_version(db, Fish.__tablename__)
+
+
+# Rebuilt when any process (e.g. another gunicorn worker) writes the table.
+fish_list_cache = ResponseCache(build_fish_list, version=fish_data_version)
+
+
+def refresh_fish_views() -> None:
+    """
+    Brings everything derived from the `Fish` table up to date after an
+    ingest or sync changed it: bumps the shared data version, so every
+    process drops its cached fish list, drops this process's right away and
+    republishes the availability files.
+    """
+
+    try:
+        bump_data_version(db, Fish.__tablename__)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    fish_list_cache.invalidate()
+    build_availability(db)
 
 
 def get_fish_list_route(app: Flask):
@@ -18,9 +72,33 @@ def get_fish_list_route(app: Flask):
     def get_fish_list():
         """
         Handles requests to the '/get_fish_list' route.
+
+        Without query parameters every fish is served from
+        `fish_list_cache`, which is invalidated by the ingest. Otherwise the
+        parameters select a page of a filtered query:
+
+            location, size, rarity  comma separated values to match
+            min_price, max_price    an inclusive price range
+            month, hemisphere       available in month 1-12 in "nh" / "sh"
+            sort                    id, name, price, location, size or
+                                    rarity; prefix "-" for descending
+            limit                   page size, at most 200 (default 50)
+            cursor                  the "nextCursor" of the previous page
+            fields                  comma separated fields to return
         """
 
-        all_fish = Fish.query.all()
-        all_fish_json = list(map(lambda x: x.to_json(), all_fish))
+        if QUERY_PARAMS.isdisjoint(request.args.keys()):
+            return fish_list_cache.respond(request)
+
+        try:
+            query = parse_fish_query(request.args)
+        except QueryError as e:
+            return jsonify({"message": str(e)}), 400
 
-        return jsonify({"fish": all_fish_json})
+        # Pages may lag an ingest slightly; the full list above is rebuilt
+        # from the primary so its cache never pins stale rows. Pages are
+        # rarely requested twice, so they are compressed on the way out in
+        # the one encoding the client asked for rather than cached.
+        with replica_reads():
+            page = run_fish_query(db, query)
+        return jsonify(page)
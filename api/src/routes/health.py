@@ -0,0 +1,42 @@
+# pylint: disable=E0401
+"""
+Liveness and readiness routes for load balancers and orchestrators.
+"""
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from src.serving import readiness
+
+
+def health_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the health routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    @app.route("/healthz", methods=["GET"])
+    def healthz():
+        """
+        Handles requests to the '/healthz' route: 200 as long as the process
+        serves requests at all.
+        """
+
+        response = jsonify({"status": "ok"})
+        response.cache_control.no_store = True
+        return response
+
+    @app.route("/readyz", methods=["GET"])
+    def readyz():
+        """
+        Handles requests to the '/readyz' route: 200 once the database
+        answers and the caches are warm, 503 with what is missing otherwise.
+        """
+
+        ready, checks = readiness(db)
+        response = jsonify({"status": "ready" if ready else "warming",
+                            **checks})
+        response.status_code = 200 if ready else 503
+        response.cache_control.no_store = True
+        return response
@@ -0,0 +1,44 @@
+# pylint: disable=E0401
+"""
+Routes serving the locally cached critter images.
+"""
+import re
+from flask import Flask, abort, send_file
+from flask_sqlalchemy import SQLAlchemy
+from src.images import MIMETYPES, VARIANT_FORMAT, VARIANT_SIZES, serve_path
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+def images_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the image routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    @app.route("/images/<digest>-<int:size>.<fmt>", methods=["GET"])
+    def image(digest: str, size: int, fmt: str):
+        """
+        Handles requests to the '/images/<digest>-<size>.<format>' route, as
+        linked by the "iconUrl" of a fish. The URL names fixed content, so
+        it is cached by browsers and proxies for a year without revalidation.
+        """
+
+        if not _DIGEST.fullmatch(digest) or size not in VARIANT_SIZES or \
+                fmt != VARIANT_FORMAT:
+            abort(404)
+
+        path = serve_path(db, digest, size)
+        if path is None:
+            abort(404)
+
+        response = send_file(path, mimetype=MIMETYPES[fmt],
+                             max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
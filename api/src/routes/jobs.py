@@ -0,0 +1,188 @@
+# pylint: disable=E0401
+"""
+Routes queueing background jobs and reporting on them.
+"""
+from flask import Flask, Response, abort, jsonify, request, url_for
+from flask_sqlalchemy import SQLAlchemy
+from src.calendars import FORMATS, HEMISPHERES, render_calendar
+from src.jobs import JobOutput, JobQueue
+from src.calendar_render import DEFAULT_DPI
+from src.sync import INGEST_SOURCE, INGEST_SOURCES, fish_changed, ingest
+from src.sync import link_fish_images, sync_fish
+from .calendar import uncaught_items, valid_render_options
+from .get_fish_list import refresh_fish_views
+
+
+def queue_image_caching(app: Flask) -> dict:
+    """
+    Queues the "cache_images" job, e.g. after an ingest changed the fish,
+    unless one is already queued or running.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Returns:
+        (dict): The queued (or already active) job.
+    """
+
+    return app.extensions["jobs"].submit("cache_images", {})[0]
+
+
+def jobs_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the job routes and job kinds with the Flask app.
+
+    Job kinds:
+        ingest           the full `/make_fish_list` rebuild, with param
+                         `source` ("nookipedia" or "local")
+        sync             the incremental Nookipedia sync
+        cache_images     downloads the fish images not cached yet; queued
+                         by the ingests and syncs that changed the fish
+        render_calendar  a calendar render into the calendar cache, with
+                         params `category` (default "fish"), `hemisphere`,
+                         `format`, `month`, `dpi` and either `user` or
+                         `caught`; the image is served from
+                         '/jobs/<id>/result' (the job's "outputUrl")
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    queue = JobQueue(app, db)
+    app.extensions["jobs"] = queue
+
+    def run_ingest(params: dict, progress) -> dict:
+        counts = ingest(db, params.get("source", INGEST_SOURCE),
+                        lambda done, total: progress(done / total))
+        if fish_changed(counts):
+            refresh_fish_views()
+            queue_image_caching(app)
+        return counts
+
+    def run_sync(params: dict, progress) -> dict:
+        del params, progress
+        counts = sync_fish(db)
+        if fish_changed(counts):
+            refresh_fish_views()
+            queue_image_caching(app)
+        return counts
+
+    def run_cache_images(params: dict, progress) -> dict:
+        del params, progress
+        counts = link_fish_images(db)
+        if counts["linked"]:
+            refresh_fish_views()
+        return counts
+
+    def run_render(params: dict, progress) -> JobOutput:
+        del progress
+        category = params.get("category", "fish")
+        uncaught = uncaught_items(db, category, params.get("user"),
+                                  params.get("caught"))
+        image = render_calendar(params["hemisphere"], uncaught,
+                                params.get("month"), params["format"],
+                                category, params.get("dpi", DEFAULT_DPI))
+        mimetype = FORMATS[params["format"]]
+        return JobOutput({"bytes": len(image), "mimetype": mimetype}, image,
+                         mimetype)
+
+    queue.register("ingest", run_ingest)
+    queue.register("sync", run_sync)
+    queue.register("cache_images", run_cache_images)
+    queue.register("render_calendar", run_render)
+
+    def with_links(job: dict) -> dict:
+        job["outputUrl"] = url_for("get_job_result", job_id=job["id"]) \
+            if job["outputType"] else None
+        return job
+
+    def accepted(job: dict, created: bool):
+        response = jsonify({"job": with_links(job), "created": created})
+        response.status_code = 202
+        response.headers["Location"] = url_for("get_job", job_id=job["id"])
+        return response
+
+    @app.route("/make_fish_list", methods=["POST"])
+    def queue_fish_list():
+        """
+        Handles requests to queue a full ingest on the '/make_fish_list'
+        route, from the `source` query parameter like the GET variant, which
+        still runs the ingest inline.
+        """
+
+        source = request.args.get("source", INGEST_SOURCE)
+        if source not in INGEST_SOURCES:
+            abort(400)
+        return accepted(*queue.submit("ingest", {"source": source}))
+
+    @app.route("/jobs", methods=["POST"])
+    def create_job():
+        """
+        Handles requests to the '/jobs' route. The body is JSON with the job
+        `kind` and its `params`.
+        """
+
+        body = request.get_json(silent=True) or {}
+        kind = body.get("kind")
+        params = body.get("params") or {}
+        if kind not in queue.kinds or not isinstance(params, dict):
+            abort(400)
+
+        if kind == "render_calendar":
+            from src import main  # pylint: disable=C0415
+
+            store = main.catalog_engine.store(
+                str(params.get("category", "fish")))
+            hemisphere = str(params.get("hemisphere", "")).lower()
+            fmt = str(params.get("format", "svg")).lower()
+            month = params.get("month")
+            dpi = params.get("dpi", DEFAULT_DPI)
+            caught = params.get("caught") or []
+            if store is None or store.spawns is None or \
+                    hemisphere not in HEMISPHERES or fmt not in FORMATS or \
+                    not isinstance(caught, list) or \
+                    not valid_render_options(dpi, month):
+                abort(400)
+            # Canonical parameters so equivalent renders are deduplicated.
+            params = {"category": store.category,
+                      "hemisphere": hemisphere, "format": fmt,
+                      "month": month, "dpi": dpi,
+                      "user": params.get("user"),
+                      "caught": sorted(set(map(str, caught)))}
+        elif kind == "ingest":
+            source = params.get("source", INGEST_SOURCE)
+            if source not in INGEST_SOURCES:
+                abort(400)
+            params = {"source": source}
+        else:
+            params = {}
+
+        return accepted(*queue.submit(kind, params))
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def get_job(job_id: str):
+        """
+        Handles requests to the '/jobs/<job_id>' route.
+        """
+
+        job = queue.get(job_id)
+        if job is None:
+            abort(404)
+        return jsonify(with_links(job))
+
+    @app.route("/jobs/<job_id>/result", methods=["GET"])
+    def get_job_result(job_id: str):
+        """
+        Handles requests to the '/jobs/<job_id>/result' route: the file a
+        finished job produced, such as a rendered calendar. Answers 404
+        until the job is done, and for jobs producing no file.
+        """
+
+        output = queue.output(job_id)
+        if output is None:
+            abort(404)
+        data, mimetype = output
+        response = Response(data, mimetype=mimetype)
+        response.headers["Cache-Control"] = "private, max-age=3600"
+        return response
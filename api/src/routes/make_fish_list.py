@@ -2,46 +2,15 @@
 """
 Desc
 """
-import os
-import requests
-from flask import Flask, jsonify
-from dotenv import load_dotenv
+from flask import Flask, abort, jsonify, request
+from requests import RequestException
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.exc import IntegrityError, OperationalError, DatabaseError
 from sqlalchemy.exc import StatementError, InvalidRequestError
-from src.models import Fish
-
-load_dotenv()
-
-API_KEY = os.getenv("NOOKIPEDIA_API_KEY")
-
-headers = {"X-API-KEY": API_KEY, "Accept-Version": "1.7.0"}
-
-URL = "https://api.nookipedia.com/nh/fish"
-
-
-def get_fish_info(name: str = ""):
-    """
-    Get's the fish info based on the name.
-
-    Args:
-        name (str): The fish name.
-    """
-    if name:
-        response = requests.get(url=f"{URL}/{name}",
-                                headers=headers,
-                                timeout=10)
-    else:
-        params = {'excludedetails': 'true'}
-        response = requests.get(url=URL,
-                                headers=headers,
-                                params=params,
-                                timeout=30)
-
-    if response.status_code != 200:
-        return (response.status_code, "Something went wrong.")
-
-    return (response.status_code, response.json())
+from src.nookipedia import NookipediaError
+from src.sync import INGEST_SOURCE, INGEST_SOURCES, fish_changed, ingest
+from .get_fish_list import refresh_fish_views
+from .jobs import queue_image_caching
 
 
 def make_fish_list_route(app: Flask, db: SQLAlchemy):
@@ -55,41 +24,36 @@ def make_fish_list_route(app: Flask, db: SQLAlchemy):
     @app.route("/make_fish_list", methods=["GET"])
     def make_fish_list():
         """
-        Handles requests to the '/make_fish_list' route.
+        Handles requests to the '/make_fish_list' route. `source=local`
+        loads the bundled data files instead of calling Nookipedia. When the
+        fish changed, their images are downloaded by a "cache_images" job,
+        whose id is returned as "imagesJob".
         """
 
-        _, fish_arr = get_fish_info()
-        for fish in fish_arr:
-            _, fish_info = get_fish_info(fish)
-
-            available = fish_info["north"]["availability_array"][0]
-
-            new_fish = Fish(
-                name=fish_info["name"],
-                image_url=fish_info["image_url"],
-                rarity=fish_info["rarity"],
-                price=fish_info["sell_nook"],
-                location=fish_info["location"],
-                size=fish_info["shadow_size"],
-                time=available["time"],
-                nh_months=fish_info["north"]["months"],
-                sh_months=fish_info["south"]["months"],
-            )
-
-            try:
-                db.session.add(new_fish)
-                db.session.commit()
-            except IntegrityError:
-                db.session.rollback()
-                return jsonify({"message": "Integrity error."}), 400
-            except OperationalError:
-                db.session.rollback()
-                return jsonify({"message": "Operational error."}), 500
-            except (DatabaseError, StatementError, InvalidRequestError):
-                db.session.rollback()
-                return jsonify({"message": "There was an error."}), 500
-            except Exception as e:  # pylint: disable=W0718
-                db.session.rollback()
-                return jsonify({"message": f"Unexpected error: {e}"}), 500
-
-        return jsonify({"message": "Fish list created!"}), 201
+        source = request.args.get("source", INGEST_SOURCE)
+        if source not in INGEST_SOURCES:
+            abort(400)
+
+        try:
+            counts = ingest(db, source)
+        except NookipediaError as e:
+            return jsonify({"message": "Could not fetch the fish list.",
+                            "status": e.status_code}), 502
+        except RequestException as e:
+            return jsonify({"message": f"Could not reach Nookipedia: {e}"}), 502
+        except IntegrityError:
+            return jsonify({"message": "Integrity error."}), 400
+        except OperationalError:
+            return jsonify({"message": "Operational error."}), 500
+        except (DatabaseError, StatementError, InvalidRequestError):
+            return jsonify({"message": "There was an error."}), 500
+        except Exception as e:  # pylint: disable=W0718
+            return jsonify({"message": f"Unexpected error: {e}"}), 500
+
+        images_job = None
+        if fish_changed(counts):
+            refresh_fish_views()
+            images_job = queue_image_caching(app)["id"]
+
+        return jsonify({"message": "Fish list created!", **counts,
+                        "imagesJob": images_job}), 201
@@ -0,0 +1,25 @@
+# pylint: disable=E0401
+"""
+Prometheus metrics route.
+"""
+from flask import Flask, Response
+from src.metrics import REGISTRY
+
+
+def metrics_route(app: Flask):
+    """
+    Register the metrics route with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        """
+        Handles requests to the '/metrics' route in the Prometheus text
+        exposition format.
+        """
+
+        return Response(REGISTRY.render(),
+                        content_type="text/plain; version=0.0.4; charset=utf-8")
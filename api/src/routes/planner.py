@@ -0,0 +1,76 @@
+# pylint: disable=E0401
+"""
+Routes answering "what can I catch now?".
+"""
+from datetime import datetime
+from flask import Flask, abort, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+from src.calendars import HEMISPHERES
+from src.planner import (MAX_HOURS, SORT_KEYS, PlanQuery, get_planner,
+                         resolve_timezone)
+from .calendar import uncaught_items
+
+
+def planner_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the planner routes with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    @app.route("/planner", methods=["GET"])
+    def planner():
+        """
+        Handles requests to the '/planner' route: the uncaught critters
+        catchable now or within the next `hours`.
+
+        Query parameters:
+            category    "fish" (default), "insect" or "sea_creature"
+            hemisphere  "nh" (default) or "sh"
+            tz          IANA zone or "+HH:MM" offset of the player's clock
+            at          ISO local time to plan from instead of now
+            hours       how many hours ahead to look, 0 (default) to 168
+            user        a user whose stored collection is used, or
+            caught      a comma separated list of caught critters
+            sort        "sell", "difficulty" or "name"; prefix "-" for
+                        descending (default "-sell")
+            limit       the maximum number of results
+        """
+
+        planner_ = get_planner(request.args.get("category", "fish"))
+        if planner_ is None:
+            abort(404)
+
+        hemisphere = request.args.get("hemisphere", "nh").lower()
+        hours = request.args.get("hours", 0, type=int)
+        limit = request.args.get("limit", type=int)
+        sort = request.args.get("sort", "-sell")
+        if hemisphere not in HEMISPHERES or not 0 <= hours <= MAX_HOURS or \
+                sort.lstrip("-") not in SORT_KEYS or \
+                (limit is not None and limit < 1):
+            abort(400)
+
+        try:
+            zone = resolve_timezone(request.args.get("tz"))
+            now = datetime.now(zone)
+            if request.args.get("at"):
+                now = datetime.fromisoformat(request.args["at"])
+                now = (now.astimezone(zone) if now.tzinfo
+                       else now.replace(tzinfo=zone))
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+
+        query = PlanQuery(now=now, hemisphere=hemisphere, hours=hours,
+                          sort=sort.lstrip("-"),
+                          descending=sort.startswith("-"), limit=limit)
+        uncaught = uncaught_items(db, planner_.store.category,
+                                  request.args.get("user"),
+                                  request.args.get("caught", "").split(","))
+
+        return jsonify({"category": planner_.store.category,
+                        "hemisphere": hemisphere,
+                        "now": now.isoformat(timespec="minutes"),
+                        "hours": hours,
+                        "results": planner_.plan(query, uncaught)})
@@ -0,0 +1,44 @@
+# pylint: disable=E0401
+"""
+Typeahead search route over every datasheet.
+"""
+from flask import Flask, jsonify, request
+from src.search import get_catalog_index
+
+
+def search_route(app: Flask):
+    """
+    Register the search route with the Flask app.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+
+    @app.route("/search", methods=["GET"])
+    def search():
+        """
+        Handles requests to the '/search' route.
+
+        Query parameters: `q` (the user input), `limit` (default 10, clamped
+        to 1-50), `threshold` (minimum fuzzy score, default 80) and
+        `category` (a category name or slug, as in '/catalog').
+        """
+
+        from src import main  # pylint: disable=C0415
+
+        query = request.args.get("q", "")[:100]
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        threshold = request.args.get("threshold", 80, type=int)
+
+        category = request.args.get("category") or None
+        if category is not None:
+            store = main.catalog_engine.store(category)
+            if store is None:
+                return jsonify({"message": "Unknown category: "
+                                f"{category}."}), 400
+            category = store.category
+
+        results = get_catalog_index().search(query, limit, threshold,
+                                             category)
+
+        return jsonify({"results": list(results)})
@@ -0,0 +1,47 @@
+# pylint: disable=E0401
+"""
+Routes driving the incremental Nookipedia sync.
+"""
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+from src.sync import SYNC_INTERVAL, SyncScheduler
+from .get_fish_list import refresh_fish_views
+from .jobs import queue_image_caching
+
+
+def sync_route(app: Flask, db: SQLAlchemy):
+    """
+    Register the sync routes with the Flask app. The periodic sync (every
+    `NOOKIPEDIA_SYNC_INTERVAL` seconds, if set) is not started here, as
+    importing the app must not spawn threads in a forking server's master;
+    the serving process starts `app.extensions["fish_sync"]` itself.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+    """
+
+    def on_change() -> None:
+        refresh_fish_views()
+        queue_image_caching(app)
+
+    scheduler = SyncScheduler(app, db, SYNC_INTERVAL, on_change=on_change)
+    app.extensions["fish_sync"] = scheduler
+
+    @app.route("/sync_fish", methods=["POST"])
+    def sync_fish():
+        """
+        Handles requests to start a sync on the '/sync_fish' route.
+        """
+
+        scheduler.trigger()
+        return jsonify({"message": "Sync started.",
+                        **scheduler.status()}), 202
+
+    @app.route("/sync_fish", methods=["GET"])
+    def sync_fish_status():
+        """
+        Handles requests for the state of the '/sync_fish' route.
+        """
+
+        return jsonify(scheduler.status())
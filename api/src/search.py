@@ -0,0 +1,228 @@
+# pylint: disable=E0401
+"""
+Precomputed fuzzy search over item names.
+
+Names are normalised once with rapidfuzz's `default_process` (the same
+processing `thefuzz` applies on every call) and a trigram inverted index is
+built over them. A query then only scores the names sharing a trigram with
+it, with `score_cutoff` letting rapidfuzz bail out early, and results are
+memoised in an LRU cache since typeahead traffic repeats the same prefixes.
+"""
+import os
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, Optional
+from rapidfuzz import fuzz, process
+from rapidfuzz.utils import default_process
+
+CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "4096"))
+
+# The p99 latency budget (in milliseconds) of an uncached typeahead query,
+# checked by `benchmarks/search_latency.py`.
+P99_TARGET_MS = float(os.getenv("SEARCH_P99_TARGET_MS", "5"))
+
+
+def _trigrams(text: str) -> set[str]:
+    """
+    Returns the set of trigrams of `text` padded with spaces.
+    """
+
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    A fuzzy search index over (name, category) entries.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, str]],
+                 cache_size: int = CACHE_SIZE):
+        unique = dict.fromkeys(entries)
+        self.names: list[str] = [name for name, _ in unique]
+        self.categories: list[str] = [category for _, category in unique]
+        self.lowered: list[str] = [name.lower() for name in self.names]
+        self.normalised: list[str] = [default_process(name)
+                                      for name in self.names]
+
+        grams: defaultdict[str, list[int]] = defaultdict(list)
+        for row, name in enumerate(self.normalised):
+            for gram in _trigrams(name):
+                grams[gram].append(row)
+        self._grams = dict(grams)
+
+        self.search = lru_cache(maxsize=cache_size)(self._search)
+        self.closest_match = lru_cache(maxsize=cache_size)(
+            self._closest_match)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def cache_clear(self) -> None:
+        """
+        Clears the memoised results.
+        """
+
+        self.search.cache_clear()
+        self.closest_match.cache_clear()
+
+    def candidates(self, query: str) -> list[int]:
+        """
+        Returns the rows sharing at least one trigram with the normalised
+        `query`, or every row if the query is too short to prefilter.
+
+        Args:
+            query (str): The normalised query.
+
+        Returns:
+            (list[int]): The candidate rows, in index order.
+        """
+
+        if len(query) < 3:
+            return list(range(len(self)))
+
+        rows = set()
+        for gram in _trigrams(query):
+            rows.update(self._grams.get(gram, ()))
+
+        return sorted(rows) if rows else list(range(len(self)))
+
+    def scores(self, query: str, rows: list[int],
+               score_cutoff: int = 0) -> list[tuple[int, int]]:
+        """
+        Scores `rows` against the normalised `query` with WRatio, rounded the
+        way `thefuzz` rounds them.
+
+        Args:
+            query (str): The normalised query.
+            rows (list[int]): The rows to score.
+            score_cutoff (int): The minimum score to keep.
+
+        Returns:
+            (list[tuple[int, int]]): (row, score) pairs sorted by descending
+                                     unrounded score, then index order.
+        """
+
+        if not query or not rows:
+            return []
+
+        matches = process.extract(query,
+                                  [self.normalised[row] for row in rows],
+                                  scorer=fuzz.WRatio,
+                                  processor=None,
+                                  score_cutoff=max(score_cutoff - 0.5, 0),
+                                  limit=None)
+
+        ordered = sorted(matches, key=lambda match: (-match[1], match[2]))
+        scored = [(rows[i], int(round(score))) for _, score, i in ordered]
+        return [(row, score) for row, score in scored
+                if score >= score_cutoff]
+
+    def _search(self, query: str, limit: int = 10, threshold: int = 80,
+                category: Optional[str] = None) -> tuple[dict, ...]:
+        """
+        Typeahead search: prefix hits, then substring hits, then fuzzy hits
+        scoring at least `threshold`.
+
+        Args:
+            query (str): The user input.
+            limit (int): The maximum number of results.
+            threshold (int): The minimum fuzzy score.
+            category (str, optional): Only return entries of this category.
+
+        Returns:
+            (tuple[dict, ...]): {"name", "category", "score"} per result.
+        """
+
+        lowered = query.strip().lower()
+        if not lowered:
+            return ()
+
+        def allowed(row: int) -> bool:
+            return category is None or self.categories[row] == category
+
+        ranked: dict[int, tuple[int, int]] = {}
+        for row, name in enumerate(self.lowered):
+            if allowed(row) and lowered in name:
+                ranked[row] = (0 if name.startswith(lowered) else 1, 100)
+
+        normalised = default_process(query)
+        rows = [row for row in self.candidates(normalised)
+                if allowed(row) and row not in ranked]
+        for row, score in self.scores(normalised, rows, threshold):
+            ranked[row] = (2, score)
+
+        ordered = sorted(ranked.items(),
+                         key=lambda item: (item[1][0], -item[1][1],
+                                           self.lowered[item[0]]))
+
+        return tuple({"name": self.names[row],
+                      "category": self.categories[row],
+                      "score": score}
+                     for row, (_, score) in ordered[:limit])
+
+    def _closest_match(self, user_in: str,
+                       threshold: int = 80) -> tuple[str, ...]:
+        """
+        Implements `src.main.get_closest_match` over the index: substring
+        hits win over fuzzy hits unless the fuzzy hits score higher.
+
+        Args:
+            user_in (str): The user input.
+            threshold (int): The minimum fuzzy score.
+
+        Returns:
+            (tuple[str, ...]): The matching names.
+        """
+
+        lowered = user_in.lower()
+        normalised = default_process(user_in)
+        every_row = list(range(len(self)))
+
+        substring_rows = [row for row in every_row
+                          if lowered in self.lowered[row]]
+        substring_scores = self.scores(normalised, substring_rows)
+        substring_max = max((score for _, score in substring_scores),
+                            default=0)
+
+        fuzzy = self.scores(normalised, every_row, threshold)
+        fuzzy_max = max((score for _, score in fuzzy), default=0)
+
+        possible_matches = tuple(self.names[row] for row in substring_rows)
+        filtered_matches = tuple(self.names[row] for row, _ in fuzzy)
+
+        if substring_max > fuzzy_max:
+            return possible_matches
+
+        if fuzzy_max > substring_max:
+            return filtered_matches
+
+        if len(possible_matches) >= len(filtered_matches):
+            return possible_matches
+
+        return filtered_matches
+
+
+_catalog_index: Optional[SearchIndex] = None
+
+
+def get_catalog_index() -> SearchIndex:
+    """
+    Returns the search index over every datasheet loaded in `src.main`,
+    building it on first use.
+
+    Returns:
+        (SearchIndex): The catalog wide index.
+    """
+
+    global _catalog_index  # pylint: disable=W0603
+
+    if _catalog_index is None:
+        from src import main  # pylint: disable=C0415
+
+        _catalog_index = SearchIndex(
+            (name, category)
+            for category, names in main.catalog.items()
+            for name in names if isinstance(name, str))
+
+    return _catalog_index
@@ -0,0 +1,142 @@
+# pylint: disable=E0401
+"""
+Startup, cache warm-up and readiness for serving the app.
+
+`prepare_app()` runs everything `run.py` used to do before serving: it
+creates and upgrades the tables and publishes the availability files. Then
+it builds the datasheets, name and search indexes and planners up front.
+Under gunicorn with `preload_app` this happens once in the master, so the
+forked workers share the warm caches copy-on-write instead of each
+rebuilding them on its first requests. The cached fish list is not warmed:
+it follows the table's data version, so each worker builds its own on
+first use and rebuilds it after any process writes the table.
+
+`readiness()` backs '/readyz': it reports the database and every warm-up
+step, and is only ready once they all succeeded.
+"""
+import threading
+import time
+from typing import Callable
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+
+_warm: dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _load_catalog() -> None:
+    from src import main  # pylint: disable=C0415
+
+    del main
+
+
+def _build_search_index() -> None:
+    from src.search import get_catalog_index  # pylint: disable=C0415
+
+    get_catalog_index()
+
+
+def _build_planners() -> None:
+    from src import main  # pylint: disable=C0415
+    from src.planner import get_planner  # pylint: disable=C0415
+
+    for store in main.catalog_engine:
+        if store.spawns is not None:
+            get_planner(store.category)
+
+
+# Warm-up step name to the function doing it, in order.
+WARM_UP_STEPS: dict[str, Callable[[], None]] = {
+    "catalog": _load_catalog,
+    "search_index": _build_search_index,
+    "planners": _build_planners,
+}
+
+
+def prepare_database(app: Flask, db: SQLAlchemy) -> int:
+    """
+    Creates and upgrades the tables, backfills the month masks and
+    publishes the availability files.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+
+    Returns:
+        (int): The number of stored fish.
+    """
+
+    # pylint: disable=C0415
+    from src.availability import build_availability
+    from src.database import upgrade_schema
+    from src.models import Fish
+    from src.upsert import backfill_month_masks
+    # pylint: enable=C0415
+
+    with app.app_context():
+        db.create_all()  # Create tables if they don't exist
+        upgrade_schema(db)  # Add columns introduced since
+        backfill_month_masks(db)
+        build_availability(db)  # Publish the static availability files
+        return Fish.query.count()
+
+
+def warm_caches(app: Flask) -> dict[str, float]:
+    """
+    Runs every `WARM_UP_STEPS` step not done yet.
+
+    Args:
+        app (Flask): The Flask application instance.
+
+    Returns:
+        (dict[str, float]): Every step done so far to its duration in
+                            seconds.
+    """
+
+    with _lock, app.app_context():
+        for name, step in WARM_UP_STEPS.items():
+            if name not in _warm:
+                start = time.perf_counter()
+                step()
+                _warm[name] = round(time.perf_counter() - start, 4)
+        return dict(_warm)
+
+
+def prepare_app(app: Flask, db: SQLAlchemy) -> dict:
+    """
+    Gets the app ready to serve: `prepare_database()` then `warm_caches()`.
+
+    Args:
+        app (Flask): The Flask application instance.
+        db (SQLAlchemy): The application database.
+
+    Returns:
+        (dict): The number of "fish" and the "warm" step durations.
+    """
+
+    fish = prepare_database(app, db)
+    return {"fish": fish, "warm": warm_caches(app)}
+
+
+def readiness(db: SQLAlchemy) -> tuple[bool, dict]:
+    """
+    Checks whether this process can serve traffic at full speed.
+
+    Args:
+        db (SQLAlchemy): The application database.
+
+    Returns:
+        (tuple(bool, dict)): Whether it is ready, and the "database" status
+                             with the "warm" status of every warm-up step.
+    """
+
+    try:
+        db.session.execute(text("SELECT 1"))
+        database = "ok"
+    except Exception as error:  # pylint: disable=W0718
+        database = f"error: {type(error).__name__}"
+
+    warm = {name: name in _warm for name in WARM_UP_STEPS}
+    return (database == "ok" and all(warm.values()),
+            {"database": database, "warm": warm})
@@ -0,0 +1,361 @@
+# pylint: disable=E0401
+"""
+Compiled binary snapshot of the datasheets in `api/data`.
+
+`build_snapshot()` compiles every `*_datasheet.csv` plus `fish_info.json` into
+one versioned file: an interned string table, an int32 cell matrix per
+datasheet pointing into it, and the precompiled spawn bitmasks of the critter
+sheets. `load_snapshot()` memory-maps that file, so startup costs a header
+parse instead of CSV parsing and pandas imports. If the file is missing, of
+another version or older than its sources, the same structures are compiled
+in memory from the CSVs instead.
+
+File layout:
+    MAGIC (8 bytes) | version (u32) | header length (u32) | JSON header |
+    padding | arrays, each aligned to ALIGNMENT bytes
+"""
+import csv
+import json
+import os
+import struct
+from functools import cached_property
+from typing import Optional
+import numpy as np
+from .spawn_engine import SpawnTable, compile_spawn_table
+
+DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+SNAPSHOT_PATH = os.getenv("ACNH_SNAPSHOT",
+                          os.path.join(DATA_DIR, "datasheets.snapshot"))
+
+MAGIC = b"ACNHSNAP"
+SNAPSHOT_VERSION = 1
+ALIGNMENT = 64
+
+DATASHEET_SUFFIX = "_datasheet.csv"
+FISH_INFO = "fish_info.json"
+
+# The strings pandas reads as NaN by default, kept as missing cells so the
+# snapshot agrees with `pd.read_csv`.
+NA_VALUES = frozenset([
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+])
+
+
+class StringTable:
+    """
+    Strings stored as one UTF-8 blob plus offsets, decoded on access.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if index < 0:
+            return None
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+
+class Datasheet:
+    """
+    A read-only view of one datasheet in the snapshot.
+    """
+
+    def __init__(self, name: str, columns: list[str], cells: np.ndarray,
+                 strings: StringTable):
+        self.name = name
+        self.columns = columns
+        self.cells = cells
+        self.strings = strings
+        self._column_index = {column: i for i, column in enumerate(columns)}
+        self._decoded: dict[str, list[Optional[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __contains__(self, column: str) -> bool:
+        return column in self._column_index
+
+    def __getitem__(self, column: str) -> list[Optional[str]]:
+        """
+        Returns a column as strings, None for missing cells.
+
+        Args:
+            column (str): The column name.
+
+        Returns:
+            (list[str | None]): The decoded column.
+        """
+
+        decoded = self._decoded.get(column)
+        if decoded is None:
+            indices = self.cells[:, self._column_index[column]]
+            decoded = [self.strings[i] for i in indices.tolist()]
+            self._decoded[column] = decoded
+        return decoded
+
+    @property
+    def names(self) -> list[Optional[str]]:
+        """
+        Returns:
+            (list[str | None]): The "Name" column.
+        """
+
+        return self["Name"]
+
+
+class Snapshot:
+    """
+    The compiled datasheets, spawn tables and fish info.
+    """
+
+    def __init__(self, header: dict, arrays: dict[str, np.ndarray],
+                 path: Optional[str] = None):
+        self.header = header
+        self.arrays = arrays
+        self.path = path
+        self.strings = StringTable(arrays["strings.blob"],
+                                   arrays["strings.offsets"])
+
+        self.datasheets: dict[str, Datasheet] = {
+            name: Datasheet(name, meta["columns"], arrays[f"{name}.cells"],
+                            self.strings)
+            for name, meta in header["datasheets"].items()
+        }
+
+        self.spawns: dict[str, SpawnTable] = {}
+        for name in header["spawns"]:
+            names = np.array(self.datasheets[name].names, dtype=object)
+            self.spawns[name] = SpawnTable(
+                names=names,
+                month_masks=arrays[f"{name}.month_masks"],
+                hour_masks=arrays[f"{name}.hour_masks"],
+                index={n: row for row, n in enumerate(names)})
+
+    @property
+    def version(self) -> int:
+        """
+        Returns:
+            (int): The snapshot format version.
+        """
+
+        return self.header["version"]
+
+    @cached_property
+    def fish_info(self) -> list[dict]:
+        """
+        Returns:
+            (list[dict]): The decoded contents of `fish_info.json`.
+        """
+
+        return json.loads(self.arrays["fish_info"].tobytes().decode("utf-8"))
+
+
+def source_files(data_dir: str = DATA_DIR) -> list[str]:
+    """
+    Returns:
+        (list[str]): The file names compiled into the snapshot.
+    """
+
+    names = sorted(name for name in os.listdir(data_dir)
+                   if name.endswith(DATASHEET_SUFFIX))
+    if os.path.exists(os.path.join(data_dir, FISH_INFO)):
+        names.append(FISH_INFO)
+    return names
+
+
+def source_signature(data_dir: str = DATA_DIR) -> dict[str, list[int]]:
+    """
+    Returns:
+        (dict[str, list[int]]): File name to [size, mtime_ns] of every source.
+    """
+
+    signature = {}
+    for name in source_files(data_dir):
+        stat = os.stat(os.path.join(data_dir, name))
+        signature[name] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def compile_sources(data_dir: str = DATA_DIR) -> tuple[
+        dict, dict[str, np.ndarray]]:
+    """
+    Compiles the sources into the snapshot header and arrays.
+
+    Args:
+        data_dir (str): The directory holding the datasheets.
+
+    Returns:
+        (tuple(dict, dict[str, np.ndarray])): The header and arrays.
+    """
+
+    interned: dict[str, int] = {}
+    header: dict = {"version": SNAPSHOT_VERSION,
+                    "sources": source_signature(data_dir),
+                    "datasheets": {},
+                    "spawns": []}
+    arrays: dict[str, np.ndarray] = {}
+
+    def intern(value: str) -> int:
+        if value in NA_VALUES:
+            return -1
+        return interned.setdefault(value, len(interned))
+
+    for file_name in source_files(data_dir):
+        if not file_name.endswith(DATASHEET_SUFFIX):
+            continue
+
+        name = file_name[:-len(DATASHEET_SUFFIX)]
+        path = os.path.join(data_dir, file_name)
+        with open(path, newline="", encoding="utf-8") as handle:
+            reader = csv.reader(handle)
+            columns = next(reader)
+            cells = np.array([[intern(value) for value in row]
+                              for row in reader], dtype=np.int32)
+
+        header["datasheets"][name] = {"columns": columns}
+        arrays[f"{name}.cells"] = cells.reshape(-1, len(columns))
+
+    strings = list(interned)
+    encoded = [value.encode("utf-8") for value in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    arrays["strings.blob"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    arrays["strings.offsets"] = offsets
+
+    table = StringTable(arrays["strings.blob"], offsets)
+    for name in header["datasheets"]:
+        sheet = Datasheet(name, header["datasheets"][name]["columns"],
+                          arrays[f"{name}.cells"], table)
+        if "NH Jan" in sheet:
+            spawns = compile_spawn_table(sheet)
+            arrays[f"{name}.month_masks"] = spawns.month_masks
+            arrays[f"{name}.hour_masks"] = spawns.hour_masks
+            header["spawns"].append(name)
+
+    info_path = os.path.join(data_dir, FISH_INFO)
+    info = b"[]"
+    if os.path.exists(info_path):
+        with open(info_path, "rb") as handle:
+            info = json.dumps(json.load(handle),
+                              separators=(",", ":")).encode("utf-8")
+    arrays["fish_info"] = np.frombuffer(info, dtype=np.uint8)
+
+    return (header, arrays)
+
+
+def build_snapshot(data_dir: str = DATA_DIR,
+                   path: str = SNAPSHOT_PATH) -> str:
+    """
+    Compiles the sources and writes the snapshot file.
+
+    Args:
+        data_dir (str): The directory holding the datasheets.
+        path (str): Where to write the snapshot.
+
+    Returns:
+        (str): The path written.
+    """
+
+    header, arrays = compile_sources(data_dir)
+    header["arrays"] = {}
+
+    header_size = len(json.dumps(header)) + 64 * len(arrays) + 4096
+    offset = _align(len(MAGIC) + 8 + header_size)
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[key] = array
+        header["arrays"][key] = {"dtype": array.dtype.str,
+                                 "shape": list(array.shape),
+                                 "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    if len(encoded) > header_size:
+        raise ValueError("Snapshot header overflowed its reserved space.")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(MAGIC)
+        handle.write(struct.pack("<II", SNAPSHOT_VERSION, len(encoded)))
+        handle.write(encoded)
+        for key, array in arrays.items():
+            handle.seek(header["arrays"][key]["offset"])
+            handle.write(array.tobytes())
+        handle.truncate(offset)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def read_snapshot(path: str = SNAPSHOT_PATH) -> Optional[Snapshot]:
+    """
+    Memory-maps a snapshot file.
+
+    Args:
+        path (str): The snapshot file.
+
+    Returns:
+        (Snapshot | None): The snapshot, or None if the file is missing, of
+                           another format version or malformed.
+    """
+
+    try:
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+    except (OSError, ValueError):
+        return None
+
+    prefix = len(MAGIC) + 8
+    if mapped[:len(MAGIC)].tobytes() != MAGIC:
+        return None
+
+    version, header_len = struct.unpack("<II",
+                                        mapped[len(MAGIC):prefix].tobytes())
+    if version != SNAPSHOT_VERSION:
+        return None
+
+    header = json.loads(mapped[prefix:prefix + header_len].tobytes())
+
+    arrays = {}
+    for key, meta in header["arrays"].items():
+        dtype = np.dtype(meta["dtype"])
+        count = int(np.prod(meta["shape"], dtype=np.int64))
+        start = meta["offset"]
+        arrays[key] = mapped[start:start + count * dtype.itemsize] \
+            .view(dtype).reshape(meta["shape"])
+
+    return Snapshot(header, arrays, path)
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH,
+                  data_dir: str = DATA_DIR) -> Snapshot:
+    """
+    Loads the snapshot file if it is current, otherwise compiles the sources
+    in memory.
+
+    Args:
+        path (str): The snapshot file.
+        data_dir (str): The directory holding the datasheets.
+
+    Returns:
+        (Snapshot): The datasheets.
+    """
+
+    snapshot = read_snapshot(path)
+    if snapshot is not None and \
+            snapshot.header["sources"] == source_signature(data_dir):
+        return snapshot
+
+    header, arrays = compile_sources(data_dir)
+    return Snapshot(header, arrays)
@@ -0,0 +1,329 @@
+# pylint: disable=E0401
+"""
+Compact, vectorised spawn availability for the critter datasheets.
+
+A datasheet is compiled once into packed bitmasks: a 12-bit month mask per
+hemisphere and a 24-bit hour mask per hemisphere and month, parsed from the
+"4 AM – 9 PM" style time strings. Availability questions then become bitwise
+operations over a few NumPy arrays instead of string / DataFrame scans.
+"""
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Optional, Union
+import numpy as np
+
+MONTHS: tuple[str, ...] = ("Jan", "Feb", "Mar", "Apr", "May", "Jun",
+                           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+HEMISPHERE_INDEX: dict[str, int] = {"nh": 0, "sh": 1}
+
+ALL_HOURS = (1 << 24) - 1
+ALL_MONTHS = (1 << 12) - 1
+
+_MONTH_INDEX = {month.lower(): i for i, month in enumerate(MONTHS)}
+_MONTH = re.compile(r"[A-Za-z]{3,}")
+
+_RANGE = re.compile(r"(\d{1,2})\s*(AM|PM)\s*[–-]\s*(\d{1,2})\s*(AM|PM)",
+                    re.IGNORECASE)
+
+Selection = Optional[Union[np.ndarray, Iterable[str]]]
+
+
+def _to_24h(hour: str, meridiem: str) -> int:
+    """
+    Converts a 12-hour clock hour to 0-23.
+    """
+
+    return int(hour) % 12 + (12 if meridiem.upper() == "PM" else 0)
+
+
+@lru_cache(maxsize=None)
+def parse_hours(time: Optional[str]) -> int:
+    """
+    Parses a datasheet time string into a 24-bit hour mask, where bit `h` is
+    set if the critter can be caught between h:00 and h:59.
+
+    Args:
+        time (str | None): E.g. "4 AM – 9 PM", "4 PM – 9 AM",
+                           "9 AM – 4 PM; 9 PM – 4 AM", "All day" or "NA".
+
+    Returns:
+        (int): The hour mask. 0 when the critter is not available.
+    """
+
+    if not isinstance(time, str):
+        return 0
+
+    time = time.replace("\xa0", " ").strip()
+    if time.lower() == "all day":
+        return ALL_HOURS
+
+    mask = 0
+    for start_h, start_m, end_h, end_m in _RANGE.findall(time):
+        start = _to_24h(start_h, start_m)
+        end = _to_24h(end_h, end_m)
+        hour = start
+        while True:
+            mask |= 1 << hour
+            hour = (hour + 1) % 24
+            if hour == end:
+                break
+
+    return mask
+
+
+@lru_cache(maxsize=None)
+def parse_months(months: Optional[str]) -> int:
+    """
+    Parses a Nookipedia months string into a 12-bit month mask, where bit `m`
+    is set if the critter appears in month `m + 1`.
+
+    Args:
+        months (str | None): E.g. "All year", "Nov – Mar", "Jan, Feb, Dec"
+                             or "May – Jun; Sep – Nov".
+
+    Returns:
+        (int): The month mask. 0 when nothing could be parsed.
+    """
+
+    if not isinstance(months, str):
+        return 0
+
+    months = months.replace("\xa0", " ").strip()
+    if months.lower() in ("all year", "year-round", "all"):
+        return ALL_MONTHS
+
+    mask = 0
+    for part in re.split(r"[;,&]", months):
+        found = [_MONTH_INDEX.get(name[:3].lower())
+                 for name in _MONTH.findall(part)]
+        found = [index for index in found if index is not None]
+        if not found:
+            continue
+
+        start, end = found[0], found[-1]
+        if len(found) == 2 and re.search(r"[–-]", part):
+            month = start
+            while True:
+                mask |= 1 << month
+                if month == end:
+                    break
+                month = (month + 1) % 12
+        else:
+            for month in found:
+                mask |= 1 << month
+
+    return mask
+
+
+def format_months(mask: int) -> str:
+    """
+    Formats a 12-bit month mask the way Nookipedia writes months, the
+    inverse of `parse_months()`.
+
+    Args:
+        mask (int): The month mask.
+
+    Returns:
+        (str): E.g. "All year", "Nov – Mar" or "May – Jun; Sep – Nov", and
+               "" for an empty mask.
+    """
+
+    mask &= ALL_MONTHS
+    if mask == ALL_MONTHS:
+        return "All year"
+
+    runs = []
+    for start in range(12):
+        if not mask >> start & 1 or mask >> (start - 1) % 12 & 1:
+            continue
+        end = start
+        while mask >> (end + 1) % 12 & 1:
+            end = (end + 1) % 12
+        runs.append(MONTHS[start] if start == end
+                    else f"{MONTHS[start]} – {MONTHS[end]}")
+    return "; ".join(runs)
+
+
+@dataclass(frozen=True)
+class SpawnTable:
+    """
+    Packed availability for one datasheet.
+
+    Attributes:
+        names (np.ndarray): Critter names, in datasheet order.
+        month_masks (np.ndarray): uint16 of shape (2, n); bit `m` is set if
+                                  the critter appears in month `m + 1`.
+        hour_masks (np.ndarray): uint32 of shape (2, 12, n); the hour mask of
+                                 every critter for each hemisphere and month.
+    """
+
+    names: np.ndarray
+    month_masks: np.ndarray
+    hour_masks: np.ndarray
+    index: dict[str, int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def select(self, among: Selection = None) -> np.ndarray:
+        """
+        Converts a selection into a boolean row mask.
+
+        Args:
+            among (np.ndarray | Iterable[str], optional): A boolean mask over
+                the rows, or the names to select. Defaults to every row.
+
+        Returns:
+            (np.ndarray): The boolean row mask.
+        """
+
+        if among is None:
+            return np.ones(len(self), dtype=bool)
+
+        if isinstance(among, np.ndarray) and among.dtype == bool:
+            return among
+
+        mask = np.zeros(len(self), dtype=bool)
+        rows = [self.index[name] for name in among if name in self.index]
+        mask[rows] = True
+        return mask
+
+    def _names(self, mask: np.ndarray) -> list[str]:
+        return self.names[mask].tolist()
+
+    def available(self, month: int, hemisphere: str) -> np.ndarray:
+        """
+        Args:
+            month (int): The month, 1-12.
+            hemisphere (str): "nh" or "sh".
+
+        Returns:
+            (np.ndarray): Boolean mask of the rows present in `month`.
+        """
+
+        masks = self.month_masks[HEMISPHERE_INDEX[hemisphere]]
+        return ((masks >> np.uint16(month - 1)) & 1).astype(bool)
+
+    def catchable_mask(self, month: int, hour: int,
+                       hemisphere: str) -> np.ndarray:
+        """
+        Args:
+            month (int): The month, 1-12.
+            hour (int): The hour, 0-23.
+            hemisphere (str): "nh" or "sh".
+
+        Returns:
+            (np.ndarray): Boolean mask of the rows catchable at that time.
+        """
+
+        masks = self.hour_masks[HEMISPHERE_INDEX[hemisphere], month - 1]
+        return ((masks >> np.uint32(hour)) & 1).astype(bool)
+
+    def catchable(self, month: int, hour: int, hemisphere: str,
+                  among: Selection = None) -> list[str]:
+        """
+        Returns the selected critters catchable in `month` at `hour`.
+
+        Args:
+            month (int): The month, 1-12.
+            hour (int): The hour, 0-23.
+            hemisphere (str): "nh" or "sh".
+            among (Selection, optional): E.g. the uncaught critters.
+
+        Returns:
+            (list[str]): The catchable critter names.
+        """
+
+        return self._names(self.catchable_mask(month, hour, hemisphere)
+                           & self.select(among))
+
+    def leaving(self, month: int, hemisphere: str,
+                among: Selection = None) -> list[str]:
+        """
+        Returns the selected critters present in `month` but not the next.
+
+        Args:
+            month (int): The month, 1-12.
+            hemisphere (str): "nh" or "sh".
+            among (Selection, optional): E.g. the uncaught critters.
+
+        Returns:
+            (list[str]): The critter names leaving after `month`.
+        """
+
+        following = month % 12 + 1
+        return self._names(self.available(month, hemisphere)
+                           & ~self.available(following, hemisphere)
+                           & self.select(among))
+
+    def arriving(self, month: int, hemisphere: str,
+                 among: Selection = None) -> list[str]:
+        """
+        Returns the selected critters absent in `month` but present the next.
+
+        Args:
+            month (int): The month, 1-12.
+            hemisphere (str): "nh" or "sh".
+            among (Selection, optional): E.g. the uncaught critters.
+
+        Returns:
+            (list[str]): The critter names arriving next month.
+        """
+
+        following = month % 12 + 1
+        return self._names(~self.available(month, hemisphere)
+                           & self.available(following, hemisphere)
+                           & self.select(among))
+
+    def month_grid(self, hemisphere: str,
+                   among: Selection = None) -> tuple[list[str], np.ndarray]:
+        """
+        Unpacks the month masks of the selected critters into a 0/1 grid.
+
+        Args:
+            hemisphere (str): "nh" or "sh".
+            among (Selection, optional): E.g. the uncaught critters.
+
+        Returns:
+            (tuple(list[str], np.ndarray)): The names and a uint8 array of
+                                            shape (len(names), 12).
+        """
+
+        mask = self.select(among)
+        masks = self.month_masks[HEMISPHERE_INDEX[hemisphere]][mask]
+        grid = (masks[:, None] >> np.arange(12, dtype=np.uint16)) & 1
+        return (self._names(mask), grid.astype(np.uint8))
+
+
+def compile_spawn_table(dataframe) -> SpawnTable:
+    """
+    Compiles a critter datasheet with "Name" and "NH Jan" ... "SH Dec"
+    columns into a `SpawnTable`.
+
+    Args:
+        dataframe (pd.DataFrame | Datasheet): The datasheet, anything
+                                              indexable by column name.
+
+    Returns:
+        (SpawnTable): The packed availability.
+    """
+
+    names = np.array(list(dataframe["Name"]), dtype=object)
+    hour_masks = np.zeros((2, 12, len(names)), dtype=np.uint32)
+
+    for hemisphere, h_index in HEMISPHERE_INDEX.items():
+        for m_index, month in enumerate(MONTHS):
+            column = dataframe[f"{hemisphere.upper()} {month}"]
+            hour_masks[h_index, m_index] = [parse_hours(t) for t in column]
+
+    month_bits = (hour_masks != 0).astype(np.uint16)
+    month_masks = np.zeros((2, len(names)), dtype=np.uint16)
+    for m_index in range(12):
+        month_masks |= month_bits[:, m_index] << np.uint16(m_index)
+
+    return SpawnTable(names=names,
+                      month_masks=month_masks,
+                      hour_masks=hour_masks,
+                      index={name: row for row, name in enumerate(names)})
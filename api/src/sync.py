@@ -0,0 +1,343 @@
+# pylint: disable=E0401
+"""
+Full and incremental syncs of the `Fish` table from Nookipedia.
+
+`ingest_fish()` refetches every fish and upserts the lot; `ingest()` can
+instead load the bundled data files (see `local_source`). `sync_fish()`
+instead sends each fish's stored `ETag` / `Last-Modified` validators, skips
+304s, compares the content hash of what did come back and only writes rows
+that really changed.
+`SyncScheduler` runs it on a background thread, periodically and on demand,
+so no request handler blocks on Nookipedia. Only one process should run the
+periodic sync: under gunicorn that is one designated worker (see
+`gunicorn.conf.py`), never the master.
+Neither downloads images: when they changed the table, callers queue the
+"cache_images" job (`link_fish_images()`), so slow or unreachable image
+hosts never hold up an ingest or sync.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+import requests
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from .images import cache_fish_images
+from .local_source import ingest_local_fish
+from .models import Fish
+from .nookipedia import MAX_WORKERS, NookipediaError, Progress
+from .nookipedia import fetch_all_fish, fetch_fish_changes, fetch_fish_names
+from .nookipedia import to_fish_row
+from .upsert import FISH_COLUMNS, fish_content_hash, upsert_fish, upsert_rows
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = float(os.getenv("NOOKIPEDIA_SYNC_INTERVAL", "0"))
+
+# Where full ingests load from by default: "nookipedia" or "local".
+INGEST_SOURCES: tuple[str, ...] = ("nookipedia", "local")
+INGEST_SOURCE = os.getenv("INGEST_SOURCE", "nookipedia")
+
+SYNC_COLUMNS: tuple[str, ...] = FISH_COLUMNS + (
+    "content_hash", "etag", "last_modified", "fetched_at",
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def ingest_fish(db: SQLAlchemy, max_workers: int = MAX_WORKERS,
+                session: Optional[requests.Session] = None,
+                progress: Optional[Progress] = None) -> dict:
+    """
+    Refetches every fish and upserts the table.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        max_workers (int): The maximum number of requests in flight.
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+        progress (Progress, optional): Called with (done, total) as the
+                                       detail fetches complete.
+
+    Returns:
+        (dict): The number of rows "inserted", "updated" and "unchanged",
+                plus the per fish "failures".
+
+    Raises:
+        NookipediaError: If the list of fish names cannot be fetched.
+        requests.RequestException: If Nookipedia cannot be reached.
+        sqlalchemy.exc.SQLAlchemyError: If the upsert fails.
+    """
+
+    records, failures = fetch_all_fish(max_workers=max_workers,
+                                       session=session, progress=progress)
+
+    rows = []
+    for fish_info in records:
+        try:
+            rows.append(to_fish_row(fish_info))
+        except (KeyError, IndexError, TypeError) as e:
+            failures[fish_info.get("name", "?")] = f"Bad record: {e}"
+
+    counts = upsert_fish(db, rows)
+    return {**counts, "failures": failures}
+
+
+def ingest(db: SQLAlchemy, source: str = INGEST_SOURCE,
+           progress: Optional[Progress] = None) -> dict:
+    """
+    Runs a full ingest from `source`.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        source (str, optional): "nookipedia" for `ingest_fish()` or "local"
+                                for `local_source.ingest_local_fish()`.
+        progress (Progress, optional): Called with (done, total) as the
+                                       Nookipedia fetches complete.
+
+    Returns:
+        (dict): The ingest counts.
+
+    Raises:
+        ValueError: For an unknown source.
+    """
+
+    if source == "local":
+        return ingest_local_fish(db)
+    if source == "nookipedia":
+        return ingest_fish(db, progress=progress)
+    raise ValueError(f"Unknown ingest source '{source}'.")
+
+
+def sync_fish(db: SQLAlchemy, max_workers: int = MAX_WORKERS,
+              session: Optional[requests.Session] = None) -> dict:
+    """
+    Brings the `Fish` table up to date, fetching only what changed.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        max_workers (int): The maximum number of requests in flight.
+        session (requests.Session, optional): The session to use. Defaults to
+                                              the shared session.
+
+    Returns:
+        (dict): The number of fish "checked", "not_modified" (304),
+                "unchanged" (same content hash), "inserted" and "updated",
+                plus the per fish "failures".
+
+    Raises:
+        NookipediaError: If the list of fish names cannot be fetched.
+    """
+
+    table = Fish.__table__
+    stored = {
+        name: (content_hash, etag, last_modified)
+        for name, content_hash, etag, last_modified in db.session.execute(
+            select(table.c.name, table.c.content_hash, table.c.etag,
+                   table.c.last_modified))
+    }
+
+    names = fetch_fish_names(session)
+    responses, failures = fetch_fish_changes(
+        {name: state[1:] for name, state in stored.items()}, names,
+        max_workers, session)
+
+    now = _utcnow()
+    changed, revalidated, touched = [], [], []
+    for response in responses:
+        if response.not_modified:
+            touched.append({"b_name": response.name})
+            continue
+
+        try:
+            row = to_fish_row(response.record)
+        except (KeyError, IndexError, TypeError) as e:
+            failures[response.name] = f"Bad record: {e}"
+            continue
+
+        row.update(content_hash=fish_content_hash(row), etag=response.etag,
+                   last_modified=response.last_modified, fetched_at=now)
+        previous = stored.get(row["name"])
+        if previous is not None and previous[0] == row["content_hash"]:
+            revalidated.append({"b_name": row["name"],
+                                "etag": response.etag,
+                                "last_modified": response.last_modified})
+        else:
+            changed.append(row)
+
+    counts = {"inserted": 0, "updated": 0}
+    if changed:
+        written = upsert_rows(db, Fish, changed, SYNC_COLUMNS)
+        counts = {"inserted": written["inserted"],
+                  "updated": written["updated"]}
+
+    try:
+        by_name = table.c.name == bindparam("b_name")
+        if revalidated:
+            db.session.execute(
+                update(table).where(by_name).values(
+                    etag=bindparam("etag"),
+                    last_modified=bindparam("last_modified"),
+                    fetched_at=now),
+                revalidated)
+        if touched:
+            db.session.execute(
+                update(table).where(by_name).values(fetched_at=now), touched)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"checked": len(responses),
+            "not_modified": len(touched),
+            "unchanged": len(revalidated),
+            **counts,
+            "failures": failures}
+
+
+def link_fish_images(db: SQLAlchemy) -> dict:
+    """
+    Downloads the fish images missing from the image cache and links the
+    fish to them; the body of the "cache_images" job.
+
+    Args:
+        db (SQLAlchemy): The application database.
+
+    Returns:
+        (dict): The number of fish whose icon was "linked" and the number
+                of image URLs that could not be downloaded ("failures").
+    """
+
+    images = cache_fish_images(db)
+    return {"linked": images["linked"], "failures": len(images["failures"])}
+
+
+def fish_changed(counts: dict) -> bool:
+    """
+    Returns whether an ingest or sync changed what the fish list serves.
+
+    Args:
+        counts (dict): The result of `ingest_fish()` or `sync_fish()`.
+
+    Returns:
+        (bool): True if rows were written or icons linked.
+    """
+
+    return bool(counts["inserted"] or counts["updated"]
+                or counts.get("images", {}).get("linked"))
+
+
+class SyncScheduler:
+    """
+    Runs `sync_fish()` on a background thread every `interval` seconds once
+    started, and whenever `trigger()` is called. Runs never overlap.
+    """
+
+    def __init__(self, app: Flask, db: SQLAlchemy,
+                 interval: float = SYNC_INTERVAL,
+                 on_change: Optional[Callable[[], None]] = None):
+        self.app = app
+        self.db = db
+        self.interval = interval
+        self.on_change = on_change
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._periodic = False
+        self._triggered = False
+        self._status: dict = {"running": False, "last_run": None}
+
+    def start(self, periodic: bool = True) -> "SyncScheduler":
+        """
+        Starts the background thread if it is not running yet.
+
+        Args:
+            periodic (bool, optional): Whether to sync every `interval`
+                                       seconds, starting right away, rather
+                                       than only on `trigger()`. A running
+                                       thread turns periodic, never back.
+        """
+
+        with self._lock:
+            self._periodic = self._periodic or periodic
+            self._wake.set()  # Let a waiting thread see the new mode
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop,
+                                                name="fish-sync", daemon=True)
+                self._thread.start()
+        return self
+
+    def trigger(self) -> None:
+        """
+        Requests a sync as soon as the current one, if any, finishes.
+        """
+
+        self.start(periodic=False)
+        with self._lock:
+            self._triggered = True
+        self._wake.set()
+
+    def status(self) -> dict:
+        """
+        Returns:
+            (dict): Whether a sync is "running" and the "last_run" with its
+                    start and finish times and result or error.
+        """
+
+        with self._lock:
+            return dict(self._status)
+
+    def _loop(self) -> None:
+        next_run = time.monotonic()
+        while True:
+            with self._lock:
+                periodic = self._periodic and self.interval > 0
+                triggered, self._triggered = self._triggered, False
+                self._wake.clear()
+            if triggered or (periodic and time.monotonic() >= next_run):
+                next_run = time.monotonic() + self.interval
+                self.run_once()
+                continue
+            self._wake.wait(max(next_run - time.monotonic(), 0)
+                            if periodic else None)
+
+    def run_once(self) -> dict:
+        """
+        Runs one sync in an app context and records its outcome.
+
+        Returns:
+            (dict): The recorded run.
+        """
+
+        run: dict = {"started": _utcnow().isoformat()}
+        with self._lock:
+            self._status["running"] = True
+
+        try:
+            with self.app.app_context():
+                run["result"] = sync_fish(self.db)
+                if fish_changed(run["result"]):
+                    if self.on_change is not None:
+                        self.on_change()
+        except NookipediaError as e:
+            run["error"] = f"Could not fetch the fish list: " \
+                           f"{e.status_code}"
+        except requests.RequestException as e:
+            run["error"] = f"Could not reach Nookipedia: {e}"
+        except SQLAlchemyError as e:
+            run["error"] = f"Database error: {e.__class__.__name__}"
+        except Exception as e:  # pylint: disable=W0718
+            # Anything else must not kill the scheduler thread either.
+            logger.exception("Fish sync failed")
+            run["error"] = f"Sync failed: {e.__class__.__name__}: {e}"
+        finally:
+            run["finished"] = _utcnow().isoformat()
+            with self._lock:
+                self._status = {"running": False, "last_run": run}
+        return run
@@ -0,0 +1,213 @@
+# pylint: disable=E0401
+"""
+Bulk, idempotent persistence for the `Fish` table.
+
+Rows are written with a single `INSERT ... ON CONFLICT(name) DO UPDATE`
+statement inside one transaction. Existing rows are read once up front so
+unchanged rows are skipped entirely and the caller gets inserted / updated /
+unchanged counts back.
+
+Every row also stores `content_hash`, a digest of its data columns, which the
+incremental sync compares instead of the individual columns.
+
+Writing any row also bumps the table's `DataVersion` in the same
+transaction. The version is shared by every process using the database, so
+per-process caches (the cached fish list) compare it to notice writes made
+elsewhere.
+"""
+import hashlib
+import json
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from .models import DataVersion, Fish
+from .spawn_engine import parse_months
+
+FISH_COLUMNS: tuple[str, ...] = (
+    "name", "image_url", "rarity", "price", "location", "size", "time",
+    "nh_months", "sh_months", "nh_month_mask", "sh_month_mask",
+)
+
+
+def fish_content_hash(row: dict) -> str:
+    """
+    Returns a digest of the data columns of a `Fish` row.
+
+    Args:
+        row (dict): `Fish` column name to value.
+
+    Returns:
+        (str): The hex SHA-256 of the `FISH_COLUMNS` values.
+    """
+
+    values = json.dumps([row.get(column) for column in FISH_COLUMNS],
+                        separators=(",", ":"))
+    return hashlib.sha256(values.encode("utf-8")).hexdigest()
+
+
+def dialect_insert(dialect_name: str):
+    """
+    Returns the `insert` construct supporting `ON CONFLICT` for a dialect.
+
+    Args:
+        dialect_name (str): The SQLAlchemy dialect name of the engine.
+
+    Returns:
+        (callable): The dialect specific `insert` function.
+    """
+
+    if dialect_name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+
+def bump_data_version(db: SQLAlchemy, name: str) -> None:
+    """
+    Increments the data version of `name` in the session's transaction;
+    the caller commits.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        name (str): The versioned data, by convention its table name.
+    """
+
+    table = DataVersion.__table__
+    stmt = dialect_insert(db.engine.dialect.name)(table).values(
+        name=name, version=1)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=["name"], set_={"version": table.c.version + 1}))
+
+
+def get_data_version(db: SQLAlchemy, name: str) -> int:
+    """
+    Reads the current data version of `name`, outside any open transaction
+    so writes committed by other processes are seen.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        name (str): The versioned data, by convention its table name.
+
+    Returns:
+        (int): The version, 0 if it was never written.
+    """
+
+    table = DataVersion.__table__
+    with db.engine.connect() as conn:
+        return conn.execute(select(table.c.version)
+                            .where(table.c.name == name)).scalar() or 0
+
+
+def upsert_rows(db: SQLAlchemy, model, rows: list[dict],
+                columns: tuple[str, ...], key: str = "name") -> dict[str, int]:
+    """
+    Inserts or updates `rows` of `model` in a single transaction, skipping
+    rows whose stored values already match, and bumps the table's data
+    version if any row was written.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        model: The mapped model class.
+        rows (list[dict]): Column name to value, one dict per row. Later rows
+                           win when the same key appears twice.
+        columns (tuple[str, ...]): The columns to write.
+        key (str): The unique column used for conflict detection.
+
+    Returns:
+        (dict[str, int]): The number of rows "inserted", "updated" and
+                          "unchanged".
+    """
+
+    table = model.__table__
+    incoming = {row[key]: {c: row.get(c) for c in columns} for row in rows}
+
+    existing = {
+        row[0]: dict(zip(columns, row[1:]))
+        for row in db.session.execute(
+            select(table.c[key], *(table.c[c] for c in columns)))
+    }
+
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    changed = []
+
+    for name, row in incoming.items():
+        stored = existing.get(name)
+        if stored is None:
+            counts["inserted"] += 1
+        elif stored == row:
+            counts["unchanged"] += 1
+            continue
+        else:
+            counts["updated"] += 1
+        changed.append(row)
+
+    try:
+        if changed:
+            insert = dialect_insert(db.engine.dialect.name)
+            stmt = insert(table)
+            updatable = [c for c in columns if c != key]
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key],
+                set_={c: stmt.excluded[c] for c in updatable},
+                where=or_(*(table.c[c].is_distinct_from(stmt.excluded[c])
+                            for c in updatable)),
+            )
+            db.session.execute(stmt, changed)
+            bump_data_version(db, table.name)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return counts
+
+
+def upsert_fish(db: SQLAlchemy, rows: list[dict]) -> dict[str, int]:
+    """
+    Bulk upserts `Fish` rows keyed on the fish name.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        rows (list[dict]): `Fish` column name to value, one dict per fish.
+
+    Returns:
+        (dict[str, int]): The number of rows "inserted", "updated" and
+                          "unchanged".
+    """
+
+    rows = [{**row, "content_hash": fish_content_hash(row)} for row in rows]
+    return upsert_rows(db, Fish, rows, FISH_COLUMNS + ("content_hash",))
+
+
+def backfill_month_masks(db: SQLAlchemy) -> int:
+    """
+    Fills in the month masks of rows stored before they existed.
+
+    Args:
+        db (SQLAlchemy): The application database.
+
+    Returns:
+        (int): The number of rows updated.
+    """
+
+    table = Fish.__table__
+    rows = [{"b_id": fish_id,
+             "nh_month_mask": parse_months(nh_months),
+             "sh_month_mask": parse_months(sh_months)}
+            for fish_id, nh_months, sh_months in db.session.execute(
+                select(table.c.id, table.c.nh_months, table.c.sh_months)
+                .where(or_(table.c.nh_month_mask.is_(None),
+                           table.c.sh_month_mask.is_(None))))]
+
+    try:
+        if rows:
+            db.session.execute(
+                update(table).where(table.c.id == bindparam("b_id"))
+                .values(nh_month_mask=bindparam("nh_month_mask"),
+                        sh_month_mask=bindparam("sh_month_mask")),
+                rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
@@ -0,0 +1,231 @@
+# pylint: disable=E0401
+"""
+Per-user collections stored in the database.
+
+Nothing here keeps per-user state in the process: every call reads or writes
+the `User` / `CollectedItem` tables, so any worker behind a load balancer can
+serve any user.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import delete, select, tuple_
+from .models import CollectedItem, User
+from .upsert import dialect_insert
+
+
+def _main():
+    """
+    Imports `src.main` lazily so the datasheets only load once needed.
+    """
+
+    from src import main  # pylint: disable=C0415
+
+    return main
+
+
+def resolve_items(names: Iterable[str]) -> tuple[list[dict], list[str]]:
+    """
+    Resolves user supplied names onto (category, name) rows.
+
+    Args:
+        names (Iterable[str]): The user supplied names.
+
+    Returns:
+        (tuple(list[dict], list[str])): The resolved rows and the names that
+                                        did not resolve.
+    """
+
+    resolved, unknown = _main().resolve_collection(names)
+    rows = [{"category": category, "name": name}
+            for category, items in resolved.items() for name in items]
+    return (rows, unknown)
+
+
+def _ensure_user(db: SQLAlchemy, user_id: str) -> None:
+    """
+    Creates the user row if it does not exist yet.
+    """
+
+    insert = dialect_insert(db.engine.dialect.name)
+    db.session.execute(insert(User.__table__)
+                       .values(id=user_id)
+                       .on_conflict_do_nothing(index_elements=["id"]))
+
+
+def add_items(db: SQLAlchemy, user_id: str,
+              names: Iterable[str]) -> dict:
+    """
+    Adds items to a user's collection; already collected items are ignored.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        user_id (str): The user id.
+        names (Iterable[str]): The user supplied names.
+
+    Returns:
+        (dict): The number of items "added" and the "unknown" names.
+    """
+
+    rows, unknown = resolve_items(names)
+    added = 0
+
+    try:
+        _ensure_user(db, user_id)
+        if rows:
+            insert = dialect_insert(db.engine.dialect.name)
+            stmt = insert(CollectedItem.__table__).on_conflict_do_nothing(
+                index_elements=["user_id", "category", "name"])
+            result = db.session.execute(
+                stmt, [{"user_id": user_id, **row} for row in rows])
+            added = max(result.rowcount, 0)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"added": added, "unknown": unknown}
+
+
+def remove_items(db: SQLAlchemy, user_id: str,
+                 names: Iterable[str]) -> dict:
+    """
+    Removes items from a user's collection.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        user_id (str): The user id.
+        names (Iterable[str]): The user supplied names.
+
+    Returns:
+        (dict): The number of items "removed" and the "unknown" names.
+    """
+
+    rows, unknown = resolve_items(names)
+    removed = 0
+
+    try:
+        if rows:
+            keys = [(row["category"], row["name"]) for row in rows]
+            result = db.session.execute(
+                delete(CollectedItem)
+                .where(CollectedItem.user_id == user_id)
+                .where(tuple_(CollectedItem.category,
+                              CollectedItem.name).in_(keys)))
+            removed = result.rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"removed": removed, "unknown": unknown}
+
+
+def replace_collection(db: SQLAlchemy, user_id: str,
+                       names: Iterable[str]) -> dict:
+    """
+    Replaces a user's whole collection in one transaction.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        user_id (str): The user id.
+        names (Iterable[str]): The user supplied names.
+
+    Returns:
+        (dict): The number of items "stored" and the "unknown" names.
+    """
+
+    rows, unknown = resolve_items(names)
+
+    try:
+        _ensure_user(db, user_id)
+        db.session.execute(delete(CollectedItem)
+                           .where(CollectedItem.user_id == user_id))
+        if rows:
+            db.session.execute(
+                CollectedItem.__table__.insert(),
+                [{"user_id": user_id, **row} for row in rows])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"stored": len(rows), "unknown": unknown}
+
+
+def get_collection(db: SQLAlchemy, user_id: str) -> dict[str, list[str]]:
+    """
+    Returns a user's collected items by category.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        user_id (str): The user id.
+
+    Returns:
+        (dict[str, list[str]]): Category to collected names, in catalog
+                                order. Unknown users have empty categories.
+    """
+
+    found: dict[str, set[str]] = {}
+    query = select(CollectedItem.category, CollectedItem.name) \
+        .where(CollectedItem.user_id == user_id)
+    for category, name in db.session.execute(query):
+        found.setdefault(category, set()).add(name)
+
+    resolvers = _main().catalog_names.resolvers
+    return {category: [name for name in resolver.names
+                       if name in found.get(category, ())]
+            for category, resolver in resolvers.items()}
+
+
+def collection_status(db: SQLAlchemy, user_id: str, hemisphere: str = "nh",
+                      now: Optional[datetime] = None) -> dict:
+    """
+    Computes caught / uncaught items per category and, for every critter
+    category, which uncaught critters are catchable now, leaving after this
+    month and arriving next month.
+
+    Args:
+        db (SQLAlchemy): The application database.
+        user_id (str): The user id.
+        hemisphere (str): "nh" or "sh".
+        now (datetime, optional): The time to check. Defaults to now.
+
+    Returns:
+        (dict): The "caught" and "uncaught" listings and the "availability"
+                per critter category ("fish" is also kept at the top level).
+    """
+
+    main = _main()
+    now = now or datetime.now()
+    collected = get_collection(db, user_id)
+
+    uncaught = {}
+    for category, resolver in main.catalog_names.resolvers.items():
+        have = set(collected[category])
+        uncaught[category] = [name for name in resolver.names
+                              if name not in have]
+
+    availability = {}
+    for store in main.catalog_engine:
+        if store.spawns is None:
+            continue
+        spawns = store.spawns
+        among = spawns.select(uncaught[store.category])
+        availability[store.category] = {
+            "available_now": spawns.catchable(now.month, now.hour,
+                                              hemisphere, among),
+            "leaving": spawns.leaving(now.month, hemisphere, among),
+            "arriving": spawns.arriving(now.month, hemisphere, among),
+        }
+
+    return {
+        "user": user_id,
+        "hemisphere": hemisphere,
+        "month": now.month,
+        "hour": now.hour,
+        "caught": collected,
+        "uncaught": uncaught,
+        "availability": availability,
+        "fish": availability["fish"],
+    }
@@ -0,0 +1,58 @@
+# pylint: disable=E0401
+"""
+Shared fixtures. The app runs against an in-memory SQLite database with the
+image cache and availability files in a temporary directory, so the tests
+never touch mydatabase.db, static/ or the network.
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="acnh-tests-")
+
+# Must be configured before `src` is imported.
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["IMAGE_CACHE_DIR"] = os.path.join(_TMP, "image_cache")
+os.environ["AVAILABILITY_DIR"] = os.path.join(_TMP, "availability")
+os.environ.pop("DATABASE_READ_URL", None)
+os.environ["NOOKIPEDIA_SYNC_INTERVAL"] = "0"
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, os.path.join(API_DIR, "benchmarks"))
+
+# pylint: disable=C0413,W0621
+import pytest  # noqa: E402
+from src import app as flask_app, db as database  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    """
+    The Flask app inside an app context, with freshly created tables.
+    """
+
+    with flask_app.app_context():
+        database.drop_all()
+        database.create_all()
+        yield flask_app
+        database.session.remove()
+
+
+@pytest.fixture
+def db(app):
+    """
+    The application database, empty.
+    """
+
+    del app
+    return database
+
+
+@pytest.fixture
+def client(app):
+    """
+    A test client of the app.
+    """
+
+    return app.test_client()
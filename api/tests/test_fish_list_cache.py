@@ -0,0 +1,85 @@
+# pylint: disable=E0401,W0621
+"""
+The cached '/get_fish_list' body follows the shared data version, so writes
+by other processes show up without an `invalidate()` here.
+"""
+import pytest
+from src.routes.get_fish_list import fish_data_version, fish_list_cache
+from src.routes.get_fish_list import refresh_fish_views
+from src.upsert import FISH_COLUMNS, upsert_fish
+
+
+def fish_row(name: str, price: int = 100) -> dict:
+    """
+    Returns a `Fish` row with every data column set.
+    """
+
+    row = {column: "" for column in FISH_COLUMNS}
+    row.update(name=name, price=price, nh_month_mask=0, sh_month_mask=0)
+    return row
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """
+    The fish list cache, checking the version on every request.
+    """
+
+    monkeypatch.setattr(fish_list_cache, "check_interval", 0)
+    fish_list_cache.invalidate()
+    yield fish_list_cache
+    fish_list_cache.invalidate()
+
+
+def names(client) -> list[str]:
+    """
+    Returns the names in the full '/get_fish_list' response.
+    """
+
+    return [fish["name"] for fish in client.get("/get_fish_list").json["fish"]]
+
+
+def test_writes_bump_the_version(db):
+    """
+    Only writes that change rows, and refreshes, bump the version.
+    """
+
+    before = fish_data_version()
+    upsert_fish(db, [fish_row("Carp")])
+    assert fish_data_version() == before + 1
+
+    upsert_fish(db, [fish_row("Carp")])  # Unchanged: nothing written
+    assert fish_data_version() == before + 1
+
+    refresh_fish_views()
+    assert fish_data_version() == before + 2
+
+
+def test_rebuilds_after_writes_elsewhere(db, client, cache):
+    """
+    A write not invalidating this cache still shows up.
+    """
+
+    del cache
+    upsert_fish(db, [fish_row("Carp")])
+    first = client.get("/get_fish_list")
+    assert names(client) == ["Carp"]
+
+    # As another worker would: write, without touching this cache.
+    upsert_fish(db, [fish_row("Dace")])
+    assert names(client) == ["Carp", "Dace"]
+    assert client.get("/get_fish_list").headers["ETag"] != \
+        first.headers["ETag"]
+
+
+def test_serves_the_cached_body_while_unchanged(db, client, cache):
+    """
+    An unchanged version keeps serving the same body.
+    """
+
+    upsert_fish(db, [fish_row("Carp")])
+    client.get("/get_fish_list")
+    body = cache.get()
+
+    client.get("/get_fish_list")
+    assert cache.get() is body
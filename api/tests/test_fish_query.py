@@ -0,0 +1,132 @@
+# pylint: disable=E0401,W0621
+"""
+Fish queries: keyset pagination round-trips and cursor validation.
+"""
+import pytest
+from werkzeug.datastructures import MultiDict
+from src.fish_query import QueryError, decode_cursor, encode_cursor
+from src.fish_query import parse_fish_query, run_fish_query
+from src.images import icon_url
+from src.models import Fish
+from src.upsert import FISH_COLUMNS, upsert_fish
+
+
+@pytest.fixture
+def fish(db):
+    """
+    30 fish with repeated prices and locations, so sort ties need the id.
+    """
+
+    rows = []
+    for i in range(30):
+        row = {column: "" for column in FISH_COLUMNS}
+        row.update(name=f"Fish {i:02d}", price=(i % 7) * 100,
+                   location=("River", "Sea", "Pond")[i % 3],
+                   nh_month_mask=1 << (i % 12), sh_month_mask=0)
+        rows.append(row)
+    upsert_fish(db, rows)
+    return rows
+
+
+def page_through(db, **params) -> list[dict]:
+    """
+    Follows "nextCursor" until the last page and returns every row.
+    """
+
+    seen = []
+    args = MultiDict(params)
+    while True:
+        page = run_fish_query(db, parse_fish_query(args))
+        seen.extend(page["fish"])
+        if page["nextCursor"] is None:
+            return seen
+        args = MultiDict({**params, "cursor": page["nextCursor"]})
+
+
+@pytest.mark.parametrize("sort", ["id", "name", "price", "-price",
+                                  "location", "-name"])
+def test_pages_cover_every_row_once_in_order(db, fish, sort):
+    """
+    Paging returns the same rows as one big page.
+    """
+
+    del fish
+    whole = run_fish_query(db, parse_fish_query(MultiDict(
+        {"sort": sort, "limit": "200"})))["fish"]
+
+    paged = page_through(db, sort=sort, limit="7")
+
+    assert paged == whole
+    assert len({row["id"] for row in paged}) == 30
+
+
+def test_pages_keep_filters(db, fish):
+    """
+    Every page applies the filters and the sort order.
+    """
+
+    del fish
+    paged = page_through(db, location="Sea", min_price="200", limit="2",
+                         sort="-price")
+
+    assert paged
+    assert all(row["location"] == "Sea" and row["price"] >= 200
+               for row in paged)
+    assert [row["price"] for row in paged] == sorted(
+        (row["price"] for row in paged), reverse=True)
+
+
+def test_cursor_round_trip():
+    """
+    Cursors decode to what was encoded, for their own sort only.
+    """
+
+    cursor = encode_cursor("-price", 300, 12)
+
+    assert decode_cursor(cursor, "-price") == (300, 12)
+    with pytest.raises(QueryError):
+        decode_cursor(cursor, "price")
+    with pytest.raises(QueryError):
+        decode_cursor("not a cursor", "price")
+
+
+def test_projects_fields(db, fish):
+    """
+    Only the requested fields are returned.
+    """
+
+    del fish
+    page = run_fish_query(db, parse_fish_query(MultiDict(
+        {"fields": "name,price", "limit": "3"})))
+
+    assert [list(row) for row in page["fish"]] == [["name", "price"]] * 3
+
+
+@pytest.mark.parametrize("sort", ["price", "-price"])
+def test_null_prices_come_last_and_page(db, fish, sort):
+    """
+    Fish without a price come last and are paged exactly once.
+    """
+
+    upsert_fish(db, [{**row, "price": None} for row in fish[::4]])
+
+    paged = page_through(db, sort=sort, limit="4")
+    prices = [row["price"] for row in paged]
+
+    assert len({row["id"] for row in paged}) == 30
+    assert prices[-8:] == [None] * 8
+    assert prices[:-8] == sorted(prices[:-8], reverse=sort == "-price")
+
+
+def test_icon_url_is_derived(db, fish):
+    """
+    iconUrl is derived from the image digest like Fish.to_json.
+    """
+
+    del fish
+    db.session.execute(Fish.__table__.update().values(image_digest="abc"))
+    page = run_fish_query(db, parse_fish_query(MultiDict(
+        {"fields": "name,iconUrl", "limit": "1"})))
+
+    assert page["fish"] == [{"name": "Fish 00",
+                             "iconUrl": icon_url("abc")}]
@@ -0,0 +1,39 @@
+# pylint: disable=E0401
+"""
+`ImageCache.store`: what is rejected as not an image.
+"""
+import io
+import pytest
+from PIL import Image
+from src.images import ImageCache, ImageError
+
+
+def png(size: int) -> bytes:
+    """
+    Returns a blank square PNG.
+    """
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_rejects_garbage(tmp_path):
+    """
+    Bytes that are no image raise ImageError.
+    """
+
+    with pytest.raises(ImageError):
+        ImageCache(str(tmp_path)).store(b"not an image")
+
+
+def test_rejects_decompression_bombs(tmp_path, monkeypatch):
+    """
+    Images over Pillow's pixel limit raise ImageError, unstored.
+    """
+
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+
+    with pytest.raises(ImageError):
+        ImageCache(str(tmp_path)).store(png(64))
+    assert not list(tmp_path.rglob("*.*"))
@@ -0,0 +1,159 @@
+# pylint: disable=E0401,W0212,W0621
+"""
+`JobQueue`: atomic claims and recovering only abandoned jobs, with two
+queues standing in for two processes sharing the job table.
+"""
+import json
+import os
+import socket
+import time
+from datetime import timedelta
+import pytest
+from sqlalchemy import insert, select
+from src.jobs import JOB_HEARTBEAT_TIMEOUT, JobQueue, _utcnow
+from src.models import Job
+
+
+@pytest.fixture
+def queues(app, db):
+    """
+    Two unstarted queues running an "echo" job kind.
+    """
+
+    pair = []
+    for name in ("first", "second"):
+        queue = JobQueue(app, db)
+        queue._owner = (os.getpid(), f"elsewhere:1:{name}")
+        queue.register("echo", lambda params, progress: params)
+        pair.append(queue)
+    return pair
+
+
+def add_job(db, job_id: str, status: str = "queued", **columns) -> None:
+    """
+    Stores an "echo" job.
+    """
+
+    with db.engine.begin() as conn:
+        conn.execute(insert(Job.__table__).values(
+            id=job_id, kind="echo", key=job_id, params=json.dumps({"n": 1}),
+            status=status, progress=0.0, created_at=_utcnow(), **columns))
+
+
+def job(db, job_id: str) -> Job:
+    """
+    Returns a job as stored now.
+    """
+
+    db.session.expire_all()
+    return db.session.scalars(select(Job).where(Job.id == job_id)).one()
+
+
+def test_only_one_queue_claims_a_job(db, queues):
+    """
+    The second claim of a job fails.
+    """
+
+    first, second = queues
+    add_job(db, "a")
+
+    assert first._claim("a") == ("echo", json.dumps({"n": 1}))
+    assert second._claim("a") is None
+    assert job(db, "a").owner == first.owner
+
+
+def test_run_skips_jobs_claimed_elsewhere(db, queues):
+    """
+    A queue only runs the jobs it claimed itself.
+    """
+
+    first, second = queues
+    add_job(db, "a")
+    first._claim("a")
+
+    second._run("a")
+    assert job(db, "a").status == "running"
+
+    add_job(db, "b")
+    second._run("b")
+    stored = job(db, "b")
+    assert (stored.status, json.loads(stored.result)) == ("done", {"n": 1})
+    assert stored.owner == second.owner
+
+
+def test_recover_leaves_live_owners_alone(db, queues):
+    """
+    Jobs of live owners with fresh heartbeats stay running.
+    """
+
+    first, second = queues
+    add_job(db, "a")
+    first._claim("a")
+
+    assert second.recover() == []
+    assert first.recover() == []
+    assert job(db, "a").status == "running"
+
+
+def test_recover_requeues_stale_and_dead_owners(db, queues):
+    """
+    Stale, ownerless and dead-owner jobs are requeued.
+    """
+
+    _, second = queues
+    stale = _utcnow() - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT + 1)
+    add_job(db, "stale", "running", owner="elsewhere:1:gone",
+            heartbeat_at=stale)
+    add_job(db, "legacy", "running")
+    # A process on this host with a pid above any pid_max.
+    add_job(db, "dead", "running",
+            owner=f"{socket.gethostname()}:{2 ** 22 + 1}:gone",
+            heartbeat_at=_utcnow())
+    add_job(db, "fresh", "running", owner="elsewhere:1:busy",
+            heartbeat_at=_utcnow())
+
+    assert sorted(second.recover()) == ["dead", "legacy", "stale"]
+    assert job(db, "stale").status == "queued"
+    assert job(db, "stale").owner is None
+    assert job(db, "fresh").status == "running"
+
+
+def test_render_output_is_served_by_any_process(client):
+    """
+    A render job stores its image, so the result URL works from anywhere.
+    """
+
+    created = client.post("/jobs", json={
+        "kind": "render_calendar",
+        "params": {"hemisphere": "nh", "format": "svg", "caught": []}})
+    assert created.status_code == 202
+    job_url = created.headers["Location"]
+
+    for _ in range(500):
+        job = client.get(job_url).json
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "done"
+    assert job["outputType"] == "image/svg+xml"
+
+    image = client.get(job["outputUrl"])
+    assert image.status_code == 200
+    assert image.mimetype == "image/svg+xml"
+    assert len(image.data) == job["result"]["bytes"]
+    assert client.get(f"{job_url}/result").data == image.data
+    assert client.get("/jobs/missing/result").status_code == 404
+
+
+@pytest.mark.parametrize("option", [{"month": 3.0}, {"month": True},
+                                    {"dpi": True}, {"dpi": 72.0}])
+def test_render_rejects_non_integer_options(client, option):
+    """
+    `month` and `dpi` must be JSON integers, not floats or booleans.
+    """
+
+    response = client.post("/jobs", json={
+        "kind": "render_calendar",
+        "params": {"hemisphere": "nh", "format": "svg", **option}})
+
+    assert response.status_code == 400
@@ -0,0 +1,42 @@
+# pylint: disable=E0401
+"""
+`ingest_local_fish`: the bundled data never wipes what it lacks.
+"""
+import pytest
+from sqlalchemy import select
+from src.local_source import ingest_local_fish, local_fish_rows
+from src.models import Fish
+from src.upsert import upsert_fish
+
+
+def test_keeps_the_stored_rarity(db):
+    """
+    A local ingest leaves the stored rarities as they are.
+    """
+
+    # As if a Nookipedia ingest had stored the rarities first.
+    rows = [{**row, "rarity": "Common"} for row in local_fish_rows()]
+    upsert_fish(db, rows)
+
+    counts = ingest_local_fish(db)
+
+    assert counts["inserted"] == counts["updated"] == 0
+    assert counts["unchanged"] == len(rows)
+    assert set(db.session.scalars(select(Fish.rarity))) == {"Common"}
+
+
+@pytest.mark.usefixtures("app")
+def test_rows_fit_the_columns():
+    """
+    Every string fits its column, so Postgres accepts the rows.
+    """
+
+    rows = list(local_fish_rows())
+
+    for column in Fish.__table__.columns:
+        length = getattr(column.type, "length", None)
+        if length is None:
+            continue
+        for row in rows:
+            assert len(row.get(column.name) or "") <= length, column.name
+    assert not any("\xa0" in row["time"] for row in rows)
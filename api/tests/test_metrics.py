@@ -0,0 +1,88 @@
+# pylint: disable=E0401,W0212
+"""
+Tests for sharing metrics between processes through a directory.
+"""
+import os
+from src.metrics import Registry
+
+
+def make_registry(directory):
+    """
+    Returns a registry on `directory` with a counter and a histogram.
+    """
+
+    registry = Registry(directory)
+    counter = registry.counter("test_total", "Test counter.", ("kind",))
+    histogram = registry.histogram("test_seconds", "Test histogram.",
+                                   buckets=(0.1, 1))
+    return registry, counter, histogram
+
+
+def sample(text, name):
+    """
+    Returns the value of the sample line `name`, or None.
+    """
+
+    for line in text.splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    return None
+
+
+def test_render_sums_every_process(tmp_path):
+    """
+    Counters and histograms are summed over every process file.
+    """
+
+    first, first_counter, first_histogram = make_registry(str(tmp_path))
+    second, second_counter, second_histogram = make_registry(str(tmp_path))
+    first_counter.inc(2, kind="a")
+    second_counter.inc(3, kind="a")
+    second_counter.inc(kind="b")
+    first_histogram.observe(0.05)
+    second_histogram.observe(0.5)
+    second.dump()
+
+    text = first.render()
+    assert sample(text, 'test_total{kind="a"}') == 5
+    assert sample(text, 'test_total{kind="b"}') == 1
+    assert sample(text, 'test_seconds_bucket{le="0.1"}') == 1
+    assert sample(text, 'test_seconds_bucket{le="+Inf"}') == 2
+    assert sample(text, "test_seconds_count") == 2
+
+
+def test_archived_counts_survive_the_process(tmp_path):
+    """
+    Archived counts stay, once, after their file is gone.
+    """
+
+    first, first_counter, _ = make_registry(str(tmp_path))
+    second, second_counter, _ = make_registry(str(tmp_path))
+    # Name the second file as if another process (pid 2) had written it.
+    second._file = (os.getpid(), str(tmp_path / "metrics-2-b.json"))
+
+    first_counter.inc(kind="a")
+    second_counter.inc(4, kind="a")
+    second.dump()
+    first.archive_process(2)
+    assert not (tmp_path / "metrics-2-b.json").exists()
+    assert sample(first.render(), 'test_total{kind="a"}') == 5
+
+    # Archiving is idempotent and new workers add on top.
+    first.archive_process(2)
+    third, third_counter, _ = make_registry(str(tmp_path))
+    third_counter.inc(kind="a")
+    third.dump()
+    assert sample(first.render(), 'test_total{kind="a"}') == 6
+
+
+def test_without_directory_reports_this_process(tmp_path):
+    """
+    Without a directory nothing is written to disk.
+    """
+
+    registry, counter, _ = make_registry(None)
+    counter.inc(kind="a")
+    registry.dump()
+    assert sample(registry.render(), 'test_total{kind="a"}') == 1
+    assert not list(tmp_path.iterdir())
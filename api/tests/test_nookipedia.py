@@ -0,0 +1,88 @@
+# pylint: disable=E0401,W0621
+"""
+The Nookipedia client against the local stub server: the name list fanned
+out into detail fetches, retries of injected 503s and per-fish failures.
+"""
+import pytest
+from stub_nookipedia import StubNookipedia, load_records
+from src import nookipedia
+from src.nookipedia import NookipediaError, fetch_all_fish, make_session
+
+
+@pytest.fixture
+def records():
+    """
+    Eight fish records from `fish_info.json`.
+    """
+
+    return dict(list(load_records().items())[:8])
+
+
+@pytest.fixture
+def stub(monkeypatch, records):
+    """
+    A running stub server the client points at, retrying without backoff.
+    """
+
+    with StubNookipedia(records, serve_images=False) as server:
+        monkeypatch.setattr(nookipedia, "URL", f"{server.url}/nh/fish")
+        monkeypatch.setattr(nookipedia, "BACKOFF_FACTOR", 0)
+        yield server
+
+
+def test_fetches_every_fish_in_list_order(stub, records):
+    """
+    Every fish is fetched, in list order, reporting progress.
+    """
+
+    progress = []
+    fetched, failures = fetch_all_fish(session=make_session(), max_workers=4,
+                                       progress=lambda *p: progress.append(p))
+
+    assert not failures
+    assert [record["name"] for record in fetched] == list(records)
+    assert fetched[0] == records[fetched[0]["name"]]
+    assert progress[-1] == (len(records), len(records))
+    assert stub.requests == len(records) + 1
+
+
+def test_retries_server_errors(stub, records):
+    """
+    Intermittent 503s are retried until they succeed.
+    """
+
+    stub.fail_every = 3
+
+    fetched, failures = fetch_all_fish(session=make_session(), max_workers=2)
+
+    assert not failures
+    assert len(fetched) == len(records)
+    assert stub.requests > len(records) + 1
+
+
+@pytest.mark.usefixtures("stub")
+def test_collects_failures_per_fish(records):
+    """
+    A fish that cannot be fetched is reported, not fatal.
+    """
+
+    names = [*records, "no such fish"]
+
+    fetched, failures = fetch_all_fish(names, session=make_session())
+
+    assert len(fetched) == len(records)
+    assert list(failures) == ["no such fish"]
+    assert "404" in failures["no such fish"]
+
+
+def test_raises_when_the_list_keeps_failing(stub):
+    """
+    A list that keeps failing raises after the retries.
+    """
+
+    stub.fail_every = 1
+
+    with pytest.raises(NookipediaError) as error:
+        fetch_all_fish(session=make_session())
+    assert error.value.status_code == 503
+    assert stub.requests == nookipedia.MAX_RETRIES + 1
@@ -0,0 +1,28 @@
+# pylint: disable=E0401
+"""
+`RenderFarm`: the render workers load the drawing code, not the app.
+"""
+import numpy as np
+from src.calendar_render import RenderJob
+from src.render_farm import RenderFarm
+
+
+def test_workers_never_build_the_app():
+    """
+    A worker has rendered, yet neither Flask nor the app's modules loaded.
+    """
+
+    farm = RenderFarm(workers=1)
+    try:
+        image = farm.render(RenderJob(("Koi",), np.ones((1, 12)), "Koi", 3,
+                                      dpi=20))
+        # A builtin, so the worker needs no test code to unpickle the probe.
+        loaded = farm._pool().submit(  # pylint: disable=W0212
+            eval, "sorted(__import__('sys').modules)").result(60)
+    finally:
+        farm.shutdown()
+
+    assert image.startswith(b"\x89PNG")
+    assert "src.calendar_render" in loaded
+    assert not {"flask", "sqlalchemy", "src.database",
+                "src.routes"} & set(loaded)
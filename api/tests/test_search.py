@@ -0,0 +1,40 @@
+# pylint: disable=E0401
+"""
+The '/search' route.
+"""
+
+
+def test_limit_is_clamped(client):
+    """
+    The limit is clamped to 1-50.
+    """
+
+    assert len(client.get("/search?q=a&limit=-3&threshold=0")
+               .get_json()["results"]) == 1
+    assert len(client.get("/search?q=a&limit=500&threshold=0")
+               .get_json()["results"]) == 50
+
+
+def test_finds_misspelt_names(client):
+    """
+    A misspelt name still finds its fish.
+    """
+
+    results = client.get("/search?q=sea+bas").get_json()["results"]
+
+    assert results
+    assert "sea bass" in str(results[0]).lower()
+
+
+
+def test_category_accepts_slugs(client):
+    """
+    `category` takes the '/catalog' slugs and rejects unknown categories.
+    """
+
+    results = client.get("/search?q=octopus&category=sea_creature"
+                         ).get_json()["results"]
+
+    assert results
+    assert {result["category"] for result in results} == {"sea creature"}
+    assert client.get("/search?q=a&category=nope").status_code == 400
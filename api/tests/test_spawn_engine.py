@@ -0,0 +1,53 @@
+# pylint: disable=E0401
+"""
+The spawn bitmasks against the DataFrame computations they replaced.
+"""
+import numpy as np
+import pytest
+from src import main
+from src.spawn_engine import format_months, parse_months
+
+
+@pytest.mark.parametrize("hemisphere", ["nh", "sh"])
+def test_month_grid_matches_the_notna_grid(hemisphere):
+    """
+    The packed grids match the DataFrame's notna grids.
+    """
+
+    frame = main.get_frame(hemisphere.upper()).set_index("Name")
+    expected = frame.notna().astype(int)
+
+    names, grid = main.catalog_engine.stores["fish"].spawns.month_grid(
+        hemisphere)
+
+    order = [names.index(name) for name in expected.index]
+    assert sorted(names) == sorted(expected.index)
+    assert np.array_equal(grid[order], expected.to_numpy())
+
+
+def test_uncaught_month_grid_matches_the_dataframe():
+    """
+    Subsets of rows match the DataFrame rows.
+    """
+
+    caught = ["Carp", "Koi", "Dace"]
+    frame = main.get_frame("NH")
+    expected = frame[~frame["Name"].isin(caught)].set_index("Name")
+
+    spawns = main.catalog_engine.stores["fish"].spawns
+    uncaught = [name for name in spawns.names if name not in caught]
+    names, grid = spawns.month_grid("nh", uncaught)
+
+    assert names == list(expected.index)
+    assert np.array_equal(grid, expected.notna().astype(int).to_numpy())
+
+
+@pytest.mark.parametrize("months", ["Nov – Mar", "Jan – Dec", "Jun",
+                                    "Nov – Mar; Jul – Aug"])
+def test_month_strings_round_trip(months):
+    """
+    Month strings survive parsing and formatting.
+    """
+
+    assert parse_months(format_months(parse_months(months))) == \
+        parse_months(months)
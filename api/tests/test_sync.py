@@ -0,0 +1,75 @@
+# pylint: disable=E0401,W0621
+"""
+`SyncScheduler`: failures are recorded, never fatal, and nothing starts on
+import.
+"""
+import time
+import pytest
+from src import sync
+from src.sync import SyncScheduler
+
+
+@pytest.fixture
+def scheduler(app, db):
+    """
+    A scheduler that has not been started.
+    """
+
+    return SyncScheduler(app, db, interval=0)
+
+
+def test_unexpected_errors_are_recorded(scheduler, monkeypatch):
+    """
+    Any exception is recorded and clears the running flag.
+    """
+
+    def broken(db):
+        """
+        Fails with an error the scheduler does not expect.
+        """
+
+        raise ValueError("bad payload")
+
+    monkeypatch.setattr(sync, "sync_fish", broken)
+    run = scheduler.run_once()
+
+    assert run["error"] == "Sync failed: ValueError: bad payload"
+    assert scheduler.status() == {"running": False, "last_run": run}
+
+
+def test_trigger_runs_once_and_keeps_running(scheduler, monkeypatch):
+    """
+    A failed triggered sync does not stop the next one.
+    """
+
+    calls = []
+
+    def flaky(db):
+        """
+        Fails on the first call only.
+        """
+
+        calls.append(db)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return {"inserted": 0, "updated": 0}
+
+    monkeypatch.setattr(sync, "sync_fish", flaky)
+    for expected in (1, 2):
+        scheduler.trigger()
+        for _ in range(200):
+            status = scheduler.status()
+            if len(calls) == expected and status["last_run"] and \
+                    not status["running"]:
+                break
+            time.sleep(0.01)
+        assert len(calls) == expected
+    assert scheduler.status()["last_run"]["result"]["inserted"] == 0
+
+
+def test_importing_the_app_starts_no_sync(app):
+    """
+    Building the app starts no scheduler thread.
+    """
+
+    assert app.extensions["fish_sync"]._thread is None  # pylint: disable=W0212
@@ -0,0 +1,72 @@
+# pylint: disable=E0401,W0621
+"""
+`upsert_rows` / `upsert_fish`: idempotency and the changed-row counts.
+"""
+from sqlalchemy import select
+from src.models import Fish
+from src.upsert import FISH_COLUMNS, fish_content_hash, upsert_fish
+
+
+def fish_row(name: str, price: int = 100, **columns) -> dict:
+    """
+    Returns a `Fish` row with every data column set.
+    """
+
+    row = {column: "" for column in FISH_COLUMNS}
+    row.update(name=name, price=price, nh_month_mask=1, sh_month_mask=64)
+    row.update(columns)
+    return row
+
+
+def stored(db) -> dict[str, dict]:
+    """
+    Returns the stored fish by name.
+    """
+
+    return {fish.name: fish for fish in db.session.scalars(select(Fish))}
+
+
+def test_inserts_then_is_idempotent(db):
+    """
+    A second upsert of the same rows writes nothing.
+    """
+
+    rows = [fish_row("Carp"), fish_row("Dace"), fish_row("Koi")]
+
+    assert upsert_fish(db, rows) == {"inserted": 3, "updated": 0,
+                                     "unchanged": 0}
+    assert upsert_fish(db, rows) == {"inserted": 0, "updated": 0,
+                                     "unchanged": 3}
+    assert len(stored(db)) == 3
+
+
+def test_counts_and_writes_only_changed_rows(db):
+    """
+    Only changed rows are counted and written.
+    """
+
+    upsert_fish(db, [fish_row("Carp"), fish_row("Dace")])
+    ids = {name: fish.id for name, fish in stored(db).items()}
+
+    counts = upsert_fish(db, [fish_row("Carp", price=300),
+                              fish_row("Dace"), fish_row("Koi")])
+
+    assert counts == {"inserted": 1, "updated": 1, "unchanged": 1}
+    fish = stored(db)
+    assert fish["Carp"].price == 300
+    assert fish["Carp"].id == ids["Carp"]
+    assert fish["Carp"].content_hash == fish_content_hash(
+        fish_row("Carp", price=300))
+    assert fish["Dace"].price == 100
+
+
+def test_later_duplicates_win(db):
+    """
+    The last of several rows with one name is stored.
+    """
+
+    counts = upsert_fish(db, [fish_row("Carp", price=1),
+                              fish_row("Carp", price=2)])
+
+    assert counts["inserted"] == 1
+    assert stored(db)["Carp"].price == 2
@@ -0,0 +1,15 @@
+"""
+The WSGI entry point for production servers.
+
+Importing this module prepares the database and warms the shared caches
+(see `src.serving`), so with gunicorn's `preload_app` it runs once in the
+master and the workers fork with the datasheets and indexes already built
+and shared copy-on-write.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from src import app, db
+from src.serving import prepare_app
+
+prepare_app(app, db)
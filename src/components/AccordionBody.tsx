@@ -11,7 +11,14 @@ const AccordionBody = ({ fish }: Props) => {
       <div className="container-sm text-center">
         <div className="row">
           <div>
-            <img src={fish.imageUrl} alt={fish.name} />
+            <img
+              src={
+                fish.iconUrl
+                  ? `http://127.0.0.1:5000${fish.iconUrl}`
+                  : fish.imageUrl
+              }
+              alt={fish.name}
+            />
           </div>
           <FishCard fish={fish} />
         </div>
@@ -2,6 +2,7 @@ export interface Fish {
   id: number;
   name: string;
   imageUrl: string;
+  iconUrl: string | null;
   rarity: string;
   price: string;
   size: string;